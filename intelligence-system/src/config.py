@@ -9,6 +9,55 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://redis:6379/0"
     FETCH_INTERVAL_SECONDS: int = 3600
     MAX_CONCURRENT_FETCHES: int = 5
+    # Hours simulated before the reported fire risk (the model starts from a guess)
+    FRCM_SPINUP_HOURS: int = 1
+    # FRCM kernel: "auto" (by input size), "reference", "vectorized", "batched"
+    # or "implicit", see frcm.fireriskmodel.compute.select_kernel. The only
+    # source of the kernel of the worker, which passes it to every computation
+    FRCM_KERNEL: str = "auto"
+    # Start cold simulations from the steady state of the first forecast hour
+    # instead of the guessed indoor humidity
+    FRCM_EQUILIBRIUM_START: bool = True
+    # Spin-up of on-demand requests (instant queue), where latency is visible
+    FRCM_INSTANT_SPINUP_HOURS: int = 0
+    # Stored model states older than this are discarded in favour of a spin-up
+    FRCM_STATE_MAX_AGE_HOURS: int = 6
+    # Also compute the fire risk of the building archetypes (frcm ARCHETYPES)
+    FRCM_ARCHETYPES_ENABLED: bool = True
+    # Worker processes of the FRCM computations (default: one per core available
+    # to the process, within its cgroup CPU limit; 0 runs them in a thread of
+    # the worker process instead)
+    FRCM_COMPUTE_WORKERS: int | None = None
+    # Computations submitted to the workers at a time (default: 2 per worker)
+    FRCM_COMPUTE_QUEUE_SIZE: int | None = None
+    # Record the wall time of the FRCM pipeline stages per fetch cycle, see
+    # frcm.profiling (logged and stored in Redis under FRCM_PROFILE_KEY)
+    FRCM_PROFILE: bool = False
+    FRCM_PROFILE_KEY: str = "metrics:frcm_profile"
+    # Cache of FRCM results by a hash of their inputs, see services.result_cache
+    FRCM_CACHE_ENABLED: bool = True
+    # Entries of the in-process tier (least recently used ones are evicted)
+    FRCM_CACHE_SIZE: int = 10000
+    # Share the cached results of all workers through Redis
+    FRCM_CACHE_REDIS: bool = False
+    FRCM_CACHE_TTL_SECONDS: int = 24 * 3600
+    FRCM_CACHE_KEY_PREFIX: str = "frcm:result:"
+    # Redis hash of the cache hit and miss counters (updated every cycle)
+    FRCM_CACHE_METRICS_KEY: str = "metrics:frcm_cache"
+    # Risk score scale, see utils.fire_risk_service.RiskScale: the score (0-100)
+    # is interpolated linearly between the points (TTF in minutes, score)
+    RISK_SCORE_TTF_MINUTES: list[float] = [0, 5, 15, 30, 60]
+    RISK_SCORE_VALUES: list[float] = [100, 80, 60, 30, 0]
+    # Risk categories from the highest risk, each ending at the TTF (minutes)
+    # of the same position in RISK_CATEGORY_TTF_MINUTES
+    RISK_CATEGORIES: list[str] = ["Extreme", "High", "Moderate", "Low"]
+    RISK_CATEGORY_TTF_MINUTES: list[float] = [5, 15, 30]
+    # Bulk re-scoring of the stored risks after a change of the scale, see
+    # services.rescoring: rows per transaction, pause between transactions and
+    # Redis hash of the progress
+    RISK_RESCORE_CHUNK_SIZE: int = 5000
+    RISK_RESCORE_PAUSE_SECONDS: float = 0.0
+    RISK_RESCORE_PROGRESS_KEY: str = "jobs:risk_rescore"
 
     @field_validator("DATABASE_URL", mode="before")
     @classmethod
@@ -10,7 +10,7 @@ from sqlalchemy import (
     func,
     select,
 )
-from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -19,9 +19,14 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import DeclarativeBase
 
 from config import settings
-from utils.fire_risk_service import calculate_risk_score
+from frcm.datamodel import model as dm
+from utils.fire_risk_service import calculate_risk_score, calculate_risk_scores
 from utils.grid_utils import generate_initial_zones
 
+# Zones per statement of save_model_states, whose 6 bind parameters per zone
+# must stay below the 32767 parameters Postgres accepts per statement
+MODEL_STATE_CHUNK_SIZE = 1000
+
 # Database connection
 engine = create_async_engine(settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(
@@ -99,6 +104,44 @@ class CurrentFireRisk(Base):
     )
 
 
+class CurrentArchetypeFireRisk(Base):
+    """
+    Stores the most recent fire risk of each building archetype per zone,
+    alongside the default risk in CurrentFireRisk.
+    """
+
+    __tablename__ = "current_archetype_fire_risks"
+
+    geohash = Column(String, primary_key=True, index=True)
+    archetype = Column(String, primary_key=True)
+    ttf = Column(Float)
+    risk_score = Column(Float, nullable=True)
+    risk_category = Column(String, nullable=True)
+    prediction_timestamp = Column(DateTime(timezone=True))
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class ModelStateRecord(Base):
+    """
+    Stores the FRCM model state at the end of the last simulation of each zone,
+    used as the initial condition (warm start) of the next cycle.
+    """
+
+    __tablename__ = "model_states"
+
+    geohash = Column(String, primary_key=True, index=True)
+    state_timestamp = Column(DateTime(timezone=True), nullable=False)
+    wall = Column(ARRAY(Float), nullable=False)
+    cw_in = Column(Float, nullable=False)
+    rh_in = Column(Float, nullable=False)
+    c_wall = Column(Float, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
 async def create_db_and_tables() -> None:
     """Creates the database and tables if they do not exist."""
     async with engine.begin() as conn:
@@ -206,6 +249,106 @@ async def save_risk_data(
         await db.commit()
 
 
+async def save_archetype_risk_data(
+    location_name: str, archetype_result: Dict[str, Any]
+) -> None:
+    """Inserts or updates the current fire risk of every archetype of a zone."""
+    archetypes = list(archetype_result["ttf"])
+    ttfs = [archetype_result["ttf"][archetype] for archetype in archetypes]
+    risk_scores, risk_categories = calculate_risk_scores(ttfs)
+    rows = [
+        {
+            "geohash": location_name,
+            "archetype": archetype,
+            "ttf": ttf,
+            "risk_score": float(risk_score),
+            "risk_category": str(risk_category),
+            "prediction_timestamp": archetype_result["timestamp"],
+        }
+        for archetype, ttf, risk_score, risk_category in zip(
+            archetypes, ttfs, risk_scores, risk_categories
+        )
+    ]
+    if not rows:
+        return
+
+    async with AsyncSessionLocal() as db:
+        stmt = insert(CurrentArchetypeFireRisk).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["geohash", "archetype"],
+            set_={
+                "ttf": stmt.excluded.ttf,
+                "risk_score": stmt.excluded.risk_score,
+                "risk_category": stmt.excluded.risk_category,
+                "prediction_timestamp": stmt.excluded.prediction_timestamp,
+                "updated_at": func.now(),
+            },
+        )
+
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def get_model_states(geohashes: Sequence[str]) -> Dict[str, dm.ModelState]:
+    """Returns the stored model states of the given zones, keyed by geohash."""
+    if not geohashes:
+        return {}
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ModelStateRecord).where(ModelStateRecord.geohash.in_(geohashes))
+        )
+        return {
+            record.geohash: dm.ModelState(
+                timestamp=record.state_timestamp,
+                wall=record.wall,
+                cw_in=record.cw_in,
+                rh_in=record.rh_in,
+                c_wall=record.c_wall,
+            )
+            for record in result.scalars().all()
+        }
+
+
+async def save_model_states(states: Dict[str, dm.ModelState]) -> None:
+    """
+    Inserts or updates the model states of the given zones (keyed by geohash),
+    in one transaction of statements of `MODEL_STATE_CHUNK_SIZE` zones.
+    """
+    if not states:
+        return
+
+    rows = [
+        {
+            "geohash": geohash,
+            "state_timestamp": state.timestamp,
+            "wall": state.wall,
+            "cw_in": state.cw_in,
+            "rh_in": state.rh_in,
+            "c_wall": state.c_wall,
+        }
+        for geohash, state in states.items()
+    ]
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(rows), MODEL_STATE_CHUNK_SIZE):
+            stmt = insert(ModelStateRecord).values(
+                rows[start : start + MODEL_STATE_CHUNK_SIZE]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["geohash"],
+                set_={
+                    "state_timestamp": stmt.excluded.state_timestamp,
+                    "wall": stmt.excluded.wall,
+                    "cw_in": stmt.excluded.cw_in,
+                    "rh_in": stmt.excluded.rh_in,
+                    "c_wall": stmt.excluded.c_wall,
+                    "updated_at": func.now(),
+                },
+            )
+            await db.execute(stmt)
+        await db.commit()
+
+
 async def get_latest_readings(
     location_name: str, limit: int = 1
 ) -> dict[str, Sequence[Any]]:
@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Any
 
 from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String, func
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -85,3 +86,41 @@ class CurrentFireRisk(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+
+
+class CurrentArchetypeFireRisk(Base):
+    """
+    Stores the most recent fire risk of each building archetype per zone,
+    alongside the default risk in CurrentFireRisk.
+    """
+
+    __tablename__ = "current_archetype_fire_risks"
+
+    geohash: Mapped[str] = mapped_column(String, primary_key=True, index=True)
+    archetype: Mapped[str] = mapped_column(String, primary_key=True)
+    ttf: Mapped[float] = mapped_column(Float)
+    risk_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+    risk_category: Mapped[str | None] = mapped_column(String, nullable=True)
+    prediction_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class ModelStateRecord(Base):
+    """
+    Stores the FRCM model state at the end of the last simulation of each zone,
+    used as the initial condition (warm start) of the next cycle.
+    """
+
+    __tablename__ = "model_states"
+
+    geohash: Mapped[str] = mapped_column(String, primary_key=True, index=True)
+    state_timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    wall: Mapped[list[float]] = mapped_column(ARRAY(Float))
+    cw_in: Mapped[float] = mapped_column(Float)
+    rh_in: Mapped[float] = mapped_column(Float)
+    c_wall: Mapped[float] = mapped_column(Float)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -1,6 +1,23 @@
+import argparse
+import contextlib
+import os
 import sys
+import time
 from pathlib import Path
 
+from frcm.batch import (
+    find_inputs,
+    format_summary,
+    is_batch_input,
+    iter_weather_file,
+    output_paths,
+    read_weather_file,
+    run_batch,
+    write_fire_risk_file,
+)
+from frcm.datamodel.model import (
+    ColumnarWeatherData as ColumnarWeatherData,
+)
 from frcm.datamodel.model import (
     FireRisk as FireRisk,
 )
@@ -8,27 +25,102 @@ from frcm.datamodel.model import (
     FireRiskPrediction as FireRiskPrediction,
 )
 from frcm.datamodel.model import (
-    WeatherData,
+    WeatherData as WeatherData,
 )
 from frcm.datamodel.model import (
     WeatherDataPoint as WeatherDataPoint,
 )
-from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel.compute import KERNELS, compute
+from frcm.fireriskmodel.stream import compute_iter
+from frcm.profiling import Profiler, profile, stage
 
+# Environment variable with the default of --kernel
+KERNEL_ENV = "FRCM_KERNEL"
 
-def console_main() -> None:
-    """The main entrypoint for the console application."""
-    if len(sys.argv) < 2 or len(sys.argv) > 3:
-        print(
-            "Wrong number of arguments provided! Please provide one reference to a"
-            " CSV file with weatherdata to compute the fire risk"
-        )
-        sys.exit(1)
 
-    file = Path(sys.argv[1])
-    wd = WeatherData.read_csv(file)
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parses the command line arguments of the console application."""
+    parser = argparse.ArgumentParser(
+        prog="frcm",
+        description="Computes the fire risk from a CSV or Parquet file with"
+        " weather data, or from many of them in batch mode.",
+    )
+    parser.add_argument(
+        "input",
+        type=Path,
+        help="CSV or Parquet file with weather data; a directory (its *.csv and"
+        " *.parquet files) or a quoted glob pattern such as 'stations/**/*.csv'"
+        " for batch mode",
+    )
+    parser.add_argument(
+        "output",
+        type=Path,
+        nargs="?",
+        help="file to write the fire risks to, Parquet if it ends with .parquet"
+        " (default: print them); the output directory in batch mode (required)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        # the cores of the CPU affinity of the process (all cores before Python 3.13)
+        default=getattr(os, "process_cpu_count", os.cpu_count)() or 1,
+        help="worker processes of the batch mode (default: one per core"
+        " available to the process)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read, compute and write one data point at a time, keeping memory"
+        " constant for arbitrarily long inputs (data must be sorted by time, CSV"
+        " output)",
+    )
+    parser.add_argument(
+        "--kernel",
+        choices=["auto", *KERNELS],
+        default=os.environ.get(KERNEL_ENV) or "auto",
+        help="FRCM kernel to use (default: $FRCM_KERNEL or auto); the streaming"
+        " mode always steps the explicit model",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the wall time, calls and sizes of the pipeline stages",
+    )
+    return parser.parse_args(argv)
+
+
+def _stream_main(file: Path, output: Path | None) -> None:
+    """Computes the fire risk of a CSV or Parquet file in streaming mode."""
+    if output is not None and output.suffix == ".parquet":
+        sys.exit("Streaming mode writes CSV files only, choose a .csv output")
+    # The risks go to stdout without an output file
+    print(
+        f"Streaming FireRisk computation for given data in '{file.absolute()}'",
+        file=sys.stderr,
+    )
 
-    if len(wd.data) == 0:
+    handle = open(output, "w+") if output else sys.stdout
+    try:
+        handle.write(FireRisk.csv_header())
+        handle.write("\n")
+        for timestamp, ttf, _ in compute_iter(iter_weather_file(file)):
+            handle.write(FireRisk(timestamp=timestamp, ttf=ttf).csv_line())
+            handle.write("\n")
+    finally:
+        if output:
+            handle.close()
+
+    if output:
+        print(f"Calculated fire risks written to '{output.absolute()}'")
+
+
+def _compute_main(file: Path, output: Path | None, kernel: str | None) -> None:
+    """Computes the fire risk of a CSV or Parquet file."""
+    with stage("read"):
+        wd = read_weather_file(file)
+
+    if len(wd) == 0:
         print(
             "Given file did not contain any data points! Please check the input"
             " format! Aborting..."
@@ -37,15 +129,77 @@ def console_main() -> None:
 
     print(
         f"Computing FireRisk for given data in '{file.absolute()}'"
-        f" ({len(wd.data)} datapoints)",
+        f" ({len(wd)} datapoints)",
         end="\n\n",
     )
 
-    risks = compute(wd)
+    risks = compute(wd, kernel=kernel)
 
-    if len(sys.argv) == 3:
-        output = Path(sys.argv[2])
-        risks.write_csv(output)
+    if output:
+        write_fire_risk_file(risks, output)
         print(f"Calculated fire risks written to '{output.absolute()}'")
     else:
         print(risks)
+
+
+def _batch_main(args: argparse.Namespace, profiler: Profiler | None) -> bool:
+    """
+    Computes the fire risk of every file of a directory or glob pattern.
+
+    Returns:
+        Whether all files were computed.
+    """
+    if args.output is None:
+        sys.exit("Batch mode needs an output directory for the results")
+    inputs = find_inputs(args.input)
+    if not inputs:
+        sys.exit(f"No input files found for '{args.input}'")
+    try:
+        outputs = output_paths(inputs, args.output)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    jobs = max(1, min(args.jobs, len(inputs)))
+    print(f"Computing FireRisk for {len(inputs)} files with {jobs} jobs")
+    begin = time.perf_counter()
+    results = []
+    for result in run_batch(
+        inputs, outputs, jobs, args.kernel, args.stream, profiler=profiler
+    ):
+        results.append(result)
+        progress = f"[{len(results)}/{len(inputs)}]"
+        if result.error is None:
+            print(f"{progress} {result.input} -> {result.output}")
+        else:
+            print(f"{progress} {result.input} failed: {result.error}", file=sys.stderr)
+
+    print(format_summary(results, time.perf_counter() - begin))
+    return all(result.error is None for result in results)
+
+
+def console_main() -> None:
+    """The main entrypoint for the console application."""
+    args = _parse_args(sys.argv[1:])
+    file = args.input
+
+    if is_batch_input(file):
+        profiling = profile() if args.profile else contextlib.nullcontext()
+        with profiling as profiler:
+            succeeded = _batch_main(args, profiler)
+        if profiler is not None:
+            print(profiler.format(), file=sys.stderr)
+        if not succeeded:
+            sys.exit(1)
+        return
+
+    if args.stream:
+        _stream_main(file, args.output)
+        return
+
+    # Measures the pipeline stages if requested, see frcm.profiling
+    profiling = profile() if args.profile else contextlib.nullcontext()
+    with profiling as profiler:
+        _compute_main(file, args.output, args.kernel)
+
+    if profiler is not None:
+        print(profiler.format(), file=sys.stderr)
@@ -0,0 +1,284 @@
+"""
+Batch mode of the console application: computes the fire risk of many CSV
+or Parquet files (e.g. the station histories of an offline study) in a pool
+of worker processes, one file per task, writing one result file per input.
+"""
+
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+from frcm.datamodel import parquet_io
+from frcm.datamodel.model import (
+    ColumnarWeatherData,
+    FireRisk,
+    FireRiskPrediction,
+    WeatherData,
+    WeatherDataPoint,
+)
+from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel.stream import compute_iter
+from frcm.profiling import Profiler, StageStats, profile, stage
+
+# Input files listed in a directory
+INPUT_SUFFIXES = (".csv", ".parquet")
+
+
+class FileResult(NamedTuple):
+    """Outcome of the computation of one input file."""
+
+    input: Path
+    output: Path
+    # hourly fire risks written
+    hours: int
+    seconds: float
+    # message of the failure, None if the file was computed
+    error: str | None = None
+
+
+def is_batch_input(path: Path) -> bool:
+    """Whether an input names several files: a directory or a glob pattern."""
+    return path.is_dir() or glob.has_magic(str(path))
+
+
+def find_inputs(path: Path) -> List[Path]:
+    """
+    Lists the input files of a batch: the CSV and Parquet files in a
+    directory, or the files matching a glob pattern ("**" matches
+    subdirectories), sorted.
+    """
+    if path.is_dir():
+        return sorted(
+            p for p in path.iterdir() if p.suffix in INPUT_SUFFIXES and p.is_file()
+        )
+    return sorted(
+        Path(p) for p in glob.glob(str(path), recursive=True) if Path(p).is_file()
+    )
+
+
+def output_paths(inputs: Sequence[Path], output_dir: Path) -> List[Path]:
+    """
+    The result file of every input: its path relative to the common directory
+    of all inputs, below `output_dir`.
+
+    Raises:
+        ValueError: If a result would overwrite an input.
+    """
+    if not inputs:
+        return []
+    root = Path(os.path.commonpath([p.absolute().parent for p in inputs]))
+    outputs = [output_dir / p.absolute().relative_to(root) for p in inputs]
+    overwritten = {p.resolve() for p in inputs} & {p.resolve() for p in outputs}
+    if overwritten:
+        raise ValueError(
+            f"Results would overwrite the input {sorted(overwritten)[0]}, choose"
+            " another output directory"
+        )
+    return outputs
+
+
+def read_weather_file(file: Path) -> ColumnarWeatherData:
+    """Reads the weather data of a CSV or (by its suffix) Parquet file."""
+    if file.suffix == ".parquet":
+        return parquet_io.read_weather(file)
+    return ColumnarWeatherData.read_csv(file)
+
+
+def iter_weather_file(file: Path) -> Iterator[WeatherDataPoint]:
+    """Reads the data points of a CSV or Parquet file lazily, in file order."""
+    if file.suffix != ".parquet":
+        return WeatherData.iter_csv(file)
+    return chain.from_iterable(
+        chunk.to_weather_data().data for chunk in parquet_io.iter_weather(file)
+    )
+
+
+def write_fire_risk_file(risks: FireRiskPrediction, output: Path) -> None:
+    """Writes fire risks to a CSV or (by its suffix) Parquet file."""
+    if output.suffix == ".parquet":
+        parquet_io.write_fire_risks(risks, output)
+    else:
+        risks.write_csv(output)
+
+
+def compute_file(
+    file: Path, output: Path, kernel: str | None = None, streaming: bool = False
+) -> int:
+    """
+    Computes the fire risk of a CSV or Parquet file and writes it to
+    `output` (Parquet if it ends with ".parquet"), see the single file mode of
+    the console application.
+
+    Returns:
+        The number of hourly fire risks written.
+
+    Raises:
+        ValueError: If the file contains no data points.
+    """
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if streaming:
+        if output.suffix == ".parquet":
+            raise ValueError("streaming mode writes CSV files only")
+        count = 0
+        with open(output, "w+") as handle:
+            handle.write(FireRisk.csv_header())
+            handle.write("\n")
+            for timestamp, ttf, _ in compute_iter(iter_weather_file(file)):
+                handle.write(FireRisk(timestamp=timestamp, ttf=ttf).csv_line())
+                handle.write("\n")
+                count += 1
+        return count
+
+    with stage("read"):
+        wd = read_weather_file(file)
+    if len(wd) == 0:
+        raise ValueError("file does not contain any data points")
+    risks = compute(wd, kernel=kernel)
+    with stage("write", size=len(risks.firerisks)):
+        write_fire_risk_file(risks, output)
+    return len(risks.firerisks)
+
+
+def _run_file(
+    file: Path,
+    output: Path,
+    kernel: str | None,
+    streaming: bool,
+    profiled: bool,
+) -> Tuple[FileResult, Dict[str, StageStats] | None]:
+    """
+    Task of a worker process: computes one file, catching its errors so that
+    one broken file does not stop the batch. The stages are profiled if the
+    parent has a profiler (which lives in the parent process).
+    """
+    begin = time.perf_counter()
+    stages = None
+    try:
+        if profiled:
+            with profile() as profiler:
+                hours = compute_file(file, output, kernel, streaming)
+            stages = profiler.stages
+        else:
+            hours = compute_file(file, output, kernel, streaming)
+    except Exception as e:
+        result = FileResult(file, output, 0, time.perf_counter() - begin, str(e))
+    else:
+        result = FileResult(file, output, hours, time.perf_counter() - begin)
+    return result, stages
+
+
+def _executor(jobs: int) -> ProcessPoolExecutor:
+    """A pool of `jobs` worker processes, started as in `ComputePool`."""
+    return ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def run_batch(
+    inputs: Sequence[Path],
+    outputs: Sequence[Path],
+    jobs: int = 1,
+    kernel: str | None = None,
+    streaming: bool = False,
+    profiler: Profiler | None = None,
+) -> Iterator[FileResult]:
+    """
+    Computes the inputs into the outputs, in `jobs` worker processes (in the
+    calling process for a single job).
+
+    At most `jobs` files are submitted at a time. A worker process that dies
+    (e.g. killed for its memory) breaks the pool: the files it was computing
+    with the others are then computed again one at a time, a file whose worker
+    dies on its own is reported as failed, and the rest of the batch continues
+    in a new pool.
+
+    Args:
+        inputs: The CSV files with weather data.
+        outputs: The result file of every input.
+        jobs: Number of worker processes.
+        kernel: The FRCM kernel, see `compute`.
+        streaming: Compute the files with `compute_iter` (constant memory).
+        profiler: Profiler collecting the stages of all files, if any.
+
+    Returns:
+        The results of the files in the order of completion.
+    """
+    profiled = profiler is not None
+    if jobs <= 1:
+        for file, output in zip(inputs, outputs):
+            result, stages = _run_file(file, output, kernel, streaming, profiled)
+            if stages:
+                profiler.merge(stages)
+            yield result
+        return
+
+    # taken from the end, in the order of the inputs
+    pending = list(zip(inputs, outputs))[::-1]
+    # files which were running when a worker process died
+    suspects: List[Tuple[Path, Path]] = []
+    while pending or suspects:
+        if suspects:
+            file, output = suspects.pop()
+            begin = time.perf_counter()
+            with _executor(1) as executor:
+                future = executor.submit(
+                    _run_file, file, output, kernel, streaming, profiled
+                )
+                try:
+                    result, stages = future.result()
+                except BrokenProcessPool:
+                    seconds = time.perf_counter() - begin
+                    result = FileResult(file, output, 0, seconds, "worker process died")
+                    stages = None
+            if stages:
+                profiler.merge(stages)
+            yield result
+            continue
+
+        running: Dict[Future, Tuple[Path, Path]] = {}
+        with _executor(jobs) as executor:
+            try:
+                while (pending or running) and not suspects:
+                    while pending and len(running) < jobs:
+                        file, output = pending.pop()
+                        future = executor.submit(
+                            _run_file, file, output, kernel, streaming, profiled
+                        )
+                        running[future] = (file, output)
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        try:
+                            result, stages = future.result()
+                        except BrokenProcessPool:
+                            suspects.append(task)
+                            continue
+                        if stages:
+                            profiler.merge(stages)
+                        yield result
+                # the other running files fail with the broken pool as well
+                suspects.extend(running.values())
+            finally:
+                for future in running:
+                    future.cancel()
+
+
+def format_summary(results: Sequence[FileResult], seconds: float) -> str:
+    """The throughput of a batch: files/s and hourly fire risks/s of the wall time."""
+    done = [r for r in results if r.error is None]
+    hours = sum(r.hours for r in done)
+    rate = 1 / seconds if seconds > 0 else float("inf")
+    summary = (
+        f"Computed {len(done)} files ({hours} hours) in {seconds:.2f} s:"
+        f" {len(done) * rate:.1f} files/s, {hours * rate:.0f} hours/s"
+    )
+    failed = len(results) - len(done)
+    if failed:
+        summary += f", {failed} failed"
+    return summary
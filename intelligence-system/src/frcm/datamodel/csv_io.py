@@ -0,0 +1,387 @@
+"""
+Chunked, array based CSV I/O of the datamodel.
+
+The CSV files of the datamodel have a timestamp column followed by float
+columns ("timestamp,temperature,humidity,wind_speed" for weather data,
+"timestamp,ttf" for fire risks). Instead of a pydantic object per line, the
+files are read in blocks of `CHUNK_BYTES` and every block is parsed into numpy
+arrays at once, so that the memory stays bounded by the block size however
+long a station history is:
+
+- the fields are located by the positions of the separators in the block,
+- timestamps of one width (isoformat, with or without a UTC offset) are
+  converted by numpy in one call, with the offsets applied as integers (the
+  timestamps are stored in UTC, a UTC offset shared by all rows is kept to
+  hand them out and write them at it again),
+- decimal numbers of up to 15 characters are assembled from their digits
+  and divided by a power of ten, which rounds exactly like `float()`; other
+  numbers (exponents, nan, ...) fall back to `float()`.
+
+Blocks the fast path cannot handle (blank lines, mixed timestamp widths) are
+parsed line by line with the same results. Writing formats whole chunks of
+rows into one string per `write`.
+"""
+
+import datetime
+from itertools import chain
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+# Bytes read and parsed at a time
+CHUNK_BYTES = 1 << 22
+# Rows formatted per write
+CHUNK_ROWS = 1 << 16
+
+_COMMA, _NEWLINE, _CR = ord(","), ord("\n"), ord("\r")
+# Longest numbers (characters) assembled from their digits, exact in a float64
+_MAX_DIGITS = 15
+_POW10_FLOAT = 10.0 ** np.arange(19)
+
+
+class CsvChunk(NamedTuple):
+    """The rows of a block of a CSV file, in the order of the file."""
+
+    # datetime64[us], in UTC if `utc`, else naive as written
+    timestamp: np.ndarray
+    # float64, one column per value column of the file
+    values: np.ndarray
+    utc: bool
+    # UTC offset of all timestamps of the chunk, UTC if they differ
+    tz: datetime.timezone = datetime.timezone.utc
+
+
+def _gather(buf: np.ndarray, ends: np.ndarray, width: int) -> np.ndarray:
+    """
+    The `width` bytes of `buf` before each of `ends`, one row per byte
+    position and one column per field (shape (width, len(ends))).
+    """
+    if ends[0] < width:
+        buf = np.concatenate((np.zeros(width, dtype=np.uint8), buf))
+        ends = ends + width
+    first = ends - width
+    chars = np.empty((width, len(ends)), dtype=np.uint8)
+    for position in range(width):
+        np.take(buf[position:], first, out=chars[position])
+    return chars
+
+
+def parse_decimals(buf: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Parses the numbers in the byte ranges [starts, ends) of `buf` (uint8).
+
+    Raises:
+        ValueError: If a field is not a number.
+    """
+    if len(starts) == 0:
+        return np.empty(0)
+    lengths = ends - starts
+    width = min(int(lengths.max()), _MAX_DIGITS)
+    # the fields right-aligned in `width` bytes, padded with "0"
+    chars = _gather(buf, ends, width)
+    padding = np.arange(width, dtype=np.uint8)[:, None] < (
+        width - np.minimum(lengths, width)
+    ).astype(np.uint8)
+    np.copyto(chars, ord("0"), where=padding)
+
+    digits = chars - np.uint8(ord("0"))
+    is_digit = digits < 10
+    is_dot = chars == ord(".")
+    digits *= is_digit
+    # the digits as an integer (exact below 2**53), skipping the dot, and the
+    # number of digits right of the dot
+    factor = np.uint8(10) - np.uint8(9) * is_dot
+    mantissa = digits[0].astype(float)
+    decimals = np.zeros(len(starts), dtype=np.uint8)
+    after_dot = is_dot[0].copy()
+    for position in range(1, width):
+        mantissa *= factor[position]
+        mantissa += digits[position]
+        decimals += after_dot
+        after_dot |= is_dot[position]
+    values = mantissa / _POW10_FLOAT.take(decimals)
+    sign = buf[starts]
+    np.negative(values, out=values, where=sign == ord("-"))
+
+    # anything but digits, a leading sign and one dot, and long numbers go
+    # through float()
+    # (the sign of a longer number is not in the window)
+    dots = is_dot.sum(axis=0, dtype=np.uint8)
+    is_signed = ((sign == ord("-")) | (sign == ord("+"))) & (lengths <= width)
+    others = (~(is_digit | is_dot)).sum(axis=0, dtype=np.uint8)
+    slow = (lengths > width) | (lengths == is_signed.astype(int) + (dots > 0))
+    slow |= (others != is_signed) | (dots > 1)
+    for index in np.flatnonzero(slow):
+        values[index] = float(buf[starts[index] : ends[index]].tobytes())
+    return values
+
+
+def parse_timestamps(
+    buf: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, bool, datetime.timezone]:
+    """
+    Parses the isoformat timestamps in the byte ranges [starts, ends) of
+    `buf` into datetime64[us], in UTC if they have UTC offsets.
+
+    Returns:
+        The timestamps, whether they are in UTC (else naive) and the UTC
+        offset shared by all of them (UTC if they differ).
+    """
+    width = int(ends[0] - starts[0]) if len(starts) else 0
+    if width == 0 or np.any(ends - starts != width):
+        return _parse_timestamps_slow(
+            [buf[s:e].tobytes().decode() for s, e in zip(starts, ends)]
+        )
+
+    chars = _gather(buf, ends, width).T
+    if (
+        width > 6
+        and np.all((chars[:, -6] == ord("+")) | (chars[:, -6] == ord("-")))
+        and np.all(chars[:, -3] == ord(":"))
+    ):
+        local, offset = chars[:, :-6], chars[:, -6:]
+    elif np.all(chars[:, -1] == ord("Z")):
+        local, offset = chars[:, :-1], None
+    else:
+        local, offset = chars, False
+    try:
+        timestamp = (
+            np.ascontiguousarray(local)
+            .view(f"S{local.shape[1]}")
+            .ravel()
+            .astype("datetime64[us]")
+        )
+    except ValueError:
+        return _parse_timestamps_slow([bytes(row).decode() for row in chars])
+    if offset is False:
+        return timestamp, False, datetime.timezone.utc
+    tz = datetime.timezone.utc
+    if offset is not None:
+        digits = offset.astype(np.int64) - ord("0")
+        minutes = (
+            (digits[:, 1] * 10 + digits[:, 2]) * 60 + digits[:, 4] * 10 + digits[:, 5]
+        )
+        minutes = np.where(offset[:, 0] == ord("-"), -minutes, minutes)
+        timestamp = timestamp - minutes * np.timedelta64(60_000_000, "us")
+        if np.all(minutes == minutes[0]):
+            tz = datetime.timezone(datetime.timedelta(minutes=int(minutes[0])))
+    return timestamp, True, tz
+
+
+def _parse_timestamps_slow(
+    texts: Sequence[str],
+) -> Tuple[np.ndarray, bool, datetime.timezone]:
+    """Parses timestamps one by one, see `parse_timestamps`."""
+    parsed = [datetime.datetime.fromisoformat(text.strip()) for text in texts]
+    aware = [t.tzinfo is not None for t in parsed]
+    if any(aware) and not all(aware):
+        raise ValueError("CSV file mixes timestamps with and without UTC offset")
+    tz = datetime.timezone.utc
+    if any(aware):
+        offsets = {t.utcoffset() for t in parsed}
+        if len(offsets) == 1:
+            tz = datetime.timezone(offsets.pop())
+        parsed = [
+            t.astimezone(datetime.timezone.utc).replace(tzinfo=None) for t in parsed
+        ]
+    return np.array(parsed, dtype="datetime64[us]"), any(aware), tz
+
+
+def parse_csv_chunk(block: bytes, value_columns: int) -> CsvChunk:
+    """
+    Parses complete lines of a CSV file (without header) into arrays.
+
+    Args:
+        block: The lines, ending with a line break.
+        value_columns: Number of float columns after the timestamp.
+
+    Raises:
+        ValueError: If a line does not have the expected format.
+    """
+    fields = value_columns + 1
+    buf = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero((buf == _COMMA) | (buf == _NEWLINE))
+    if (
+        len(ends) == 0
+        or len(ends) % fields
+        or np.any(buf[ends[fields - 1 :: fields]] != _NEWLINE)
+    ):
+        # blank lines or lines with a wrong number of fields
+        return _parse_csv_lines(block, value_columns)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # \r\n line breaks
+    ends[fields - 1 :: fields] -= buf[ends[fields - 1 :: fields] - 1] == _CR
+
+    timestamp, utc, tz = parse_timestamps(buf, starts[::fields], ends[::fields])
+    value_starts = starts.reshape(-1, fields)[:, 1:].ravel()
+    value_ends = ends.reshape(-1, fields)[:, 1:].ravel()
+    values = parse_decimals(buf, value_starts, value_ends)
+    return CsvChunk(timestamp, values.reshape(-1, value_columns), utc, tz)
+
+
+def _parse_csv_lines(block: bytes, value_columns: int) -> CsvChunk:
+    """Parses lines one by one, see `parse_csv_chunk`."""
+    texts: List[str] = []
+    values: List[List[float]] = []
+    for line in block.decode().splitlines():
+        if not line.strip():
+            continue
+        split_line = line.split(",")
+        if len(split_line) != value_columns + 1:
+            raise ValueError(
+                f"Given line has unexpected format! Expects a timestamp and"
+                f" {value_columns} numbers: {line!r}"
+            )
+        texts.append(split_line[0])
+        values.append([float(value) for value in split_line[1:]])
+    timestamp, utc, tz = _parse_timestamps_slow(texts)
+    return CsvChunk(
+        timestamp, np.array(values, dtype=float).reshape(-1, value_columns), utc, tz
+    )
+
+
+def iter_csv_chunks(
+    src: Path, value_columns: int, chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[CsvChunk]:
+    """
+    Reads a CSV file (with header) in blocks of about `chunk_bytes`, see
+    `parse_csv_chunk`. Only one block is held in memory at a time.
+    """
+    with open(src, "rb") as handle:
+        handle.readline()  # skip the header
+        rest = b""
+        while True:
+            data = handle.read(chunk_bytes)
+            if not data:
+                break
+            block = rest + data
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:
+                rest = block
+                continue
+            block, rest = block[:cut], block[cut:]
+            chunk = parse_csv_chunk(block, value_columns)
+            if len(chunk.timestamp):
+                yield chunk
+        if rest.strip():
+            yield parse_csv_chunk(rest + b"\n", value_columns)
+
+
+def read_csv_columns(
+    src: Path, value_columns: int, chunk_bytes: int = CHUNK_BYTES
+) -> CsvChunk:
+    """Reads a whole CSV file into arrays, see `iter_csv_chunks`."""
+    chunks = list(iter_csv_chunks(src, value_columns, chunk_bytes))
+    if not chunks:
+        return CsvChunk(
+            np.empty(0, dtype="datetime64[us]"), np.empty((0, value_columns)), True
+        )
+    if len({chunk.utc for chunk in chunks}) > 1:
+        raise ValueError("CSV file mixes timestamps with and without UTC offset")
+    offsets = {chunk.tz for chunk in chunks}
+    return CsvChunk(
+        np.concatenate([chunk.timestamp for chunk in chunks]),
+        np.concatenate([chunk.values for chunk in chunks]),
+        chunks[0].utc,
+        offsets.pop() if len(offsets) == 1 else datetime.timezone.utc,
+    )
+
+
+def _texts(values: np.ndarray, format_one: Callable[[Any], str]) -> List[str]:
+    """
+    Formats every value of an array, formatting each distinct value once if
+    values repeat (as timestamps' days and weather readings do).
+    """
+    if len(values) == 0:
+        return []
+    keys = values.view(np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    if len(unique) > len(values) // 2:
+        return list(map(format_one, values.tolist()))
+    texts = np.array(list(map(format_one, unique.view(values.dtype).tolist())))
+    return texts.astype(object).take(inverse.ravel()).tolist()
+
+
+def _format_day(day: datetime.date) -> str:
+    return day.isoformat()
+
+
+def _format_time_of_day(microseconds: int) -> str:
+    seconds, fraction = divmod(microseconds, 1_000_000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{text}.{fraction:06d}" if fraction else text
+
+
+def format_csv_rows(
+    timestamp: np.ndarray,
+    columns: Sequence[np.ndarray],
+    utc: bool,
+    tz: datetime.timezone = datetime.timezone.utc,
+) -> str:
+    """
+    Formats rows of a timestamp and float columns as CSV lines (each ending
+    with a line break), equal to the `csv_line` of the datamodel: timestamps
+    as `datetime.isoformat` (at the UTC offset `tz` if `utc`), floats as
+    `repr`.
+    """
+    if len(timestamp) == 0:
+        return ""
+    timestamp = timestamp.astype("datetime64[us]")
+    suffix = ""
+    if utc:
+        offset = tz.utcoffset(None)
+        timestamp = timestamp + np.timedelta64(
+            offset // datetime.timedelta(microseconds=1), "us"
+        )
+        # "+HH:MM" as isoformat writes it
+        suffix = datetime.datetime.min.replace(tzinfo=tz).isoformat()[19:]
+    days = timestamp.astype("datetime64[D]")
+    times = (timestamp - days).astype(np.int64)
+    fields = [
+        _texts(days, _format_day),
+        _texts(times, _format_time_of_day),
+        *(_texts(np.asarray(column, dtype=float), repr) for column in columns),
+    ]
+    row = "%sT%s" + suffix + ",%s" * len(columns) + "\n"
+    return (row * len(timestamp)) % tuple(chain.from_iterable(zip(*fields)))
+
+
+def write_csv(target: Path | IO[str], header: str, chunks: Iterable[str]) -> None:
+    """Writes a header and formatted chunks of lines to a file or text handle."""
+    if isinstance(target, (str, Path)):
+        with open(target, "w") as handle:
+            write_csv(handle, header, chunks)
+        return
+    target.write(header + "\n")
+    for chunk in chunks:
+        target.write(chunk)
+
+
+def iter_formatted_rows(
+    timestamp: np.ndarray,
+    columns: Sequence[np.ndarray],
+    utc: bool,
+    chunk_rows: int = CHUNK_ROWS,
+    tz: datetime.timezone = datetime.timezone.utc,
+) -> Iterator[str]:
+    """Formats the rows in chunks of `chunk_rows`, see `format_csv_rows`."""
+    for start in range(0, len(timestamp), chunk_rows):
+        stop = start + chunk_rows
+        yield format_csv_rows(
+            timestamp[start:stop], [column[start:stop] for column in columns], utc, tz
+        )
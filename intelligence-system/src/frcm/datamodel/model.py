@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import datetime
 from pathlib import Path
+from typing import IO, Any, Iterator, List, Sequence, Tuple
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from frcm.datamodel import csv_io
 
 
 class WeatherDataPoint(BaseModel):
@@ -54,22 +58,305 @@ class WeatherData(BaseModel):
         return self.model_dump_json()
 
     def write_csv(self, target: Path) -> None:
-        """Writes the data to a CSV file."""
-        with open(target, "w+") as handle:
-            handle.write(WeatherDataPoint.csv_header())
-            handle.write("\n")
-            for d in self.data:
-                handle.write(d.csv_line())
-                handle.write("\n")
+        """Writes the data to a CSV file, `CHUNK_ROWS` lines per write."""
+        csv_io.write_csv(
+            target,
+            WeatherDataPoint.csv_header(),
+            _csv_chunks(self.data),
+        )
 
     @classmethod
     def read_csv(cls, src: Path) -> WeatherData:
-        """Reads the data from a CSV file."""
-        result = []
-        with open(src, "rt") as handle:
-            for line in handle.readlines()[1:]:
-                result.append(WeatherDataPoint.from_csv_line(line))
-        return WeatherData(data=result)
+        """Reads the data from a CSV file, see `iter_csv`."""
+        return WeatherData(data=list(cls.iter_csv(src)))
+
+    @classmethod
+    def iter_csv(cls, src: Path) -> Iterator[WeatherDataPoint]:
+        """
+        Reads the data points from a CSV file lazily, in the order of the file.
+        The file is parsed in blocks of `csv_io.CHUNK_BYTES` (see `csv_io`),
+        timestamps keep their UTC offset if all of a block share it, and are
+        returned in UTC otherwise.
+        """
+        for chunk in csv_io.iter_csv_chunks(src, 3):
+            timestamps = to_datetimes(chunk.timestamp, chunk.utc, chunk.tz)
+            for timestamp, (temperature, humidity, wind_speed) in zip(
+                timestamps, chunk.values.tolist()
+            ):
+                yield WeatherDataPoint(
+                    timestamp=timestamp,
+                    temperature=temperature,
+                    humidity=humidity,
+                    wind_speed=wind_speed,
+                )
+
+
+def _csv_chunks(items: List[Any]) -> Iterator[str]:
+    """The CSV lines of data points, joined per `csv_io.CHUNK_ROWS` points."""
+    for start in range(0, len(items), csv_io.CHUNK_ROWS):
+        chunk = items[start : start + csv_io.CHUNK_ROWS]
+        yield "".join([f"{item.csv_line()}\n" for item in chunk])
+
+
+def to_datetimes(
+    timestamp: np.ndarray, utc: bool, tz: datetime.timezone = datetime.timezone.utc
+) -> List[datetime.datetime]:
+    """
+    Converts datetime64[us] timestamps into datetimes, aware if `utc` (the
+    timestamps are in UTC and returned at the UTC offset `tz`).
+    """
+    timestamp = timestamp.astype("datetime64[us]")
+    if not utc:
+        return timestamp.tolist()
+    offset = tz.utcoffset(None) // datetime.timedelta(microseconds=1)
+    return [
+        t.replace(tzinfo=tz)
+        for t in (timestamp + np.timedelta64(offset, "us")).tolist()
+    ]
+
+
+def common_timezone(timestamps: Sequence[datetime.datetime]) -> datetime.timezone:
+    """The UTC offset shared by aware timestamps, UTC if they differ."""
+    offsets = {t.utcoffset() for t in timestamps}
+    if len(offsets) == 1 and None not in offsets:
+        return datetime.timezone(offsets.pop())
+    return datetime.timezone.utc
+
+
+def to_datetime64(timestamp: datetime.datetime) -> np.datetime64:
+    """Converts a timestamp to datetime64 in UTC (naive ones are kept as they are)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return np.datetime64(timestamp, "us")
+
+
+def to_epoch_seconds(timestamp: datetime.datetime) -> float:
+    """Epoch seconds of a timestamp, naive timestamps are taken as UTC."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return timestamp.timestamp()
+
+
+class ColumnarWeatherData(BaseModel):
+    """
+    Weather data as columns (struct of arrays) instead of a list of points: the
+    timestamps as datetime64[us] and the temperature, humidity and wind speed
+    as float64 arrays, sorted by time. Accepted by `preprocess` (and hence
+    `compute`) like WeatherData, without creating an object per data point.
+
+    The constructor validates the columns: it converts them to these dtypes,
+    checks their lengths and sorts them. `trusted` skips all of that, for
+    producers which already hold sorted arrays of the right dtypes.
+
+    Timezone-aware timestamps are stored in UTC, `utc` records this so that
+    the timestamps handed out (e.g. the start time) are aware again, at the UTC
+    offset `tz` of the source (e.g. "+02:00" of a CSV file whose timestamps all
+    have it).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    timestamp: np.ndarray
+    temperature: np.ndarray
+    humidity: np.ndarray
+    wind_speed: np.ndarray
+    utc: bool = True
+    tz: datetime.timezone = datetime.timezone.utc
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, values: Any) -> Any:
+        """Converts, checks and sorts the columns."""
+        if not isinstance(values, dict):
+            return values
+        values = dict(values)
+        timestamp = values["timestamp"]
+        if len(timestamp) and isinstance(timestamp[0], datetime.datetime):
+            values.setdefault("utc", timestamp[0].tzinfo is not None)
+            if values["utc"]:
+                values.setdefault("tz", common_timezone(timestamp))
+            timestamp = [to_datetime64(t) for t in timestamp]
+        timestamp = np.asarray(timestamp, dtype="datetime64[us]")
+        columns = [
+            np.asarray(values[name], dtype=float)
+            for name in ("temperature", "humidity", "wind_speed")
+        ]
+        if timestamp.ndim != 1 or any(c.shape != timestamp.shape for c in columns):
+            raise ValueError("Weather columns must be 1-D arrays of equal length.")
+
+        if np.any(timestamp[1:] < timestamp[:-1]):
+            order = np.argsort(timestamp, kind="stable")
+            timestamp = timestamp[order]
+            columns = [c[order] for c in columns]
+        values.update(
+            timestamp=timestamp,
+            temperature=columns[0],
+            humidity=columns[1],
+            wind_speed=columns[2],
+        )
+        return values
+
+    @classmethod
+    def trusted(
+        cls,
+        timestamp: np.ndarray,
+        temperature: np.ndarray,
+        humidity: np.ndarray,
+        wind_speed: np.ndarray,
+        utc: bool = True,
+        tz: datetime.timezone = datetime.timezone.utc,
+    ) -> ColumnarWeatherData:
+        """
+        Wraps the given columns without validation or copies. The caller
+        guarantees sorted datetime64[us] timestamps and float64 columns of the
+        same length.
+        """
+        return cls.model_construct(
+            timestamp=timestamp,
+            temperature=temperature,
+            humidity=humidity,
+            wind_speed=wind_speed,
+            utc=utc,
+            tz=tz,
+        )
+
+    @classmethod
+    def from_weather_data(cls, wd: WeatherData) -> ColumnarWeatherData:
+        """Converts a list of data points into columns."""
+        sorted_data = sorted(wd.data, key=lambda x: x.timestamp)
+        utc = bool(sorted_data) and sorted_data[0].timestamp.tzinfo is not None
+        return cls.trusted(
+            timestamp=np.array(
+                [to_datetime64(p.timestamp) for p in sorted_data],
+                dtype="datetime64[us]",
+            ),
+            temperature=np.array([p.temperature for p in sorted_data], dtype=float),
+            humidity=np.array([p.humidity for p in sorted_data], dtype=float),
+            wind_speed=np.array([p.wind_speed for p in sorted_data], dtype=float),
+            utc=utc,
+            tz=(
+                common_timezone([p.timestamp for p in sorted_data])
+                if utc
+                else datetime.timezone.utc
+            ),
+        )
+
+    def to_weather_data(self) -> WeatherData:
+        """Converts the columns into a list of data points."""
+        return WeatherData(
+            data=[
+                WeatherDataPoint(
+                    timestamp=self.to_datetime(timestamp),
+                    temperature=temperature,
+                    humidity=humidity,
+                    wind_speed=wind_speed,
+                )
+                for timestamp, temperature, humidity, wind_speed in zip(
+                    self.timestamp,
+                    self.temperature.tolist(),
+                    self.humidity.tolist(),
+                    self.wind_speed.tolist(),
+                )
+            ]
+        )
+
+    def __len__(self) -> int:
+        """Returns the number of data points."""
+        return len(self.timestamp)
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the timestamp, temperature, humidity and wind speed columns."""
+        return self.timestamp, self.temperature, self.humidity, self.wind_speed
+
+    def to_datetime(self, timestamp: np.datetime64) -> datetime.datetime:
+        """Converts one of the timestamps into a datetime."""
+        result = timestamp.astype("datetime64[us]").astype(datetime.datetime)
+        if not self.utc:
+            return result
+        return result.replace(tzinfo=datetime.timezone.utc).astimezone(self.tz)
+
+    @property
+    def start_time(self) -> datetime.datetime:
+        """Timestamp of the first data point."""
+        return self.to_datetime(self.timestamp[0])
+
+    @property
+    def end_time(self) -> datetime.datetime:
+        """Timestamp of the last data point."""
+        return self.to_datetime(self.timestamp[-1])
+
+    def slice(
+        self, start: int | None = None, stop: int | None = None
+    ) -> ColumnarWeatherData:
+        """Returns the data points [start, stop) as views of the columns."""
+        return ColumnarWeatherData.trusted(
+            *(column[start:stop] for column in self.columns()),
+            utc=self.utc,
+            tz=self.tz,
+        )
+
+    def elapsed_seconds(self, start_time: datetime.datetime) -> np.ndarray:
+        """
+        Returns the seconds (float64) from `start_time` to every timestamp, as
+        `(timestamp - start_time).total_seconds()` does for datetimes.
+        """
+        microseconds = (self.timestamp - to_datetime64(start_time)).astype(np.int64)
+        return microseconds / 1e6
+
+    @classmethod
+    def read_csv(
+        cls, src: Path, chunk_bytes: int = csv_io.CHUNK_BYTES
+    ) -> ColumnarWeatherData:
+        """
+        Reads a CSV file of weather data straight into columns, in blocks of
+        `chunk_bytes` (see `csv_io`).
+
+        Raises:
+            ValueError: If a line does not have the expected format.
+        """
+        chunk = csv_io.read_csv_columns(src, 3, chunk_bytes)
+        return cls(
+            timestamp=chunk.timestamp,
+            temperature=chunk.values[:, 0],
+            humidity=chunk.values[:, 1],
+            wind_speed=chunk.values[:, 2],
+            utc=chunk.utc,
+            tz=chunk.tz,
+        )
+
+    @classmethod
+    def iter_csv(
+        cls, src: Path, chunk_bytes: int = csv_io.CHUNK_BYTES
+    ) -> Iterator[ColumnarWeatherData]:
+        """
+        Reads a CSV file of weather data in blocks of `chunk_bytes`, one
+        ColumnarWeatherData per block (sorted within the block), so that only
+        one block is held in memory at a time.
+        """
+        for chunk in csv_io.iter_csv_chunks(src, 3, chunk_bytes):
+            yield cls(
+                timestamp=chunk.timestamp,
+                temperature=chunk.values[:, 0],
+                humidity=chunk.values[:, 1],
+                wind_speed=chunk.values[:, 2],
+                utc=chunk.utc,
+                tz=chunk.tz,
+            )
+
+    def write_csv(
+        self, target: Path | IO[str], chunk_rows: int = csv_io.CHUNK_ROWS
+    ) -> None:
+        """
+        Writes the data to a CSV file (or text handle) as WeatherData does,
+        formatting `chunk_rows` rows per write.
+        """
+        csv_io.write_csv(
+            target,
+            WeatherDataPoint.csv_header(),
+            csv_io.iter_formatted_rows(
+                self.timestamp, self.columns()[1:], self.utc, chunk_rows, self.tz
+            ),
+        )
 
 
 class FireRisk(BaseModel):
@@ -88,10 +375,29 @@ class FireRisk(BaseModel):
         return f"{self.timestamp.isoformat()},{self.ttf}"
 
 
+class ModelState(BaseModel):
+    """
+    The state of the fire risk model at a point in time, which can be used as
+    the initial condition of a subsequent simulation (warm start).
+    """
+
+    timestamp: datetime.datetime
+    # fmc of the wooden panel layers, from the interior surface to the backside
+    wall: list[float]
+    # bulk air (in-home) water concentration and relative humidity
+    cw_in: float
+    rh_in: float
+    # water concentration contribution from the wooden surfaces in the last step
+    # of the explicit scheme (parameters.delta_t), whichever solver ran
+    c_wall: float
+
+
 class FireRiskPrediction(BaseModel):
     """A collection of fire risk predictions."""
 
     firerisks: list[FireRisk]
+    # model state at the end of the simulated window
+    state: ModelState | None = None
 
     def __str__(self) -> str:
         """Returns the string representation of the data."""
@@ -100,10 +406,51 @@ class FireRiskPrediction(BaseModel):
         )
 
     def write_csv(self, target: Path) -> None:
-        """Writes the data to a CSV file."""
-        with open(target, "w+") as handle:
-            handle.write(FireRisk.csv_header())
-            handle.write("\n")
-            for r in self.firerisks:
-                handle.write(r.csv_line())
-                handle.write("\n")
+        """Writes the data to a CSV file, `CHUNK_ROWS` lines per write."""
+        csv_io.write_csv(
+            target,
+            FireRisk.csv_header(),
+            _csv_chunks(self.firerisks),
+        )
+
+    @classmethod
+    def read_csv(cls, src: Path) -> FireRiskPrediction:
+        """
+        Reads fire risks written by `write_csv`, parsed in blocks of
+        `csv_io.CHUNK_BYTES` (timestamps at their UTC offset as in
+        `WeatherData.iter_csv`).
+        """
+        firerisks = []
+        for chunk in csv_io.iter_csv_chunks(src, 1):
+            timestamps = to_datetimes(chunk.timestamp, chunk.utc, chunk.tz)
+            firerisks.extend(
+                FireRisk(timestamp=timestamp, ttf=ttf)
+                for timestamp, ttf in zip(timestamps, chunk.values[:, 0].tolist())
+            )
+        return FireRiskPrediction(firerisks=firerisks)
+
+
+class BatchFireRiskPrediction(BaseModel):
+    """Fire risk predictions for several zones sharing a common time axis."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    timestamps: list[datetime.datetime]
+    # rows represent zones, columns represent the timestamps
+    ttf: np.ndarray
+    # model state per zone at the end of the simulated window
+    states: list[ModelState] | None = None
+
+    def __len__(self) -> int:
+        """Returns the number of zones in the batch."""
+        return self.ttf.shape[0]
+
+    def prediction(self, zone_index: int) -> FireRiskPrediction:
+        """Returns the FireRiskPrediction of a single zone."""
+        return FireRiskPrediction(
+            firerisks=[
+                FireRisk(timestamp=ts, ttf=ttf)
+                for ts, ttf in zip(self.timestamps, self.ttf[zone_index].tolist())
+            ],
+            state=self.states[zone_index] if self.states else None,
+        )
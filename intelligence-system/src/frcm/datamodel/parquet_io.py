@@ -0,0 +1,334 @@
+"""
+Apache Parquet I/O of the datamodel, for bulk backfills and analytics.
+
+The files hold the same columns as the CSV files ("timestamp,temperature,
+humidity,wind_speed" for weather data, "timestamp,ttf" for fire risks), the
+timestamps as timestamp[us] (with time zone UTC for aware timestamps) and the
+values as float64 (nulls are read as NaN). Every row group is read straight
+into numpy arrays:
+
+- `iter_weather` and `iter_columns` stream a file one row group at a time,
+  so that the memory stays bounded by the row group size,
+- only the requested columns are read (column projection), other columns of
+  the file (e.g. added by analysis tools) are skipped.
+
+Several zones are stored as a directory partitioned by geohash, in the hive
+layout that pyarrow, pandas, DuckDB and Spark read as one dataset:
+
+    zones/geohash=u4pru/part-0.parquet
+    zones/geohash=u4prv/part-0.parquet
+
+`write_weather_zones` and `read_weather_zones` exchange the weather data of
+`compute_batch`, `write_risk_zones` and `read_risk_zones` its results.
+
+Requires pyarrow, of the optional `parquet` extra (uv sync --extra parquet).
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from frcm.datamodel import model as dm
+
+# pyarrow, imported on first use (see `_require_pyarrow`)
+pa = ds = pq = None
+
+# Rows per row group of the files written
+ROW_GROUP_ROWS = 1 << 17
+
+WEATHER_COLUMNS = ("temperature", "humidity", "wind_speed")
+FIRE_RISK_COLUMNS = ("ttf",)
+# Name of the partition column (directory level) of multi-zone files
+ZONE_COLUMN = "geohash"
+
+
+def _require_pyarrow() -> None:
+    """
+    Imports pyarrow on first use, so that reading CSV files does not load it
+    (and start its thread pools, which forked worker processes inherit).
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    global pa, ds, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Parquet I/O requires pyarrow: install the parquet extra"
+            " (uv sync --extra parquet)"
+        ) from e
+    pa, ds, pq = pyarrow, pyarrow.dataset, pyarrow.parquet
+
+
+def _table(timestamp: np.ndarray, utc: bool, columns: Mapping[str, np.ndarray]) -> Any:
+    """A pyarrow table of a datetime64[us] timestamp column and float columns."""
+    arrays = {
+        "timestamp": pa.array(
+            timestamp, type=pa.timestamp("us", tz="UTC" if utc else None)
+        )
+    }
+    for name, values in columns.items():
+        arrays[name] = pa.array(np.asarray(values, dtype=float), type=pa.float64())
+    return pa.table(arrays)
+
+
+def _arrays(table: Any, columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    The timestamp (datetime64[us], in UTC if aware) and the given float
+    columns of a pyarrow table as numpy arrays, and whether the timestamps
+    are aware ("utc").
+
+    Raises:
+        ValueError: If a column is missing.
+    """
+    missing = [c for c in ("timestamp", *columns) if c not in table.column_names]
+    if missing:
+        raise ValueError(f"Parquet data has no column {missing[0]!r}")
+    timestamp = table.column("timestamp")
+    if not pa.types.is_timestamp(timestamp.type):
+        raise ValueError(f"Parquet column 'timestamp' has type {timestamp.type}")
+    result = {
+        "timestamp": timestamp.to_numpy().astype("datetime64[us]"),
+        "utc": timestamp.type.tz is not None,
+    }
+    for name in columns:
+        result[name] = table.column(name).to_numpy().astype(float)
+    return result
+
+
+def write_columns(
+    target: Path,
+    timestamp: np.ndarray,
+    columns: Mapping[str, np.ndarray],
+    utc: bool = True,
+    row_group_rows: int = ROW_GROUP_ROWS,
+) -> None:
+    """
+    Writes a timestamp column and float columns to a Parquet file, in row
+    groups of `row_group_rows` rows.
+    """
+    _require_pyarrow()
+    pq.write_table(
+        _table(timestamp, utc, columns), target, row_group_size=row_group_rows
+    )
+
+
+def iter_columns(src: Path, columns: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Reads the timestamp and the given columns of a Parquet file one row group
+    at a time, as numpy arrays (timestamps as datetime64[us], in UTC if
+    aware) keyed by column name, with "utc" telling whether they are aware.
+
+    Raises:
+        ValueError: If a column is missing.
+    """
+    _require_pyarrow()
+    parquet_file = pq.ParquetFile(src)
+    for index in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(index, columns=["timestamp", *columns])
+        yield _arrays(table, columns)
+
+
+def _weather(arrays: Mapping[str, Any]) -> dm.ColumnarWeatherData:
+    return dm.ColumnarWeatherData(
+        timestamp=arrays["timestamp"],
+        temperature=arrays["temperature"],
+        humidity=arrays["humidity"],
+        wind_speed=arrays["wind_speed"],
+        utc=arrays["utc"],
+    )
+
+
+def _weather_columns(
+    wd: dm.WeatherData | dm.ColumnarWeatherData,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray], bool]:
+    """
+    The timestamps, weather columns and whether the timestamps are aware, in
+    the order of the data points.
+    """
+    if isinstance(wd, dm.ColumnarWeatherData):
+        timestamp, *columns = wd.columns()
+        return timestamp, dict(zip(WEATHER_COLUMNS, columns)), wd.utc
+    timestamp = np.array(
+        [dm.to_datetime64(p.timestamp) for p in wd.data], dtype="datetime64[us]"
+    )
+    columns = {
+        name: np.array([getattr(p, name) for p in wd.data], dtype=float)
+        for name in WEATHER_COLUMNS
+    }
+    return timestamp, columns, bool(wd.data) and wd.data[0].timestamp.tzinfo is not None
+
+
+def write_weather(
+    wd: dm.WeatherData | dm.ColumnarWeatherData,
+    target: Path,
+    row_group_rows: int = ROW_GROUP_ROWS,
+) -> None:
+    """Writes weather data to a Parquet file, see `write_columns`."""
+    timestamp, columns, utc = _weather_columns(wd)
+    write_columns(target, timestamp, columns, utc, row_group_rows)
+
+
+def iter_weather(src: Path) -> Iterator[dm.ColumnarWeatherData]:
+    """
+    Reads the weather data of a Parquet file one row group at a time (each
+    sorted by time), reading only the weather columns.
+
+    Raises:
+        ValueError: If a weather column is missing.
+    """
+    for arrays in iter_columns(src, WEATHER_COLUMNS):
+        yield _weather(arrays)
+
+
+def read_weather(src: Path) -> dm.ColumnarWeatherData:
+    """Reads the weather data of a Parquet file, see `iter_weather`."""
+    _require_pyarrow()
+    table = pq.read_table(src, columns=["timestamp", *WEATHER_COLUMNS])
+    return _weather(_arrays(table, WEATHER_COLUMNS))
+
+
+def _fire_risks(arrays: Mapping[str, Any]) -> dm.FireRiskPrediction:
+    timestamps = dm.to_datetimes(arrays["timestamp"], arrays["utc"])
+    return dm.FireRiskPrediction(
+        firerisks=[
+            dm.FireRisk(timestamp=timestamp, ttf=ttf)
+            for timestamp, ttf in zip(timestamps, arrays["ttf"].tolist())
+        ]
+    )
+
+
+def write_fire_risks(
+    risks: dm.FireRiskPrediction,
+    target: Path,
+    row_group_rows: int = ROW_GROUP_ROWS,
+) -> None:
+    """
+    Writes fire risks to a Parquet file, see `write_columns`. The model state
+    is not stored.
+    """
+    timestamps = [r.timestamp for r in risks.firerisks]
+    write_columns(
+        target,
+        np.array([dm.to_datetime64(t) for t in timestamps], dtype="datetime64[us]"),
+        {"ttf": np.array([r.ttf for r in risks.firerisks], dtype=float)},
+        utc=bool(timestamps) and timestamps[0].tzinfo is not None,
+        row_group_rows=row_group_rows,
+    )
+
+
+def read_fire_risks(src: Path) -> dm.FireRiskPrediction:
+    """
+    Reads fire risks written by `write_fire_risks` (aware timestamps in UTC).
+
+    Raises:
+        ValueError: If the ttf column is missing.
+    """
+    _require_pyarrow()
+    table = pq.read_table(src, columns=["timestamp", *FIRE_RISK_COLUMNS])
+    return _fire_risks(_arrays(table, FIRE_RISK_COLUMNS))
+
+
+def _zone_dir(root: Path, geohash: str) -> Path:
+    return Path(root) / f"{ZONE_COLUMN}={geohash}"
+
+
+def _zone_tables(
+    src: Path, columns: Sequence[str], geohashes: Sequence[str] | None
+) -> Iterator[Tuple[str, Any]]:
+    """
+    The tables of the zones of a partitioned directory (all zones, or the
+    given ones in this order), with the given columns.
+
+    Raises:
+        ValueError: If a given zone is missing.
+    """
+    _require_pyarrow()
+    if geohashes is None:
+        prefix = f"{ZONE_COLUMN}="
+        geohashes = sorted(
+            p.name[len(prefix) :]
+            for p in Path(src).iterdir()
+            if p.is_dir() and p.name.startswith(prefix)
+        )
+    for geohash in geohashes:
+        zone_dir = _zone_dir(src, geohash)
+        if not zone_dir.is_dir():
+            raise ValueError(f"Parquet dataset {src} has no zone {geohash!r}")
+        # any number of files per zone, e.g. appended by other tools
+        dataset = ds.dataset(zone_dir, format="parquet")
+        yield geohash, dataset.to_table(columns=["timestamp", *columns])
+
+
+def write_weather_zones(
+    target: Path,
+    zones: Mapping[str, dm.WeatherData | dm.ColumnarWeatherData],
+    row_group_rows: int = ROW_GROUP_ROWS,
+) -> None:
+    """Writes the weather data of several zones, partitioned by geohash."""
+    for geohash, wd in zones.items():
+        zone_dir = _zone_dir(target, geohash)
+        zone_dir.mkdir(parents=True, exist_ok=True)
+        write_weather(wd, zone_dir / "part-0.parquet", row_group_rows)
+
+
+def read_weather_zones(
+    src: Path, geohashes: Sequence[str] | None = None
+) -> Dict[str, dm.ColumnarWeatherData]:
+    """
+    Reads the weather data of the zones of a directory partitioned by geohash
+    (all zones, or the given ones), e.g. as input of `compute_batch`.
+
+    Raises:
+        ValueError: If a given zone or a weather column is missing.
+    """
+    return {
+        geohash: _weather(_arrays(table, WEATHER_COLUMNS))
+        for geohash, table in _zone_tables(src, WEATHER_COLUMNS, geohashes)
+    }
+
+
+def write_risk_zones(
+    target: Path,
+    geohashes: Sequence[str],
+    batch: dm.BatchFireRiskPrediction,
+    row_group_rows: int = ROW_GROUP_ROWS,
+) -> None:
+    """
+    Writes the fire risks of a batch (one zone per row of `batch.ttf`, in the
+    order of `geohashes`), partitioned by geohash.
+    """
+    if len(geohashes) != len(batch):
+        raise ValueError(f"{len(geohashes)} geohashes for {len(batch)} zones")
+    timestamp = np.array(
+        [dm.to_datetime64(t) for t in batch.timestamps], dtype="datetime64[us]"
+    )
+    utc = bool(batch.timestamps) and batch.timestamps[0].tzinfo is not None
+    for geohash, ttf in zip(geohashes, batch.ttf):
+        zone_dir = _zone_dir(target, geohash)
+        zone_dir.mkdir(parents=True, exist_ok=True)
+        write_columns(
+            zone_dir / "part-0.parquet", timestamp, {"ttf": ttf}, utc, row_group_rows
+        )
+
+
+def read_risk_zones(
+    src: Path, geohashes: Sequence[str] | None = None
+) -> Dict[str, dm.FireRiskPrediction]:
+    """
+    Reads the fire risks of the zones of a directory partitioned by geohash
+    (all zones, or the given ones).
+
+    Raises:
+        ValueError: If a given zone or the ttf column is missing.
+    """
+    return {
+        geohash: _fire_risks(_arrays(table, FIRE_RISK_COLUMNS))
+        for geohash, table in _zone_tables(src, FIRE_RISK_COLUMNS, geohashes)
+    }
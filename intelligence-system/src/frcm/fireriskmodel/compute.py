@@ -1,24 +1,245 @@
 import datetime
-from typing import List, Tuple
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence, Tuple
 
 import numpy as np
 
 import frcm.datamodel.model as dm
+import frcm.fireriskmodel.lookup as lk
 import frcm.fireriskmodel.parameters as mp
 import frcm.fireriskmodel.preprocess as pp
 import frcm.fireriskmodel.utils as func
+from frcm.fireriskmodel.implicit import compute_fr_implicit
+from frcm.fireriskmodel.state import (
+    KernelState,
+    initial_kernel_state,
+    to_kernel_state,
+    to_model_state,
+)
+from frcm.profiling import stage
 
+# Signature shared by the fire risk kernels:
+# (temp_c_out, rh_out, initial_state=None, return_state=False)
+#   -> (rh_in, ttf) or (rh_in, ttf, final_state) if return_state is set
+Kernel = Callable[..., Tuple]
 
-def compute(wd: dm.WeatherData) -> dm.FireRiskPrediction:
+
+class KernelBackend(NamedTuple):
+    """A kernel of the registry, with the properties needed to run it."""
+
+    kernel: Kernel
+    # whether the kernel takes a batch (zones x time) instead of a single series
+    batched: bool = False
+    # name of the timestep of the kernel in `parameters`
+    delta_t: str = "delta_t"
+    # whether the kernel takes injected building parameters (`params`)
+    takes_params: bool = False
+
+
+# Registry of the interchangeable kernels by name, see select_kernel
+KERNELS: Dict[str, KernelBackend] = {}
+
+# Thresholds of the "auto" selection, from measurements of the kernels: the
+# reference kernel has the least overhead for very short series, the vectorized
+# kernel is fastest per zone and the batched kernel pays off from a few zones
+AUTO_MIN_VECTORIZED_STEPS = 4
+AUTO_MIN_BATCH_ZONES = 8
+
+
+def steps_per_hour(step: int) -> int:
+    """
+    Returns the number of timesteps of `step` seconds per hour, the stride of
+    the hourly output of the kernels.
+
+    Raises:
+        ValueError: If the timestep does not divide an hour, so that the output
+            would not be hourly (and the reported hours would be off).
+    """
+    if step <= 0 or 3600 % step:
+        raise ValueError(f"FRCM timestep of {step} s does not divide an hour")
+    return 3600 // step
+
+
+def register_kernel(
+    name: str,
+    kernel: Kernel,
+    batched: bool = False,
+    delta_t: str = "delta_t",
+    takes_params: bool = False,
+) -> None:
+    """
+    Adds a kernel to the registry (or replaces one), e.g. to roll out an
+    optimised implementation under a new name.
+
+    Args:
+        name: Name to select the kernel by.
+        kernel: The kernel, with the signature described by `Kernel`.
+        batched: Whether it takes a batch (zones x time) of series.
+        delta_t: Name of its timestep in `parameters`.
+        takes_params: Whether it takes building parameters as `params`.
+    """
+    KERNELS[name] = KernelBackend(kernel, batched, delta_t, takes_params)
+
+
+def select_kernel(
+    name: str | None = None,
+    zones: int = 1,
+    steps: int | None = None,
+    params: bool = False,
+) -> KernelBackend:
+    """
+    Selects a kernel from the registry.
+
+    Args:
+        name: Name of the kernel, defaults to "auto". "auto" uses the implicit
+            solver if `mp.wall_solver` is "implicit", and otherwise picks the
+            fastest explicit kernel for the given input size.
+        zones: Number of series simulated together.
+        steps: Number of timesteps per series, if known.
+        params: Whether building parameters are injected, "auto" then only
+            picks kernels taking them.
+
+    Raises:
+        ValueError: If there is no kernel with the given name, or it does not
+            take building parameters although `params` is set.
+    """
+    if name is None:
+        name = "auto"
+
+    if name == "auto":
+        if mp.wall_solver == "implicit" and not params:
+            name = "implicit"
+        elif zones >= AUTO_MIN_BATCH_ZONES:
+            name = "batched"
+        elif steps is not None and steps < AUTO_MIN_VECTORIZED_STEPS and not params:
+            name = "reference"
+        else:
+            name = "vectorized"
+
+    if name not in KERNELS:
+        raise ValueError(
+            f"Unknown FRCM kernel '{name}', available: auto, {', '.join(KERNELS)}"
+        )
+    if params and not KERNELS[name].takes_params:
+        raise ValueError(f"FRCM kernel '{name}' does not take building parameters")
+    return KERNELS[name]
+
+
+def run_kernel(
+    backend: KernelBackend,
+    temp_c_out: np.ndarray,
+    rh_out: np.ndarray,
+    initial_state: KernelState | None = None,
+    **kernel_args: Any,
+) -> Tuple[np.ndarray, np.ndarray, KernelState]:
+    """
+    Runs a kernel on a single series (time) or a batch of series (zones x
+    time), adapting the input to what the kernel takes: single-zone kernels
+    run row by row, batched kernels get a single series as a batch of one.
+
+    Returns:
+        A tuple of rh_in, ttf and the final KernelState, shaped like the input.
+    """
+    if np.ndim(temp_c_out) == 1 and backend.batched:
+        if initial_state is not None:
+            initial_state = KernelState(
+                np.asarray(initial_state.wall, dtype=float)[None],
+                np.array([initial_state.cw_in], dtype=float),
+                np.array([initial_state.c_wall], dtype=float),
+            )
+        rh_in, ttf, state = backend.kernel(
+            np.asarray(temp_c_out)[None],
+            np.asarray(rh_out)[None],
+            initial_state=initial_state,
+            return_state=True,
+            **kernel_args,
+        )
+        return (
+            rh_in[0],
+            ttf[0],
+            KernelState(state.wall[0], state.cw_in[0], state.c_wall[0]),
+        )
+
+    if np.ndim(temp_c_out) == 2 and not backend.batched:
+        rows = []
+        for row in range(len(temp_c_out)):
+            row_state = None
+            if initial_state is not None:
+                row_state = KernelState(
+                    initial_state.wall[row],
+                    initial_state.cw_in[row],
+                    initial_state.c_wall[row],
+                )
+            rows.append(
+                backend.kernel(
+                    temp_c_out[row],
+                    rh_out[row],
+                    initial_state=row_state,
+                    return_state=True,
+                    **kernel_args,
+                )
+            )
+        states = [state for _, _, state in rows]
+        return (
+            np.stack([np.asarray(rh_in) for rh_in, _, _ in rows]),
+            np.stack([np.asarray(ttf) for _, ttf, _ in rows]),
+            KernelState(
+                np.stack([state.wall for state in states]),
+                np.array([state.cw_in for state in states], dtype=float),
+                np.array([state.c_wall for state in states], dtype=float),
+            ),
+        )
+
+    return backend.kernel(
+        temp_c_out,
+        rh_out,
+        initial_state=initial_state,
+        return_state=True,
+        **kernel_args,
+    )
+
+
+def compute(
+    wd: dm.WeatherData | dm.ColumnarWeatherData,
+    kernel: Kernel | str | None = None,
+    horizon_hours: float | None = None,
+    initial_state: dm.ModelState | None = None,
+    params: mp.ParameterSet | None = None,
+) -> dm.FireRiskPrediction:
     """
     Computes the fire risk based on weather data.
 
     Args:
-        wd: WeatherData object containing temperature, humidity, and wind speed.
+        wd: WeatherData (or ColumnarWeatherData) containing temperature,
+            humidity, and wind speed.
+        kernel: The kernel computing RH_in and TTF from the interpolated series,
+            either a function or the name of a registered kernel (see
+            `select_kernel`). Defaults to "auto".
+        horizon_hours: Limits the simulation to the given number of hours after
+            the start. Defaults to the whole span of the data.
+        initial_state: State of a previous simulation to continue from (warm
+            start). The simulation then starts at the timestamp of the state
+            instead of the first data point.
+        params: Building parameters to use instead of the module defaults in
+            `parameters`. "auto" then picks a kernel taking them (the reference
+            and implicit kernels only read the module defaults).
 
     Returns:
-        FireRiskPrediction object containing a list of fire risks.
+        FireRiskPrediction object containing a list of fire risks and the model
+        state at the end of the simulated window.
+
+    Raises:
+        ValueError: If the data does not extend beyond the initial state, or the
+            kernel is unknown or does not take the given parameters.
     """
+    if callable(kernel):
+        backend = KernelBackend(kernel, takes_params=params is not None)
+    else:
+        backend = select_kernel(kernel, params=params is not None)
+
+    # The implicit solver runs on its own, coarser time grid, injected
+    # parameters carry their own timestep
+    step = params.delta_t if params is not None else getattr(mp, backend.delta_t)
+
     # Get interpolated values
     # TODO (NOTE) The max_time_delta represents the largest gap in missing data
     # (seconds). It can be used to provide suited warning/error message.
@@ -29,57 +250,253 @@ def compute(wd: dm.WeatherData) -> dm.FireRiskPrediction:
         humidity_interpolated,
         wind_interpolated,
         max_time_delta,
-    ) = pp.preprocess(wd)
+    ) = pp.preprocess(
+        wd,
+        horizon_hours=horizon_hours,
+        start_time=initial_state.timestamp if initial_state else None,
+        delta_t=step,
+        variables=pp.KERNEL_VARIABLES,
+    )
+    if len(time_interpolated_sec) == 0:
+        raise ValueError("Weather data ends before the initial state.")
+
+    # "auto" may pick a different kernel (on the same time grid) by input size
+    if kernel is None or kernel == "auto":
+        backend = select_kernel(
+            kernel, steps=len(time_interpolated_sec), params=params is not None
+        )
 
     # Compute RH_in and TTF
-    rh_in, ttf = compute_fr(temp_interpolated, humidity_interpolated)
+    # the parameters are only passed on if given, so that any kernel works
+    # with the module defaults
+    kernel_args = {} if params is None else {"params": params}
+    with stage("kernel", size=len(temp_interpolated)):
+        rh_in, ttf, final_state = run_kernel(
+            backend,
+            temp_interpolated,
+            humidity_interpolated,
+            initial_state=to_kernel_state(initial_state) if initial_state else None,
+            **kernel_args,
+        )
 
     # Reduce data to once per hour, but the time is still given as seconds
     # Reduction factor, i.e., how many intervals per hour.
     # Default delta_t = 720 s, hence rf = 5.
-    rf = int(3600 / mp.delta_t)
+    rf = steps_per_hour(step)
     rh_in_hour = rh_in[::rf]  # Average is not computed, values are extracted per hour.
     ttf_in_hour = ttf[::rf]
     time_in_hour = time_interpolated_sec[
         ::rf
-    ]  # Time is still in seconds but given for every hour.
+    ].tolist()  # Time is still in seconds but given for every hour.
+
+    with stage("firerisks", size=len(ttf)):
+        # Create response according to datamodel
+        firerisks = []
+        for i in range(len(rh_in_hour)):
+            timestamps = start_time + datetime.timedelta(seconds=time_in_hour[i])
+            firerisk_i = dm.FireRisk(timestamp=timestamps, ttf=ttf_in_hour[i])
+            firerisks.append(firerisk_i)
 
-    # Create response according to datamodel
-    firerisks = []
-    for i in range(len(rh_in_hour)):
-        timestamps = start_time + datetime.timedelta(seconds=time_in_hour[i])
-        firerisk_i = dm.FireRisk(timestamp=timestamps, ttf=ttf_in_hour[i])
-        firerisks.append(firerisk_i)
+        end_time = start_time + datetime.timedelta(
+            seconds=int(time_interpolated_sec[-1])
+        )
+        state = to_model_state(final_state, rh_in[-1], end_time)
 
-    result = dm.FireRiskPrediction(firerisks=firerisks)
+        result = dm.FireRiskPrediction(firerisks=firerisks, state=state)
     return result
 
 
+def compute_batch(
+    wds: Sequence[dm.WeatherData | dm.ColumnarWeatherData],
+    horizon_hours: float | None = None,
+    initial_states: Sequence[dm.ModelState | None] | None = None,
+    kernel: str | None = None,
+) -> dm.BatchFireRiskPrediction:
+    """
+    Computes the fire risk for several zones in one batched simulation.
+
+    Args:
+        wds: WeatherData (or ColumnarWeatherData) objects, one per zone. All
+            series must cover the same time span, so that they share a common
+            interpolated time axis.
+        horizon_hours: Limits the simulation to the given number of hours after
+            the start. Defaults to the whole span of the data.
+        initial_states: Optional warm start state per zone (None for a cold
+            start), see `compute`. Zones start at the timestamp of their state,
+            which must coincide with the start of the other zones.
+        kernel: Name of the registered kernel to use, see `select_kernel`
+            (default "auto"). Single-zone kernels are run zone by zone.
+
+    Returns:
+        BatchFireRiskPrediction containing the hourly TTF matrix (zones x hours)
+        and the model state of every zone at the end of the simulated window.
+
+    Raises:
+        ValueError: If no data is given, the series are not aligned or the
+            kernel is unknown.
+    """
+    if len(wds) == 0:
+        raise ValueError("compute_batch requires at least one WeatherData object.")
+
+    if initial_states is None:
+        initial_states = [None] * len(wds)
+
+    backend = select_kernel(kernel, zones=len(wds))
+    step = getattr(mp, backend.delta_t)
+
+    preprocessed = [
+        pp.preprocess(
+            wd,
+            horizon_hours=horizon_hours,
+            start_time=state.timestamp if state else None,
+            delta_t=step,
+            variables=pp.KERNEL_VARIABLES,
+        )
+        for wd, state in zip(wds, initial_states)
+    ]
+    start_time = preprocessed[0][0]
+    if any(zone_start != start_time for zone_start, *_ in preprocessed[1:]):
+        raise ValueError("Batched weather series must share a common time axis.")
+
+    time_interpolated_sec, rh_in, ttf, final_state = run_batch(
+        backend,
+        [(p[1], p[2], p[3]) for p in preprocessed],
+        [to_kernel_state(state) if state else None for state in initial_states],
+    )
+
+    with stage("firerisks", size=ttf.size):
+        return batch_prediction(
+            start_time, time_interpolated_sec, step, rh_in, ttf, final_state
+        )
+
+
+def run_batch(
+    backend: KernelBackend,
+    series: Sequence[Tuple[Sequence[int], np.ndarray, np.ndarray]],
+    initial_states: Sequence[KernelState | None],
+) -> Tuple[Sequence[int], np.ndarray, np.ndarray, KernelState]:
+    """
+    Runs one batched simulation of preprocessed zones, the kernel part of
+    `compute_batch` for callers that preprocess the series themselves (see
+    `preprocess.interpolate_columns`).
+
+    Args:
+        backend: The kernel to run, see `select_kernel`.
+        series: Per zone the interpolated time axis (seconds after the common
+            start), temperature and humidity.
+        initial_states: Per zone the state to start from, None for the
+            default initial conditions.
+
+    Returns:
+        A tuple of the common time axis, the RH_in and TTF matrices (zones x
+        time) and the final state of all zones.
+
+    Raises:
+        ValueError: If the time axes differ or are empty.
+    """
+    time_interpolated_sec = series[0][0]
+    for zone_time_sec, *_ in series[1:]:
+        if len(zone_time_sec) != len(time_interpolated_sec):
+            raise ValueError("Batched weather series must share a common time axis.")
+    if len(time_interpolated_sec) == 0:
+        raise ValueError("Weather data ends before the initial state.")
+
+    temp_interpolated = np.stack([zone[1] for zone in series])
+    humidity_interpolated = np.stack([zone[2] for zone in series])
+
+    # Default initial conditions, overwritten for the zones with a warm start
+    batch_state = initial_kernel_state(len(series))
+    for row, state in enumerate(initial_states):
+        if state is not None:
+            batch_state.wall[row] = state.wall
+            batch_state.cw_in[row] = state.cw_in
+            batch_state.c_wall[row] = state.c_wall
+
+    # Compute RH_in and TTF for all zones at once
+    with stage("kernel", size=temp_interpolated.size):
+        rh_in, ttf, final_state = run_kernel(
+            backend, temp_interpolated, humidity_interpolated, initial_state=batch_state
+        )
+    return time_interpolated_sec, rh_in, ttf, final_state
+
+
+def batch_prediction(
+    start_time: datetime.datetime,
+    time_interpolated_sec: np.ndarray,
+    step: int,
+    rh_in: np.ndarray,
+    ttf: np.ndarray,
+    final_state: KernelState,
+) -> dm.BatchFireRiskPrediction:
+    """
+    Reduces the output of a batched kernel (rows x time) to hourly values and
+    collects the final model state of every row.
+    """
+    # Reduce data to once per hour, see compute()
+    rf = steps_per_hour(step)
+    time_in_hour = np.asarray(time_interpolated_sec)[::rf].tolist()
+    timestamps = [start_time + datetime.timedelta(seconds=t) for t in time_in_hour]
+
+    end_time = start_time + datetime.timedelta(seconds=int(time_interpolated_sec[-1]))
+    states = [
+        to_model_state(
+            KernelState(
+                final_state.wall[row], final_state.cw_in[row], final_state.c_wall[row]
+            ),
+            rh_in[row, -1],
+            end_time,
+        )
+        for row in range(len(rh_in))
+    ]
+
+    return dm.BatchFireRiskPrediction(
+        timestamps=timestamps, ttf=ttf[:, ::rf], states=states
+    )
+
+
 def compute_fr(
-    temp_c_out: List[float], rh_out: List[float]
-) -> Tuple[np.ndarray, np.ndarray]:
+    temp_c_out: List[float],
+    rh_out: List[float],
+    initial_state: KernelState | None = None,
+    return_state: bool = False,
+    lookup: bool | None = None,
+) -> Tuple:
     """
     Computes the fire risk (RH_in and TTF) based on outdoor temperature and humidity.
 
     Args:
         temp_c_out: List of outdoor temperatures in Celsius.
         rh_out: List of outdoor relative humidities.
+        initial_state: State to start from, defaults to `initial_kernel_state()`.
+        return_state: Whether to also return the state after the last timestep.
+        lookup: Evaluate the saturation and sorption formulas with the lookup
+            tables in `frcm.fireriskmodel.lookup`, defaults to
+            `mp.lookup_tables`.
 
     Returns:
         A tuple containing:
             - rh_in: numpy array of indoor relative humidities.
             - ttf: numpy array of Time To Flashover values.
+            - the final KernelState, only if return_state is set.
     """
+    if lookup is None:
+        lookup = mp.lookup_tables
+    calc_pwsat, calc_rhwall, calc_fmc = (
+        (lk.lookup_pwsat, lk.lookup_rhwall, lk.lookup_fmc)
+        if lookup
+        else (func.calc_pwsat, func.calc_rhwall, func.calc_fmc)
+    )
+
     # "Indoor temperature vector"
     # Potential future changes may involve dynamic in-home temperatures
     temp_c_in = [mp.T_c_in] * len(temp_c_out)
 
     # compute saturation vapor pressures and water concentrations, outdoor and indoor
     # w = water, sat = saturation
-    pw_sat_out = list(map(func.calc_pwsat, temp_c_out))
+    pw_sat_out = list(map(calc_pwsat, temp_c_out))
     cw_sat_out = list(map(func.calc_cwsat, pw_sat_out, temp_c_out))
     cw_out = list(map(func.calc_cw, rh_out, cw_sat_out))
-    pw_sat_in = list(map(func.calc_pwsat, temp_c_in))
+    pw_sat_in = list(map(calc_pwsat, temp_c_in))
     cw_sat_in = list(map(func.calc_cwsat, pw_sat_in, temp_c_in))
 
     # ventilation variables
@@ -99,7 +516,7 @@ def compute_fr(
     wall_vector = np.zeros(mp.sub_layers)
 
     # initial fmc value in wooden panels
-    initial_fmc = func.calc_fmc(mp.RH_in) * mp.rho_wood
+    initial_fmc = calc_fmc(mp.RH_in) * mp.rho_wood
 
     # placeholders
     # shall contain wooden surface fmc values
@@ -116,13 +533,22 @@ def compute_fr(
     c_wall = np.zeros(len(temp_c_out))
 
     # set initial conditions
-    wall[0] = [initial_fmc] * mp.sub_layers
-    surface[0] = func.calc_surf(wall[0][0], wall[0][1])
-    rh_wall[0] = func.calc_rhwall(surface[0])
-    rh_in[0] = mp.RH_in
-    cw_in[0] = mp.RH_in * cw_sat_in[0]
-    delta_c[0] = func.calc_deltac(rh_in[0], rh_wall[0], cw_sat_in[0])
-    c_wall[0] = func.calc_cwall(delta_c[0])
+    if initial_state is None:
+        wall[0] = [initial_fmc] * mp.sub_layers
+        surface[0] = func.calc_surf(wall[0][0], wall[0][1])
+        rh_wall[0] = calc_rhwall(surface[0])
+        rh_in[0] = mp.RH_in
+        cw_in[0] = mp.RH_in * cw_sat_in[0]
+        delta_c[0] = func.calc_deltac(rh_in[0], rh_wall[0], cw_sat_in[0])
+        c_wall[0] = func.calc_cwall(delta_c[0])
+    else:
+        # continue from a previous simulation
+        wall[0] = initial_state.wall
+        surface[0] = func.calc_surf(wall[0][0], wall[0][1])
+        rh_wall[0] = calc_rhwall(surface[0])
+        cw_in[0] = initial_state.cw_in
+        rh_in[0] = cw_in[0] / cw_sat_in[0]
+        c_wall[0] = initial_state.c_wall
 
     c_ac = list(map(func.calc_cac, beta, cw_out, temp_c_out, temp_c_in))
     c_supply = list(map(func.calc_csupply, supply))
@@ -146,7 +572,7 @@ def compute_fr(
         # update surface vector
         surface[i + 1] = func.calc_surf(wall[i + 1][0], wall[i + 1][1])
         # update rh_wall
-        rh_wall[i + 1] = func.calc_rhwall(surface[i + 1])
+        rh_wall[i + 1] = calc_rhwall(surface[i + 1])
         # update water concentration difference between bulk air and boundary layer
         delta_c[i + 1] = func.calc_deltac(rh_in[i], rh_wall[i], cw_sat_in[i])
         # update indoor water concentration
@@ -163,4 +589,235 @@ def compute_fr(
     fmc = list(map(lambda x: x * factor, surface))
     ttf = list(map(lambda y: 2 * np.exp(0.16 * y), fmc))
 
+    if return_state:
+        return rh_in, ttf, KernelState(wall[-1].copy(), cw_in[-1], c_wall[-1])
+    return rh_in, ttf
+
+
+def compute_fr_vectorized(
+    temp_c_out: np.ndarray,
+    rh_out: np.ndarray,
+    initial_state: KernelState | None = None,
+    return_state: bool = False,
+    params: func.Parameters = mp,
+    lookup: bool | None = None,
+) -> Tuple:
+    """
+    Vectorized variant of `compute_fr`.
+
+    The derived series (saturation, ventilation and supply terms) and the TTF are
+    evaluated as whole-array expressions. The panel moisture update is a single
+    matrix-vector product with the precomputed diffusion operator per timestep, so
+    the Python work per step does not grow with `mp.sub_layers`. Only the time
+    stepping itself, which is inherently sequential, runs as a Python loop.
+
+    Args:
+        temp_c_out: Array of outdoor temperatures in Celsius.
+        rh_out: Array of outdoor relative humidities.
+        initial_state: State to start from, defaults to `initial_kernel_state()`.
+        return_state: Whether to also return the state after the last timestep.
+        params: The model parameters, the module defaults or a (scalar)
+            ParameterSet.
+        lookup: Evaluate the saturation and sorption formulas with the lookup
+            tables in `frcm.fireriskmodel.lookup`, defaults to
+            `mp.lookup_tables`.
+
+    Returns:
+        A tuple containing:
+            - rh_in: numpy array of indoor relative humidities.
+            - ttf: numpy array of Time To Flashover values.
+            - the final KernelState, only if return_state is set.
+    """
+    if lookup is None:
+        lookup = mp.lookup_tables
+    calc_pwsat, calc_rhwall = (
+        (lk.lookup_pwsat, lk.lookup_rhwall)
+        if lookup
+        else (func.calc_pwsat, func.calc_rhwall)
+    )
+
+    temp_c_out = np.asarray(temp_c_out, dtype=float)
+    rh_out = np.asarray(rh_out, dtype=float)
+    steps = len(temp_c_out)
+
+    # Indoor temperature is constant, hence so is its saturation concentration
+    temp_c_in = float(params.T_c_in)
+    cw_sat_in = func.calc_cwsat(calc_pwsat(temp_c_in), temp_c_in, params)
+
+    # Outdoor concentrations and ventilation for the whole series at once
+    pw_sat_out = calc_pwsat(temp_c_out)
+    cw_sat_out = func.calc_cwsat(pw_sat_out, temp_c_out, params)
+    cw_out = func.calc_cw(rh_out, cw_sat_out)
+    beta = func.calc_beta(func.calc_ach(temp_c_out, temp_c_in, params), params)
+    c_ac = func.calc_cac(beta, cw_out, temp_c_out, temp_c_in)
+    c_supply = func.calc_csupply(
+        (params.supply_24h / (24 * 3600)) * params.delta_t, params
+    )
+
+    # Plain python floats in the loop avoid a numpy scalar per element access
+    beta_t = beta.tolist()
+    c_ac_t = c_ac.tolist()
+
+    operator = func.calc_wall_operator(params.sub_layers, params)
+    surface = np.zeros(steps)
+    rh_in = np.zeros(steps)
+
+    # set initial conditions, only the current wall state is kept
+    if initial_state is None:
+        initial_state = initial_kernel_state(params=params)
+    wall = np.array(initial_state.wall, dtype=float)
+    surface[0] = func.calc_surf(wall[0], wall[1])
+    rh_wall_i = calc_rhwall(surface[0], params)
+    cw_in_i = float(initial_state.cw_in)
+    rh_in_i = cw_in_i / cw_sat_in
+    c_wall_i = float(initial_state.c_wall)
+    rh_in[0] = rh_in_i
+
+    for i in range(steps - 1):
+        flux = func.calc_wall_flux(rh_in_i, rh_wall_i, cw_sat_in, params)
+        wall = operator @ wall
+        wall[0] += flux
+        c1, c2 = wall[:2].tolist()
+        surface_i = func.calc_surf(c1, c2)
+        surface[i + 1] = surface_i
+
+        # inputs from the previous timestep, see compute_fr
+        delta_c = func.calc_deltac(rh_in_i, rh_wall_i, cw_sat_in)
+        cw_in_i = func.calc_cwin(c_ac_t[i], c_wall_i, c_supply, cw_in_i, beta_t[i])
+        rh_in_i = cw_in_i / cw_sat_in
+        rh_wall_i = calc_rhwall(surface_i, params)
+        c_wall_i = func.calc_cwall(delta_c, params)
+        rh_in[i + 1] = rh_in_i
+
+    ttf = func.calc_ttf(surface, params)
+
+    if return_state:
+        return rh_in, ttf, KernelState(wall, cw_in_i, c_wall_i)
     return rh_in, ttf
+
+
+def compute_fr_batch(
+    temp_c_out: np.ndarray,
+    rh_out: np.ndarray,
+    initial_state: KernelState | None = None,
+    return_state: bool = False,
+    params: func.Parameters = mp,
+    dtype: np.dtype | str | None = None,
+    lookup: bool | None = None,
+) -> Tuple:
+    """
+    Batched variant of `compute_fr_vectorized` for several zones at once.
+
+    The wall state is a (zones x sub_layers) matrix and the indoor humidity a
+    vector over zones, so every timestep advances all zones with a few array
+    operations. With an array-valued ParameterSet every row is simulated with
+    its own parameter combination, see `frcm.fireriskmodel.sweep`.
+
+    Args:
+        temp_c_out: Matrix of outdoor temperatures in Celsius (zones x time).
+        rh_out: Matrix of outdoor relative humidities (zones x time).
+        initial_state: State to start from (one row/entry per zone), defaults to
+            `initial_kernel_state(zones)`.
+        return_state: Whether to also return the state after the last timestep.
+        params: The model parameters, the module defaults or a ParameterSet
+            (scalar or with one value per row).
+        dtype: Floating point type of the simulation, defaults to
+            `mp.precision`. All arrays and constants are converted to it, so
+            that numpy does not promote float32 operations to float64.
+        lookup: Evaluate the saturation and sorption formulas with the lookup
+            tables in `frcm.fireriskmodel.lookup`, defaults to
+            `mp.lookup_tables`.
+
+    Returns:
+        A tuple containing:
+            - rh_in: matrix of indoor relative humidities (zones x time).
+            - ttf: matrix of Time To Flashover values (zones x time).
+            - the final KernelState, only if return_state is set.
+    """
+    if lookup is None:
+        lookup = mp.lookup_tables
+    calc_pwsat, calc_rhwall = (
+        (lk.lookup_pwsat, lk.lookup_rhwall)
+        if lookup
+        else (func.calc_pwsat, func.calc_rhwall)
+    )
+
+    dtype = np.dtype(mp.precision if dtype is None else dtype)
+    temp_c_out = np.atleast_2d(np.asarray(temp_c_out, dtype=dtype))
+    rh_out = np.atleast_2d(np.asarray(rh_out, dtype=dtype))
+    zones, steps = temp_c_out.shape
+
+    # Per-row parameters are vectors over the rows, as columns they broadcast
+    # against the (zones x time) series
+    series_params = params
+    if isinstance(params, mp.ParameterSet):
+        params = params.astype(dtype)
+        series_params = params.column()
+
+    temp_c_in = np.asarray(params.T_c_in, dtype=dtype)
+    cw_sat_in = func.calc_cwsat(calc_pwsat(temp_c_in), temp_c_in, params)
+    cw_sat_in = np.asarray(cw_sat_in, dtype=dtype)
+
+    temp_c_in_col = np.asarray(series_params.T_c_in, dtype=dtype)
+    pw_sat_out = calc_pwsat(temp_c_out)
+    cw_sat_out = func.calc_cwsat(pw_sat_out, temp_c_out, series_params)
+    cw_out = func.calc_cw(rh_out, cw_sat_out)
+    beta = func.calc_beta(
+        func.calc_ach(temp_c_out, temp_c_in_col, series_params), series_params
+    )
+    c_ac = func.calc_cac(beta, cw_out, temp_c_out, temp_c_in_col)
+    c_supply = func.calc_csupply(
+        (params.supply_24h / (24 * 3600)) * params.delta_t, params
+    )
+    beta = beta.astype(dtype, copy=False)
+    c_ac = c_ac.astype(dtype, copy=False)
+    c_supply = np.asarray(c_supply, dtype=dtype)
+
+    # wall @ operator.T applies the operator to every zone row, per-row
+    # parameters give one operator per row
+    operator = func.calc_wall_operator(params.sub_layers, params)
+    operator_t = np.swapaxes(operator, -1, -2).astype(dtype)
+    surface = np.zeros((zones, steps), dtype=dtype)
+    rh_in = np.zeros((zones, steps), dtype=dtype)
+
+    if initial_state is None:
+        initial_state = initial_kernel_state(zones, params)
+    wall = np.array(initial_state.wall, dtype=dtype)
+    surface[:, 0] = func.calc_surf(wall[:, 0], wall[:, 1])
+    rh_wall_i = calc_rhwall(surface[:, 0], params)
+    cw_in_i = np.array(initial_state.cw_in, dtype=dtype)
+    rh_in_i = cw_in_i / cw_sat_in
+    c_wall_i = np.array(initial_state.c_wall, dtype=dtype)
+    rh_in[:, 0] = rh_in_i
+
+    for i in range(steps - 1):
+        flux = func.calc_wall_flux(rh_in_i, rh_wall_i, cw_sat_in, params)
+        if operator_t.ndim == 2:
+            wall = wall @ operator_t
+        else:
+            wall = np.matmul(wall[:, None, :], operator_t)[:, 0, :]
+        wall[:, 0] += flux
+        surface_i = func.calc_surf(wall[:, 0], wall[:, 1])
+        surface[:, i + 1] = surface_i
+
+        # inputs from the previous timestep, see compute_fr
+        delta_c = func.calc_deltac(rh_in_i, rh_wall_i, cw_sat_in)
+        cw_in_i = func.calc_cwin(c_ac[:, i], c_wall_i, c_supply, cw_in_i, beta[:, i])
+        rh_in_i = cw_in_i / cw_sat_in
+        rh_wall_i = calc_rhwall(surface_i, params)
+        c_wall_i = func.calc_cwall(delta_c, params)
+        rh_in[:, i + 1] = rh_in_i
+
+    ttf = func.calc_ttf(surface, series_params)
+
+    if return_state:
+        return rh_in, ttf, KernelState(wall, cw_in_i, c_wall_i)
+    return rh_in, ttf
+
+
+register_kernel("reference", compute_fr)
+register_kernel("vectorized", compute_fr_vectorized, takes_params=True)
+register_kernel("batched", compute_fr_batch, batched=True, takes_params=True)
+register_kernel(
+    "implicit", compute_fr_implicit, batched=True, delta_t="implicit_delta_t"
+)
@@ -0,0 +1,424 @@
+"""
+Golden-output harness for the FRCM kernels.
+
+A corpus of MET-like weather series, including edge cases (NaN gaps, sub-zero
+temperatures, saturated air, weather fronts, irregular sampling and long
+horizons), is simulated once with the reference kernel (compute_fr) and stored
+together with its input as golden RH_in and TTF trajectories. Any kernel, or a
+change to the preprocessing or the formulas in `utils`, is then checked
+against these trajectories:
+
+    python -m frcm.fireriskmodel.golden tests/golden/frcm_golden.npz
+
+prints the maximum and mean deviation of every registered kernel together with
+its speedup over the reference kernel, `--regenerate` rewrites the golden file
+from the synthetic corpus and `--add` appends recorded series (frcm CSV files).
+"""
+
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+import frcm.datamodel.model as dm
+import frcm.fireriskmodel.parameters as mp
+import frcm.fireriskmodel.preprocess as pp
+from frcm.fireriskmodel.compute import KERNELS, KernelBackend, run_kernel
+
+# Maximum absolute deviation from the golden trajectories per kernel,
+# (TTF in minutes, RH_in as a fraction). The explicit kernels only differ in the
+# order of the floating point operations, float32 drifts by about 1e-4 minutes
+# and the implicit solver carries its time discretisation error (hourly grid).
+# The lookup tables are bounded by the interpolation error of the tables.
+TOLERANCES: Dict[str, Tuple[float, float]] = {
+    "reference": (1e-9, 1e-11),
+    "vectorized": (1e-9, 1e-11),
+    "batched": (1e-9, 1e-11),
+    "batched-float32": (1e-3, 1e-4),
+    "implicit": (0.3, 0.03),
+    "batched-lookup": (1e-6, 1e-7),
+}
+
+# Kernels which are not registered on their own, but run a registered kernel
+# with extra arguments
+VARIANTS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "batched-float32": ("batched", {"dtype": np.float32}),
+    "batched-lookup": ("batched", {"lookup": True}),
+}
+
+
+class GoldenCase(NamedTuple):
+    """A weather series and its golden trajectories on the reference grid."""
+
+    weather: dm.WeatherData
+    # seconds since the first data point
+    time_sec: np.ndarray
+    rh_in: np.ndarray
+    ttf: np.ndarray
+
+
+class KernelAccuracy(NamedTuple):
+    """Deviation of a kernel from the golden trajectories over the corpus."""
+
+    kernel: str
+    # absolute TTF deviation (minutes) at the timesteps shared with the golden grid
+    max_abs_ttf: float
+    mean_abs_ttf: float
+    # absolute deviation of the indoor relative humidity (fraction)
+    max_abs_rh_in: float
+    mean_abs_rh_in: float
+    # kernel runtime over the whole corpus, and the reference runtime divided by it
+    seconds: float
+    speedup: float
+
+
+def _weather(
+    start: datetime.datetime,
+    hours: np.ndarray,
+    temperature: np.ndarray,
+    humidity: np.ndarray,
+    wind_speed: float = 3.0,
+) -> dm.WeatherData:
+    """Creates WeatherData from series given at hours after the start."""
+    return dm.WeatherData(
+        data=[
+            dm.WeatherDataPoint(
+                timestamp=start + datetime.timedelta(hours=float(h)),
+                temperature=float(t),
+                humidity=float(rh),
+                wind_speed=wind_speed,
+            )
+            for h, t, rh in zip(hours, temperature, humidity)
+        ]
+    )
+
+
+def synthetic_corpus(seed: int = 2024) -> Dict[str, dm.WeatherData]:
+    """
+    Generates the synthetic weather corpus of the golden harness.
+
+    Args:
+        seed: Seed of the noise, the corpus is deterministic for a given seed.
+
+    Returns:
+        The weather series by case name.
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2024, 1, 10, tzinfo=datetime.timezone.utc)
+
+    def diurnal(hours: np.ndarray, mean: float, amplitude: float) -> np.ndarray:
+        return mean + amplitude * np.sin(2 * np.pi * (hours - 9) / 24)
+
+    def noise(hours: np.ndarray, scale: float) -> np.ndarray:
+        return rng.normal(0.0, scale, len(hours))
+
+    corpus = {}
+
+    # MET locationforecast sampling: hourly for 60 hours, then 6-hourly (9 days)
+    hours = np.concatenate([np.arange(60), np.arange(60, 9 * 24 + 1, 6)])
+    corpus["met_forecast"] = _weather(
+        start,
+        hours,
+        diurnal(hours, 6.0, 5.0) + noise(hours, 0.8),
+        np.clip(diurnal(hours, 70.0, -20.0) + noise(hours, 4.0), 20, 100),
+    )
+
+    # Arctic winter, well below and crossing zero
+    hours = np.arange(9 * 24)
+    corpus["sub_zero"] = _weather(
+        start,
+        hours,
+        diurnal(hours, -15.0, 8.0) + 6.0 * np.sin(2 * np.pi * hours / 120),
+        np.clip(diurnal(hours, 80.0, -10.0) + noise(hours, 3.0), 40, 100),
+    )
+
+    # Fog: saturated air for three days, then drying out
+    hours = np.arange(6 * 24)
+    corpus["saturated"] = _weather(
+        start,
+        hours,
+        diurnal(hours, 4.0, 2.0),
+        np.where(hours < 72, 100.0, 100.0 - 0.5 * (hours - 72)),
+    )
+
+    # Dry summer heat
+    hours = np.arange(9 * 24)
+    corpus["dry_heat"] = _weather(
+        start,
+        hours,
+        diurnal(hours, 26.0, 6.0) + noise(hours, 0.5),
+        np.clip(diurnal(hours, 28.0, -12.0) + noise(hours, 2.0), 10, 100),
+    )
+
+    # Passing fronts: abrupt drops of temperature with the humidity jumping up
+    hours = np.arange(7 * 24)
+    front = (hours // 36) % 2 == 1
+    corpus["fronts"] = _weather(
+        start,
+        hours,
+        np.where(front, -3.0, 12.0) + noise(hours, 0.3),
+        np.where(front, 98.0, 35.0) + noise(hours, 1.0).clip(-2, 2),
+    )
+
+    # Missing values: single points and long runs in either variable
+    hours = np.arange(9 * 24)
+    temperature = diurnal(hours, 2.0, 6.0) + noise(hours, 0.5)
+    humidity = np.clip(diurnal(hours, 75.0, -20.0) + noise(hours, 3.0), 20, 100)
+    temperature[[5, 17, 100]] = np.nan
+    temperature[30:42] = np.nan
+    humidity[60:84] = np.nan
+    humidity[150:155] = np.nan
+    temperature[152:160] = np.nan
+    corpus["nan_gaps"] = _weather(start, hours, temperature, humidity)
+
+    # Irregular sampling between 10 minutes and 3 hours
+    hours = np.cumsum(rng.uniform(1 / 6, 3.0, 120))
+    hours = np.concatenate([[0.0], np.round(hours * 60) / 60])
+    corpus["irregular"] = _weather(
+        start,
+        hours,
+        diurnal(hours, 8.0, 7.0) + noise(hours, 0.5),
+        np.clip(diurnal(hours, 60.0, -25.0) + noise(hours, 3.0), 15, 100),
+    )
+
+    # Long horizon: a month with synoptic (weekly) variations
+    hours = np.arange(30 * 24)
+    synoptic = np.sin(2 * np.pi * hours / (7 * 24))
+    corpus["long_horizon"] = _weather(
+        start,
+        hours,
+        diurnal(hours, 0.0, 5.0) + 8.0 * synoptic + noise(hours, 0.5),
+        np.clip(diurnal(hours, 70.0, -15.0) - 15 * synoptic + noise(hours, 3), 15, 100),
+    )
+
+    return corpus
+
+
+def golden_case(wd: dm.WeatherData) -> GoldenCase:
+    """Simulates a weather series with the reference kernel."""
+    _, time_sec, temp, humidity, _, _ = pp.preprocess(wd, variables=pp.KERNEL_VARIABLES)
+    rh_in, ttf, _ = run_kernel(KERNELS["reference"], temp, humidity)
+    return GoldenCase(wd, np.asarray(time_sec), np.asarray(rh_in), np.asarray(ttf))
+
+
+def save_golden(corpus: Dict[str, dm.WeatherData], target: Path) -> None:
+    """
+    Simulates the corpus with the reference kernel and stores the input series
+    and the golden trajectories in a compressed numpy archive.
+    """
+    arrays: Dict[str, np.ndarray] = {"cases": np.array(list(corpus))}
+    for name, wd in corpus.items():
+        case = golden_case(wd)
+        arrays[f"{name}.timestamp"] = np.array(
+            [point.timestamp.timestamp() for point in wd.data]
+        )
+        for variable in ("temperature", "humidity", "wind_speed"):
+            arrays[f"{name}.{variable}"] = np.array(
+                [getattr(point, variable) for point in wd.data]
+            )
+        arrays[f"{name}.time_sec"] = case.time_sec
+        arrays[f"{name}.rh_in"] = case.rh_in
+        arrays[f"{name}.ttf"] = case.ttf
+    np.savez_compressed(target, **arrays)
+
+
+def load_golden(src: Path) -> Dict[str, GoldenCase]:
+    """Loads the golden cases stored by `save_golden`."""
+    with np.load(src) as archive:
+        cases = {}
+        for name in archive["cases"]:
+            weather = dm.WeatherData(
+                data=[
+                    dm.WeatherDataPoint(
+                        timestamp=datetime.datetime.fromtimestamp(
+                            ts, tz=datetime.timezone.utc
+                        ),
+                        temperature=t,
+                        humidity=rh,
+                        wind_speed=ws,
+                    )
+                    for ts, t, rh, ws in zip(
+                        archive[f"{name}.timestamp"].tolist(),
+                        archive[f"{name}.temperature"].tolist(),
+                        archive[f"{name}.humidity"].tolist(),
+                        archive[f"{name}.wind_speed"].tolist(),
+                    )
+                ]
+            )
+            cases[str(name)] = GoldenCase(
+                weather,
+                archive[f"{name}.time_sec"],
+                archive[f"{name}.rh_in"],
+                archive[f"{name}.ttf"],
+            )
+    return cases
+
+
+def harness_kernels() -> Dict[str, Tuple[KernelBackend, Dict[str, Any]]]:
+    """The registered kernels and their variants, with the extra arguments."""
+    kernels = {name: (backend, {}) for name, backend in KERNELS.items()}
+    for name, (base, kernel_args) in VARIANTS.items():
+        kernels[name] = (KERNELS[base], kernel_args)
+    return kernels
+
+
+def _run_corpus(
+    backend: KernelBackend,
+    kernel_args: Dict[str, Any],
+    cases: Dict[str, GoldenCase],
+    repeat: int,
+) -> Tuple[List[Tuple[np.ndarray, np.ndarray, np.ndarray]], float]:
+    """Runs a kernel on all cases, returns the results and the best runtime."""
+    inputs = []
+    for case in cases.values():
+        _, time_sec, temp, humidity, _, _ = pp.preprocess(
+            case.weather,
+            delta_t=getattr(mp, backend.delta_t),
+            variables=pp.KERNEL_VARIABLES,
+        )
+        inputs.append((np.asarray(time_sec), temp, humidity))
+
+    best = float("inf")
+    for _ in range(repeat):
+        results = []
+        begin = time.perf_counter()
+        for time_sec, temp, humidity in inputs:
+            rh_in, ttf, _ = run_kernel(backend, temp, humidity, **kernel_args)
+            results.append((time_sec, rh_in, ttf))
+        best = min(best, time.perf_counter() - begin)
+    return results, best
+
+
+def evaluate_kernels(
+    cases: Dict[str, GoldenCase],
+    kernels: Sequence[str] | None = None,
+    repeat: int = 3,
+) -> List[KernelAccuracy]:
+    """
+    Runs kernels on the golden corpus and compares their RH_in and TTF with
+    the golden trajectories, at the timesteps both share (the implicit solver
+    runs on a coarser grid).
+
+    Args:
+        cases: The golden cases, see `load_golden`.
+        kernels: Names of the kernels to evaluate (see `harness_kernels`),
+            defaults to all of them.
+        repeat: Number of runs of the corpus, the fastest one is timed.
+
+    Returns:
+        The deviation and the speedup over the reference kernel of every kernel.
+    """
+    available = harness_kernels()
+    if kernels is None:
+        kernels = list(available)
+
+    reference = _run_corpus(KERNELS["reference"], {}, cases, repeat)
+
+    accuracies = []
+    for name in kernels:
+        backend, kernel_args = available[name]
+        if name == "reference":
+            results, seconds = reference
+        else:
+            results, seconds = _run_corpus(backend, kernel_args, cases, repeat)
+
+        ttf_deviations = []
+        rh_in_deviations = []
+        for case, (time_sec, rh_in, ttf) in zip(cases.values(), results):
+            _, golden_index, kernel_index = np.intersect1d(
+                case.time_sec, time_sec, return_indices=True
+            )
+            ttf_deviations.append(
+                np.abs(
+                    np.asarray(ttf, dtype=float)[kernel_index] - case.ttf[golden_index]
+                )
+            )
+            rh_in_deviations.append(
+                np.abs(
+                    np.asarray(rh_in, dtype=float)[kernel_index]
+                    - case.rh_in[golden_index]
+                )
+            )
+
+        ttf_deviation = np.concatenate(ttf_deviations)
+        rh_in_deviation = np.concatenate(rh_in_deviations)
+        accuracies.append(
+            KernelAccuracy(
+                kernel=name,
+                max_abs_ttf=float(ttf_deviation.max()),
+                mean_abs_ttf=float(ttf_deviation.mean()),
+                max_abs_rh_in=float(rh_in_deviation.max()),
+                mean_abs_rh_in=float(rh_in_deviation.mean()),
+                seconds=seconds,
+                speedup=reference[1] / seconds,
+            )
+        )
+    return accuracies
+
+
+def format_report(accuracies: Sequence[KernelAccuracy]) -> str:
+    """Formats the kernel accuracies as a table, flagging exceeded tolerances."""
+    lines = [
+        f"{'kernel':<16} {'max |dTTF|':>11} {'mean |dTTF|':>11} "
+        f"{'max |dRH_in|':>12} {'mean |dRH_in|':>13} {'time (s)':>9} "
+        f"{'speedup':>8}"
+    ]
+    for acc in accuracies:
+        ttf_tolerance, rh_in_tolerance = TOLERANCES.get(acc.kernel, (0.0, 0.0))
+        exceeded = acc.max_abs_ttf > ttf_tolerance or (
+            acc.max_abs_rh_in > rh_in_tolerance
+        )
+        lines.append(
+            f"{acc.kernel:<16} {acc.max_abs_ttf:>11.2e} {acc.mean_abs_ttf:>11.2e} "
+            f"{acc.max_abs_rh_in:>12.2e} {acc.mean_abs_rh_in:>13.2e} "
+            f"{acc.seconds:>9.4f} {acc.speedup:>7.2f}x"
+            + ("  OUT OF TOLERANCE" if exceeded else "")
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Regenerates the golden file and/or reports the kernel accuracies."""
+    parser = argparse.ArgumentParser(
+        prog="python -m frcm.fireriskmodel.golden",
+        description="Compares the FRCM kernels with golden trajectories.",
+    )
+    parser.add_argument("golden", type=Path, help="golden file (.npz)")
+    parser.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="rewrite the golden file from the synthetic corpus",
+    )
+    parser.add_argument(
+        "--add",
+        type=Path,
+        nargs="+",
+        default=[],
+        metavar="CSV",
+        help="add recorded weather series (frcm CSV files) to the golden file",
+    )
+    parser.add_argument(
+        "--kernel", nargs="+", help="kernels to evaluate (default: all)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.regenerate or args.add:
+        corpus = synthetic_corpus() if args.regenerate else {}
+        if not args.regenerate and args.golden.exists():
+            corpus = {
+                name: case.weather for name, case in load_golden(args.golden).items()
+            }
+        for csv in args.add:
+            corpus[csv.stem] = dm.WeatherData.read_csv(csv)
+        save_golden(corpus, args.golden)
+        print(f"Golden trajectories of {len(corpus)} series written to '{args.golden}'")
+
+    print(format_report(evaluate_kernels(load_golden(args.golden), args.kernel)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
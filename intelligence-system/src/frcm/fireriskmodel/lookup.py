@@ -0,0 +1,177 @@
+"""
+Lookup tables for the saturation and sorption formulas in `utils`.
+
+calc_pwsat (an exponential), calc_rhwall (a 4th order polynomial of the
+surface moisture) and calc_fmc are tabulated on uniform grids over their
+physically valid range and evaluated by linear interpolation. Values outside
+the tabulated range fall back to the closed form, so the tables never
+extrapolate. The grids keep the interpolation error (h^2 / 8 * max |f''|) far
+below the resolution of the model:
+
+    calc_pwsat   -60 to 60 'C, step 0.005 K   relative error < 1e-7
+    calc_rhwall  u = fmc / rho_wood in [0, 0.45], step 1e-5
+                                              absolute error < 3e-8 (RH)
+    calc_fmc     rh in [0, 1], step 1e-4      absolute error < 3e-9
+
+`table_errors` verifies these bounds against the closed forms. The kernels use
+the tables with `lookup=True` or `parameters.lookup_tables`.
+
+With the tables on, every evaluation of these formulas in every kernel (the
+implicit solver and the streaming `compute_iter` included) interpolates, so
+that the result of a zone does not depend on the number of zones it was
+computed with. Only the derivative of calc_rhwall in the linearisation of the
+implicit solver keeps its closed form. The cheapest interpolation is picked by input:
+scalars (the reference kernel) are interpolated on python floats, small arrays
+(the zone vector of the batched kernel per timestep) with a single np.interp
+call, and large arrays (the series of the vectorized kernel) by indexing the
+uniform grid, which avoids the binary searches of np.interp. The tables only
+pay off in the batched kernel, which is 10-15 % faster with them for up to 64
+zones. Elsewhere the closed forms are cheaper: a table lookup costs 1.5-4x
+the closed form on a python float and about 3x on large arrays, where the
+vectorised exp/polynomial wins.
+"""
+
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np
+
+import frcm.fireriskmodel.parameters as mp
+import frcm.fireriskmodel.utils as func
+from frcm.fireriskmodel.utils import ArrayLike, Parameters
+
+# Arrays up to this size are interpolated in a single np.interp call, larger ones
+# by indexing the grid, whose few numpy operations outrun the binary searches of
+# np.interp from about a hundred elements on.
+SMALL_ARRAY_SIZE = 64
+
+
+class LookupTable:
+    """A function tabulated on a uniform grid, evaluated by linear interpolation."""
+
+    def __init__(
+        self,
+        function: Callable[[ArrayLike], ArrayLike],
+        lower: float,
+        upper: float,
+        points: int,
+    ) -> None:
+        """
+        Args:
+            function: The closed form, evaluated element-wise on the grid and
+                for values outside of it.
+            lower: Start of the tabulated range.
+            upper: End of the tabulated range.
+            points: Number of grid points.
+        """
+        self.function = function
+        self.lower = float(lower)
+        self.upper = float(upper)
+        self.grid = np.linspace(self.lower, self.upper, points)
+        self.values = np.asarray(function(self.grid), dtype=float)
+        self.step = (self.upper - self.lower) / (points - 1)
+        self.last = points - 1
+        self.slopes = np.diff(self.values)
+        # python floats, whose arithmetic is several times faster than that of
+        # numpy scalars
+        self._values = self.values.tolist()
+
+    def __call__(self, x: ArrayLike) -> ArrayLike:
+        """Evaluates the table at scalars or element-wise at arrays."""
+        if isinstance(x, (float, int)):
+            # numpy float64 scalars are floats as well and are converted
+            return self.interpolate_scalar(float(x))
+
+        x = np.asarray(x)
+        if x.size > SMALL_ARRAY_SIZE:
+            result = self.index(x)
+        else:
+            result = self.interpolate(x)
+        if np.issubdtype(x.dtype, np.floating):
+            result = result.astype(x.dtype, copy=False)
+        return result
+
+    def interpolate_scalar(self, x: float) -> float:
+        """Interpolates the table at a python float."""
+        position = (x - self.lower) / self.step
+        # also false for NaN
+        if not 0.0 <= position <= self.last:
+            return self.function(x)
+        index = min(int(position), self.last - 1)
+        low = self._values[index]
+        return low + (position - index) * (self._values[index + 1] - low)
+
+    def interpolate(self, x: np.ndarray) -> np.ndarray:
+        """Interpolates the table element-wise with np.interp."""
+        result = np.interp(x, self.grid, self.values, left=np.nan, right=np.nan)
+        outside = np.isnan(result)
+        if outside.any():
+            result = np.where(outside, self.function(x), result)
+        return result
+
+    def index(self, x: np.ndarray) -> np.ndarray:
+        """Interpolates the table element-wise by indexing the uniform grid."""
+        position = (x - self.lower) / self.step
+        # false for NaN, which would not cast to a valid index
+        inside = (position >= 0) & (position <= self.last)
+        index = np.minimum(np.where(inside, position, 0), self.last - 1).astype(np.intp)
+        result = self.values[index] + (position - index) * self.slopes[index]
+        if not inside.all():
+            result = np.where(inside, result, self.function(x))
+        return result
+
+
+def _rhwall_of_u(u: ArrayLike) -> ArrayLike:
+    """calc_rhwall as a function of u = fmc / rho_wood (independent of rho_wood)."""
+    return 0.0698 - 1.258 * u + 125.35 * u**2 - 809.43 * u**3 + 1583.8 * u**4
+
+
+PWSAT_TABLE = LookupTable(func.calc_pwsat, -60.0, 60.0, 24_001)
+RHWALL_TABLE = LookupTable(_rhwall_of_u, 0.0, 0.45, 45_001)
+FMC_TABLE = LookupTable(func.calc_fmc, 0.0, 1.0, 10_001)
+
+
+def lookup_pwsat(temp_c: ArrayLike) -> ArrayLike:
+    """Tabulated calc_pwsat."""
+    return PWSAT_TABLE(temp_c)
+
+
+def lookup_rhwall(cfmc: ArrayLike, p: Parameters = mp) -> ArrayLike:
+    """Tabulated calc_rhwall."""
+    return RHWALL_TABLE(cfmc / p.rho_wood)
+
+
+def lookup_fmc(rh: ArrayLike) -> ArrayLike:
+    """Tabulated calc_fmc."""
+    return FMC_TABLE(rh)
+
+
+class TableError(NamedTuple):
+    """Deviation of a lookup table from its closed form."""
+
+    max_abs: float
+    # relative to the largest magnitude of the function within the range
+    max_rel: float
+
+
+def table_errors(samples: int = 1_000_001) -> Dict[str, TableError]:
+    """
+    Compares the lookup tables with the closed forms on a grid much finer
+    than the tables.
+
+    Returns:
+        The deviation per function name.
+    """
+    errors = {}
+    for name, table in {
+        "calc_pwsat": PWSAT_TABLE,
+        "calc_rhwall": RHWALL_TABLE,
+        "calc_fmc": FMC_TABLE,
+    }.items():
+        x = np.linspace(table.lower, table.upper, samples)
+        exact = table.function(x)
+        deviation = np.abs(table.interpolate(x) - exact)
+        errors[name] = TableError(
+            max_abs=float(deviation.max()),
+            max_rel=float((deviation / np.maximum(np.abs(exact), 1e-12)).max()),
+        )
+    return errors
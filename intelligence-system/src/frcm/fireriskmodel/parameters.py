@@ -1,3 +1,10 @@
+from dataclasses import dataclass, replace
+from typing import Sequence
+
+import numpy as np
+
+ArrayLike = float | np.ndarray
+
 # General modelling parameters
 
 panel_thickness = 0.012  # m - panel thickness
@@ -12,6 +19,24 @@ boundary_layer = 0.01  # m - boundary layer at wooden wall surface (constant)
 gas_constant = 8.314  # J/(Kg * K) Universal gas constant
 mol_weight = 0.018015  # Kg/mol - molecular weight of water vapor (constant)
 fourier = 0.15  # Fourier number
+max_data_gap = 6 * 3600  # seconds - longest gap in the weather data considered valid
+
+# Solver for the moisture transport in the wooden panels:
+# "explicit" - reference scheme, stable as long as fourier <= 0.5, i.e. delta_t
+# "implicit" - theta-scheme with a linear solve per step, unconditionally stable
+#              and therefore run at the (much larger) implicit_delta_t
+wall_solver = "explicit"
+implicit_delta_t = 3600  # seconds - timestep of the implicit solver
+implicit_theta = 0.5  # 0.5 = Crank-Nicolson, 1 = backward Euler
+
+# Floating point precision of the batched kernel (compute_fr_batch):
+# "float32" halves its working set for large batches, at a small TTF drift
+# which can be quantified with frcm.fireriskmodel.precision.precision_drift
+precision = "float64"
+
+# Evaluate calc_pwsat, calc_rhwall and calc_fmc in the kernels with the lookup
+# tables of frcm.fireriskmodel.lookup (bounded error, see there)
+lookup_tables = False
 
 
 # Model specific parameters
@@ -28,3 +53,139 @@ A_V_Ratio = (
 supply_24h = 1  # Kg/24 hour - supplied water vapor from cooking, respiring, plants++
 rho_wood = 500  # kg/m^3 - density of wood (constant)
 gamma = 380  # Ventilation constant
+
+
+@dataclass(frozen=True)
+class ParameterSet:
+    """
+    An injectable set of the building (enclosure) parameters above, for runs
+    which do not use the module defaults. The model functions in utils read
+    the parameters by attribute, so they accept either this module or a
+    ParameterSet.
+
+    The values may be arrays of equal length (one entry per parameter
+    combination), which the batched kernel evaluates in a single pass, see
+    `frcm.fireriskmodel.sweep`. The numerical grid (sub_layers, delta_t) is
+    shared by all combinations and therefore scalar.
+    """
+
+    panel_thickness: ArrayLike = panel_thickness
+    D_w_s: ArrayLike = D_w_s
+    D_W_a: ArrayLike = D_W_a
+    boundary_layer: ArrayLike = boundary_layer
+    T_c_in: ArrayLike = T_c_in
+    RH_in: ArrayLike = RH_in
+    A_ex: ArrayLike = A_ex
+    Vol: ArrayLike = Vol
+    supply_24h: ArrayLike = supply_24h
+    rho_wood: ArrayLike = rho_wood
+    gamma: ArrayLike = gamma
+    sub_layers: int = sub_layers
+    delta_t: int = delta_t
+    gas_constant: float = gas_constant
+    mol_weight: float = mol_weight
+
+    @property
+    def delta_x(self) -> ArrayLike:
+        return self.panel_thickness / self.sub_layers
+
+    @property
+    def fourier(self) -> ArrayLike:
+        return self.D_w_s * self.delta_t / self.delta_x**2
+
+    @property
+    def T_k_in(self) -> ArrayLike:
+        return self.T_c_in + 273.15
+
+    @property
+    def A_V_Ratio(self) -> ArrayLike:
+        return self.A_ex / self.Vol
+
+    def __len__(self) -> int:
+        """Number of parameter combinations (1 for a scalar set)."""
+        sizes = {np.size(getattr(self, name)) for name in SWEEPABLE}
+        sizes.discard(1)
+        if len(sizes) > 1:
+            raise ValueError("Array-valued parameters must have equal lengths.")
+        return sizes.pop() if sizes else 1
+
+    def column(self) -> "ParameterSet":
+        """
+        Returns the set with the array values reshaped to columns (n x 1), to
+        broadcast against (combinations x time) arrays.
+        """
+        return replace(
+            self,
+            **{
+                name: np.reshape(getattr(self, name), (-1, 1))
+                for name in SWEEPABLE
+                if np.ndim(getattr(self, name)) > 0
+            },
+        )
+
+    def astype(self, dtype: np.dtype) -> "ParameterSet":
+        """Returns the set with the array values converted to the given dtype."""
+        return replace(
+            self,
+            **{
+                name: np.asarray(getattr(self, name), dtype=dtype)
+                for name in SWEEPABLE
+                if isinstance(getattr(self, name), (np.ndarray, np.generic))
+            },
+        )
+
+    @classmethod
+    def stack(cls, sets: Sequence["ParameterSet"]) -> "ParameterSet":
+        """
+        Combines scalar parameter sets (e.g. the ARCHETYPES) into one
+        array-valued set, with one combination per given set.
+        """
+        return cls(
+            **{
+                name: np.array([getattr(s, name) for s in sets], dtype=float)
+                for name in SWEEPABLE
+            }
+        )
+
+    @classmethod
+    def grid(cls, **values: Sequence[float]) -> "ParameterSet":
+        """
+        Builds an array-valued set from the cartesian product of the given
+        values, e.g. `ParameterSet.grid(A_ex=[40, 60], gamma=[200, 380])`
+        holds 4 combinations. The other parameters keep their defaults.
+        """
+        unknown = set(values) - set(SWEEPABLE)
+        if unknown:
+            raise ValueError(f"Unknown or non-sweepable parameters: {sorted(unknown)}")
+        mesh = np.meshgrid(
+            *(np.asarray(v, dtype=float) for v in values.values()), indexing="ij"
+        )
+        return cls(**{name: m.ravel() for name, m in zip(values, mesh)})
+
+
+# parameters which may vary between the combinations of a ParameterSet
+SWEEPABLE = (
+    "panel_thickness",
+    "D_w_s",
+    "D_W_a",
+    "boundary_layer",
+    "T_c_in",
+    "RH_in",
+    "A_ex",
+    "Vol",
+    "supply_24h",
+    "rho_wood",
+    "gamma",
+)
+
+
+# Catalogue of building archetypes, simulated per zone in addition to the default
+# enclosure above (see ParameterSet.stack and frcm.fireriskmodel.sweep)
+ARCHETYPES = {
+    # single room cabin, leaky and with little moisture supply
+    "small_cabin": ParameterSet(A_ex=25, Vol=50, gamma=500, supply_24h=0.5),
+    # apartment with few wooden surfaces and a tight envelope
+    "apartment": ParameterSet(A_ex=30, Vol=150, gamma=250, supply_24h=2),
+    # large house with wooden interior throughout
+    "large_timber_house": ParameterSet(A_ex=200, Vol=400, gamma=300, supply_24h=3),
+}
@@ -1,10 +1,46 @@
-from datetime import datetime
-from typing import Any, List, Tuple
+import bisect
+from datetime import datetime, timedelta
+from typing import Any, Collection, List, NamedTuple, Sequence, Tuple
 
 import numpy as np
 
-from frcm.datamodel.model import WeatherData, WeatherDataPoint
-from frcm.fireriskmodel.parameters import delta_t
+import frcm.fireriskmodel.parameters as mp
+from frcm.datamodel.model import (
+    ColumnarWeatherData,
+    WeatherData,
+    WeatherDataPoint,
+    to_datetime64,
+)
+from frcm.profiling import stage
+
+# Interpolated weather variables, in the order of the preprocess output
+VARIABLES = ("temperature", "humidity", "wind_speed")
+# The variables the kernels take, the wind speed is not needed to simulate
+KERNEL_VARIABLES = ("temperature", "humidity")
+
+
+class Preprocessed(NamedTuple):
+    """The output of `preprocess`, unpacked like a plain tuple by most callers."""
+
+    start_time: datetime
+    # interpolation time axis, seconds after start_time (int64)
+    time_sec: np.ndarray
+    # interpolated variables, None for the ones which were not requested
+    temperature: np.ndarray | None
+    humidity: np.ndarray | None
+    wind_speed: np.ndarray | None
+    # largest gap (seconds) in the temperature and humidity data
+    max_time_delta: float
+
+    def gaps_valid(self, max_gap: float | None = None) -> bool:
+        """
+        Whether the temperature and humidity data has no gap longer than
+        `max_gap` seconds (default `mp.max_data_gap`), over which the
+        interpolated values are a guess.
+        """
+        if max_gap is None:
+            max_gap = mp.max_data_gap
+        return bool(self.max_time_delta <= max_gap)
 
 
 def extract_variable(sorted_data: List[WeatherDataPoint], parameter: str) -> List[Any]:
@@ -52,75 +88,239 @@ def find_data_gap(*args: np.ndarray) -> float:
     Returns:
         The largest gap in the data.
     """
-    max_delta = []
+    max_delta = [0.0]
     for arr in args:
-        differences = np.diff(arr)
-        max_delta.append(np.max(differences))
+        # a single data point has no gaps
+        if len(arr) > 1:
+            differences = np.diff(arr)
+            max_delta.append(np.max(differences))
     return np.max(max_delta)
 
 
+def truncate_to_horizon(
+    sorted_data: List[WeatherDataPoint],
+    horizon_hours: float,
+    start_time: datetime | None = None,
+) -> List[WeatherDataPoint]:
+    """
+    Drops the data points which are not needed to interpolate the first
+    `horizon_hours` hours of the data.
+
+    Args:
+        sorted_data: A list of sorted WeatherDataPoint objects.
+        horizon_hours: The number of hours after the start time to keep.
+        start_time: The start of the horizon, defaults to the first data point.
+
+    Returns:
+        The data points up to and including the first one at or after the horizon.
+    """
+    if start_time is None:
+        start_time = sorted_data[0].timestamp
+    end_time = start_time + timedelta(hours=horizon_hours)
+    end_index = bisect.bisect_left(sorted_data, end_time, key=lambda x: x.timestamp)
+    return sorted_data[: end_index + 1]
+
+
+def truncate_columns(
+    columns: ColumnarWeatherData, horizon_hours: float, start_time: datetime
+) -> ColumnarWeatherData:
+    """
+    `truncate_to_horizon` for columnar data, returning views of the columns.
+
+    Args:
+        columns: The columnar weather data.
+        horizon_hours: The number of hours after the start time to keep.
+        start_time: The start of the horizon.
+
+    Returns:
+        The data points up to and including the first one at or after the horizon.
+    """
+    end_time = to_datetime64(start_time + timedelta(hours=horizon_hours))
+    end_index = int(np.searchsorted(columns.timestamp, end_time, side="left"))
+    return columns.slice(stop=end_index + 1)
+
+
 def preprocess(
-    wd: WeatherData,
-) -> Tuple[datetime, List[int], np.ndarray, np.ndarray, np.ndarray, float]:
+    wd: WeatherData | ColumnarWeatherData,
+    horizon_hours: float | None = None,
+    start_time: datetime | None = None,
+    delta_t: int | None = None,
+    variables: Collection[str] = VARIABLES,
+) -> Preprocessed:
     """
     Transforms the WeatherData domain object into numpy ndarrays
     which contain the interoplated values w.r.t. temperature, humidity, and wind speed,
     also a 'cleaning' w.r.t null-values.
+
+    The interpolation starts at `start_time` (default: the first data point) and,
+    if `horizon_hours` is given, only covers that many hours after the start. The
+    values are interpolated every `delta_t` seconds (default `mp.delta_t`). Only
+    the given `variables` are interpolated (the kernels only need temperature and
+    humidity), the others are None.
+
+    ColumnarWeatherData is used as it is (it is sorted already), with the same
+    result as the equivalent WeatherData.
     """
-    # Should not be necessary, but data is initially sorted according to the timestamps
-    sorted_data = sorted(wd.data, key=lambda x: x.timestamp)
-
-    # Combine data
-    timestamp_vector = extract_variable(sorted_data, "timestamp")
-    temp_vector = extract_variable(sorted_data, "temperature")
-    humidity_vector = extract_variable(sorted_data, "humidity")
-    wind_vector = extract_variable(sorted_data, "wind_speed")
-
-    # Convert timestamp vector to a vector containing delta time of adjacent elements
-    # in seconds, starting at 0.
-    timestamp_vector_sec = [
-        round((timestamp - timestamp_vector[0]).total_seconds())
-        for timestamp in timestamp_vector
-    ]
-    # Get start of computation as datetime
-    start_time = timestamp_vector[0]
-
-    # Identify position of np.nan values and remove from "parameter"_vector and
-    # associated "parameter"_timevector
-    # Resulting vectors are used in the np interpolation function (np.interp)
-    temp_clean, time_temp_clean = clean_nan(
-        data_vector=temp_vector, time_vector=timestamp_vector_sec
-    )
-    humidity_clean, time_humidity_clean = clean_nan(
-        data_vector=humidity_vector, time_vector=timestamp_vector_sec
-    )
-    wind_clean, time_wind_clean = clean_nan(
-        data_vector=wind_vector, time_vector=timestamp_vector_sec
-    )
+    if delta_t is None:
+        delta_t = mp.delta_t
+
+    if isinstance(wd, ColumnarWeatherData):
+        return _preprocess_columns(wd, horizon_hours, start_time, delta_t, variables)
+
+    with stage("preprocess.sort", size=len(wd.data)):
+        # Should not be necessary, but data is initially sorted according to the
+        # timestamps
+        sorted_data = sorted(wd.data, key=lambda x: x.timestamp)
+        if start_time is None:
+            start_time = sorted_data[0].timestamp
+        if horizon_hours is not None:
+            sorted_data = truncate_to_horizon(sorted_data, horizon_hours, start_time)
+
+    with stage("preprocess.interpolate", size=len(sorted_data)):
+        # Convert the timestamps to seconds relative to the start of computation.
+        timestamp_vector_sec = np.array(
+            [
+                round((point.timestamp - start_time).total_seconds())
+                for point in sorted_data
+            ],
+            dtype=np.int64,
+        )
+        # Combine data, skipping the wind speed if it is not interpolated
+        temp_vector = extract_variable(sorted_data, "temperature")
+        humidity_vector = extract_variable(sorted_data, "humidity")
+        wind_vector = (
+            extract_variable(sorted_data, "wind_speed")
+            if "wind_speed" in variables
+            else None
+        )
+        return Preprocessed(
+            start_time,
+            *interpolate_columns(
+                timestamp_vector_sec,
+                temp_vector,
+                humidity_vector,
+                wind_vector,
+                horizon_hours=horizon_hours,
+                delta_t=delta_t,
+                variables=variables,
+            ),
+        )
+
+
+def _preprocess_columns(
+    columns: ColumnarWeatherData,
+    horizon_hours: float | None,
+    start_time: datetime | None,
+    delta_t: int,
+    variables: Collection[str],
+) -> Preprocessed:
+    """`preprocess` of columnar data."""
+    with stage("preprocess.sort", size=len(columns)):
+        if start_time is None:
+            start_time = columns.start_time
+        if horizon_hours is not None:
+            columns = truncate_columns(columns, horizon_hours, start_time)
+
+    with stage("preprocess.interpolate", size=len(columns)):
+        # Seconds relative to the start, rounded as for WeatherData
+        timestamp_vector_sec = np.rint(columns.elapsed_seconds(start_time)).astype(
+            np.int64
+        )
+        return Preprocessed(
+            start_time,
+            *interpolate_columns(
+                timestamp_vector_sec,
+                columns.temperature,
+                columns.humidity,
+                columns.wind_speed,
+                horizon_hours=horizon_hours,
+                delta_t=delta_t,
+                variables=variables,
+            ),
+        )
+
+
+def _valid(
+    data: Sequence[float], time_sec: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drops the NaN values of a variable and their times, like `clean_nan`, but
+    with a single mask and without copies if there are none.
+    """
+    data = np.asarray(data, dtype=float)
+    valid = ~np.isnan(data)
+    if valid.all():
+        return data, time_sec
+    return data[valid], time_sec[valid]
+
+
+def interpolate_columns(
+    time_sec: Sequence[int],
+    temperature: Sequence[float],
+    humidity: Sequence[float],
+    wind_speed: Sequence[float] | None,
+    horizon_hours: float | None = None,
+    delta_t: int | None = None,
+    variables: Collection[str] = VARIABLES,
+) -> Tuple[np.ndarray, np.ndarray | None, np.ndarray | None, np.ndarray | None, float]:
+    """
+    Interpolates sorted weather columns onto the time axis of the kernels, the
+    array level part of `preprocess`.
+
+    Args:
+        time_sec: Sorted timestamps in whole seconds relative to the start.
+        temperature: Temperatures, NaN where missing.
+        humidity: Relative humidities, NaN where missing.
+        wind_speed: Wind speeds, NaN where missing (only read if requested).
+        horizon_hours: Ends the time axis that many hours after the start.
+        delta_t: Step of the time axis in seconds (default `mp.delta_t`).
+        variables: Names of the variables to interpolate, see `VARIABLES`.
+
+    Returns:
+        A tuple of the interpolated time axis (seconds after the start), the
+        interpolated temperature, humidity and wind speed (None if not
+        requested) and the largest gap (seconds) in the temperature and
+        humidity data.
+    """
+    if delta_t is None:
+        delta_t = mp.delta_t
+    time_sec = np.asarray(time_sec, dtype=np.int64)
 
     # Create interpolation time vector in seconds. This vector contains all the
     # datapoints for which the np.interp-function shall provide interpolated values.
-    interpolation_timevector_sec = [
-        i for i in range(timestamp_vector_sec[0], timestamp_vector_sec[-1] + 1, delta_t)
-    ]
+    interpolation_end_sec = int(time_sec[-1])
+    if horizon_hours is not None:
+        interpolation_end_sec = min(interpolation_end_sec, round(horizon_hours * 3600))
+    interpolation_timevector_sec = np.arange(
+        0, interpolation_end_sec + 1, delta_t, dtype=np.int64
+    )
+
+    # Remove the np.nan values and their times. The gap check needs the
+    # temperature and humidity data even if they are not interpolated.
+    temp_clean, time_temp_clean = _valid(temperature, time_sec)
+    humidity_clean, time_humidity_clean = _valid(humidity, time_sec)
 
     # Find largest gap in data. Currently only considering temperature and humidity.
     # Delta is given in seconds.
     max_time_delta = find_data_gap(time_temp_clean, time_humidity_clean)
 
-    # Interpolate all data
-    temp_interpolated = np.interp(
-        interpolation_timevector_sec, time_temp_clean, temp_clean
-    )
-    humidity_interpolated = np.interp(
-        interpolation_timevector_sec, time_humidity_clean, humidity_clean
-    )
-    wind_interpolated = np.interp(
-        interpolation_timevector_sec, time_wind_clean, wind_clean
-    )
+    # Interpolate the requested data
+    temp_interpolated = humidity_interpolated = wind_interpolated = None
+    if "temperature" in variables:
+        temp_interpolated = np.interp(
+            interpolation_timevector_sec, time_temp_clean, temp_clean
+        )
+    if "humidity" in variables:
+        humidity_interpolated = np.interp(
+            interpolation_timevector_sec, time_humidity_clean, humidity_clean
+        )
+    if "wind_speed" in variables:
+        wind_clean, time_wind_clean = _valid(wind_speed, time_sec)
+        wind_interpolated = np.interp(
+            interpolation_timevector_sec, time_wind_clean, wind_clean
+        )
 
     return (
-        start_time,
         interpolation_timevector_sec,
         temp_interpolated,
         humidity_interpolated,
@@ -0,0 +1,148 @@
+import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+import frcm.datamodel.model as dm
+import frcm.fireriskmodel.parameters as mp
+import frcm.fireriskmodel.utils as func
+from frcm.fireriskmodel.utils import ArrayLike
+
+
+class KernelState(NamedTuple):
+    """
+    The state carried between timesteps of a kernel. Batched kernels hold one
+    row (wall) or entry (cw_in, c_wall) per zone.
+    """
+
+    # fmc of the wooden panel layers
+    wall: np.ndarray
+    # bulk air (in-home) water concentration
+    cw_in: float | np.ndarray
+    # water concentration contribution from the wooden surfaces (over one step
+    # of the explicit scheme, see compute_fr_implicit)
+    c_wall: float | np.ndarray
+
+
+def initial_kernel_state(
+    zones: int | None = None, params: func.Parameters = mp
+) -> KernelState:
+    """
+    Returns the default initial conditions: the wooden panels in equilibrium
+    with the guessed indoor relative humidity `RH_in`.
+
+    Args:
+        zones: Number of zones for batched kernels, None for a single zone.
+        params: The model parameters, an array-valued ParameterSet gives the
+            initial conditions of each combination (one per zone).
+    """
+    temp_c_in = np.asarray(params.T_c_in, dtype=float)
+    cw_sat_in = func.calc_cwsat(func.calc_pwsat(temp_c_in), temp_c_in, params)
+    shape = params.sub_layers if zones is None else (zones, params.sub_layers)
+
+    wall = np.empty(shape)
+    wall[...] = np.asarray(func.calc_fmc(params.RH_in) * params.rho_wood)[..., None]
+    rh_wall = func.calc_rhwall(func.calc_surf(wall[..., 0], wall[..., 1]), params)
+    cw_in = params.RH_in * cw_sat_in
+    if zones is not None:
+        cw_in = np.broadcast_to(cw_in, zones).astype(float)
+    c_wall = func.calc_cwall(func.calc_deltac(params.RH_in, rh_wall, cw_sat_in), params)
+    return KernelState(wall=wall, cw_in=cw_in, c_wall=c_wall)
+
+
+def equilibrium_kernel_state(
+    temp_c_out: ArrayLike, rh_out: ArrayLike, params: func.Parameters = mp
+) -> KernelState:
+    """
+    Returns the steady state of the model for constant outdoor conditions, as
+    an initial state closer to reality than the guessed `RH_in`.
+
+    In the steady state the indoor water balance closes without exchange with
+    the panels, beta * cw_in = c_ac + c_supply, and the panels are uniformly in
+    equilibrium with the resulting indoor humidity (rh_wall = rh_in), so the
+    kernels leave this state unchanged under these conditions.
+
+    Args:
+        temp_c_out: Outdoor temperature in Celsius, an array gives one state per
+            zone (batched kernels).
+        rh_out: Outdoor relative humidity (percent), same shape as temp_c_out.
+        params: The model parameters.
+    """
+    temp_c_out = np.asarray(temp_c_out, dtype=float)
+    temp_c_in = np.asarray(params.T_c_in, dtype=float)
+    cw_sat_in = func.calc_cwsat(func.calc_pwsat(temp_c_in), temp_c_in, params)
+
+    cw_out = func.calc_cw(
+        rh_out, func.calc_cwsat(func.calc_pwsat(temp_c_out), temp_c_out, params)
+    )
+    beta = func.calc_beta(func.calc_ach(temp_c_out, temp_c_in, params), params)
+    c_ac = func.calc_cac(beta, cw_out, temp_c_out, temp_c_in)
+    c_supply = func.calc_csupply(
+        (params.supply_24h / (24 * 3600)) * params.delta_t, params
+    )
+    cw_in = (c_ac + c_supply) / beta
+
+    fmc = func.calc_rhwall_inverse(cw_in / cw_sat_in, params)
+    wall = np.empty(np.shape(fmc) + (params.sub_layers,))
+    wall[...] = np.asarray(fmc)[..., None]
+    c_wall = np.zeros(np.shape(cw_in))
+    if np.ndim(cw_in) == 0:
+        cw_in, c_wall = float(cw_in), 0.0
+    return KernelState(wall=wall, cw_in=cw_in, c_wall=c_wall)
+
+
+def equilibrium_state(
+    wd: dm.WeatherData | dm.ColumnarWeatherData, params: func.Parameters = mp
+) -> dm.ModelState | None:
+    """
+    Returns the steady state (see `equilibrium_kernel_state`) for the first
+    data point with valid temperature and humidity, at its timestamp. None if
+    there is no such data point.
+    """
+    if isinstance(wd, dm.ColumnarWeatherData):
+        valid = np.flatnonzero(~(np.isnan(wd.temperature) | np.isnan(wd.humidity)))
+        if valid.size == 0:
+            return None
+        first = valid[0]
+        points = [
+            (
+                wd.to_datetime(wd.timestamp[first]),
+                float(wd.temperature[first]),
+                float(wd.humidity[first]),
+            )
+        ]
+    else:
+        points = (
+            (point.timestamp, point.temperature, point.humidity)
+            for point in sorted(wd.data, key=lambda p: p.timestamp)
+        )
+
+    for timestamp, temperature, humidity in points:
+        if np.isnan(temperature) or np.isnan(humidity):
+            continue
+        state = equilibrium_kernel_state(temperature, humidity, params)
+        rh_in = state.cw_in / func.calc_cwsat(
+            func.calc_pwsat(params.T_c_in), params.T_c_in, params
+        )
+        return to_model_state(state, rh_in, timestamp)
+    return None
+
+
+def to_kernel_state(state: dm.ModelState) -> KernelState:
+    """Converts a persisted ModelState into the state used by the kernels."""
+    return KernelState(
+        wall=np.array(state.wall, dtype=float), cw_in=state.cw_in, c_wall=state.c_wall
+    )
+
+
+def to_model_state(
+    state: KernelState, rh_in: float, timestamp: datetime.datetime
+) -> dm.ModelState:
+    """Converts the final state of a single-zone kernel run into a ModelState."""
+    return dm.ModelState(
+        timestamp=timestamp,
+        wall=np.asarray(state.wall, dtype=float).tolist(),
+        cw_in=float(state.cw_in),
+        rh_in=float(rh_in),
+        c_wall=float(state.c_wall),
+    )
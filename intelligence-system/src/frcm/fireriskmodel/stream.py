@@ -0,0 +1,197 @@
+import datetime
+from collections import deque
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+import frcm.datamodel.model as dm
+import frcm.fireriskmodel.lookup as lk
+import frcm.fireriskmodel.parameters as mp
+import frcm.fireriskmodel.utils as func
+from frcm.fireriskmodel.compute import steps_per_hour
+from frcm.fireriskmodel.state import (
+    KernelState,
+    initial_kernel_state,
+    to_kernel_state,
+)
+
+# Data points of a variable kept while another variable has no value yet (over
+# a run of NaN values of it), which bounds the memory of a stream
+MAX_BUFFERED_POINTS = 10_000
+
+
+class _StreamInterpolator:
+    """
+    Linear interpolation of one weather variable over a stream of data points,
+    equivalent to `np.interp` on the NaN-cleaned series (see preprocess).
+    Only the data points around the current query time are kept, at most
+    `max_points` of them.
+    """
+
+    def __init__(self, max_points: int | None = None) -> None:
+        self.points: deque[Tuple[int, float]] = deque()
+        self.finished = False
+        self.max_points = MAX_BUFFERED_POINTS if max_points is None else max_points
+
+    def push(self, time_sec: int, value: float) -> None:
+        """
+        Adds a data point, NaN values are skipped.
+
+        Raises:
+            ValueError: If `max_points` points are buffered already, i.e. the
+                other variable has no value over as many data points.
+        """
+        if np.isnan(value):
+            return
+        if len(self.points) >= self.max_points:
+            raise ValueError(
+                f"Weather data has more than {self.max_points} data points in a"
+                " row without a value of a variable, which cannot be streamed."
+            )
+        self.points.append((time_sec, value))
+
+    def ready(self, time_sec: int) -> bool:
+        """Whether the value at `time_sec` is determined by the data seen so far."""
+        return self.finished or (bool(self.points) and self.points[-1][0] >= time_sec)
+
+    def value(self, time_sec: int) -> float:
+        """Returns the interpolated value at `time_sec` (queries must not decrease)."""
+        if not self.points:
+            raise ValueError("Weather data contains no valid values to interpolate.")
+        # drop the points which are no longer needed
+        while len(self.points) > 1 and self.points[1][0] <= time_sec:
+            self.points.popleft()
+        t0, v0 = self.points[0]
+        if time_sec <= t0 or len(self.points) == 1:
+            return v0
+        t1, v1 = self.points[1]
+        slope = (v1 - v0) / (t1 - t0)
+        return slope * (time_sec - t0) + v0
+
+
+class _FireRiskStepper:
+    """
+    Advances the FRCM model one timestep at a time, keeping only the current
+    state (see compute_fr_vectorized for the equivalent whole-series kernel).
+    """
+
+    def __init__(self, initial_state: KernelState, lookup: bool = False) -> None:
+        self.calc_pwsat, self.calc_rhwall = (
+            (lk.lookup_pwsat, lk.lookup_rhwall)
+            if lookup
+            else (func.calc_pwsat, func.calc_rhwall)
+        )
+        self.temp_c_in = float(mp.T_c_in)
+        self.cw_sat_in = func.calc_cwsat(
+            self.calc_pwsat(self.temp_c_in), self.temp_c_in
+        )
+        self.c_supply = func.calc_csupply((mp.supply_24h / (24 * 3600)) * mp.delta_t)
+        self.operator = func.calc_wall_operator(mp.sub_layers)
+
+        self.wall = np.array(initial_state.wall, dtype=float)
+        self.surface = func.calc_surf(self.wall[0], self.wall[1])
+        self.rh_wall = self.calc_rhwall(self.surface)
+        self.cw_in = float(initial_state.cw_in)
+        self.rh_in = self.cw_in / self.cw_sat_in
+        self.c_wall = float(initial_state.c_wall)
+
+    @property
+    def ttf(self) -> float:
+        """Time To Flashover of the current state."""
+        return float(func.calc_ttf(self.surface))
+
+    def advance(self, temp_c_out: float, rh_out: float) -> None:
+        """Advances the state by one timestep, given the current outdoor values."""
+        cw_out = func.calc_cw(
+            rh_out, func.calc_cwsat(self.calc_pwsat(temp_c_out), temp_c_out)
+        )
+        beta = func.calc_beta(func.calc_ach(temp_c_out, self.temp_c_in))
+        c_ac = func.calc_cac(beta, cw_out, temp_c_out, self.temp_c_in)
+
+        flux = func.calc_wall_flux(self.rh_in, self.rh_wall, self.cw_sat_in)
+        self.wall = self.operator @ self.wall
+        self.wall[0] += flux
+        c1, c2 = self.wall[:2].tolist()
+        self.surface = func.calc_surf(c1, c2)
+
+        # inputs from the previous timestep, see compute_fr
+        delta_c = func.calc_deltac(self.rh_in, self.rh_wall, self.cw_sat_in)
+        self.cw_in = func.calc_cwin(c_ac, self.c_wall, self.c_supply, self.cw_in, beta)
+        self.rh_in = self.cw_in / self.cw_sat_in
+        self.rh_wall = self.calc_rhwall(self.surface)
+        self.c_wall = func.calc_cwall(delta_c)
+
+
+def compute_iter(
+    weather: Iterable[dm.WeatherDataPoint],
+    initial_state: dm.ModelState | None = None,
+    lookup: bool | None = None,
+) -> Iterator[Tuple[datetime.datetime, float, float]]:
+    """
+    Streaming variant of `compute`: consumes the weather data points lazily and
+    yields the fire risk once per hour, with memory independent of the length
+    of the input.
+
+    Args:
+        weather: Weather data points in ascending order of their timestamps.
+        initial_state: State of a previous simulation to continue from, see
+            `compute`.
+        lookup: Evaluate the saturation and sorption formulas with the lookup
+            tables in `frcm.fireriskmodel.lookup`, defaults to
+            `mp.lookup_tables`.
+
+    Yields:
+        Tuples of (timestamp, ttf, rh_in) for every simulated hour.
+
+    Raises:
+        ValueError: If the data points are not sorted by their timestamps, a
+            variable contains no valid values or has none over more than
+            `MAX_BUFFERED_POINTS` data points (the other variables would be
+            buffered over them).
+    """
+    temperature = _StreamInterpolator()
+    humidity = _StreamInterpolator()
+    if lookup is None:
+        lookup = mp.lookup_tables
+    stepper = _FireRiskStepper(
+        to_kernel_state(initial_state) if initial_state else initial_kernel_state(),
+        lookup,
+    )
+    # Reduction factor, i.e., how many intervals per hour, see compute()
+    rf = steps_per_hour(mp.delta_t)
+
+    start_time = initial_state.timestamp if initial_state else None
+    last_sec = None
+    step = 0
+
+    def advance_grid(
+        until_sec: int,
+    ) -> Iterator[Tuple[datetime.datetime, float, float]]:
+        nonlocal step
+        while step * mp.delta_t <= until_sec:
+            time_sec = step * mp.delta_t
+            if not (temperature.ready(time_sec) and humidity.ready(time_sec)):
+                return
+            if step % rf == 0:
+                timestamp = start_time + datetime.timedelta(seconds=time_sec)
+                yield timestamp, stepper.ttf, float(stepper.rh_in)
+            stepper.advance(temperature.value(time_sec), humidity.value(time_sec))
+            step += 1
+
+    for point in weather:
+        if start_time is None:
+            start_time = point.timestamp
+        time_sec = round((point.timestamp - start_time).total_seconds())
+        if last_sec is not None and time_sec <= last_sec:
+            raise ValueError("Weather data points must be sorted by their timestamps.")
+        last_sec = time_sec
+
+        temperature.push(time_sec, point.temperature)
+        humidity.push(time_sec, point.humidity)
+        yield from advance_grid(last_sec)
+
+    if last_sec is None:
+        return
+    temperature.finished = True
+    humidity.finished = True
+    yield from advance_grid(last_sec)
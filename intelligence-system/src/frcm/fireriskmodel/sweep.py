@@ -0,0 +1,157 @@
+from dataclasses import replace
+from typing import Sequence, Tuple
+
+import numpy as np
+
+import frcm.datamodel.model as dm
+import frcm.fireriskmodel.parameters as mp
+import frcm.fireriskmodel.preprocess as pp
+from frcm.fireriskmodel.compute import batch_prediction, compute_fr_batch
+from frcm.fireriskmodel.state import (
+    equilibrium_kernel_state,
+    initial_kernel_state,
+    to_kernel_state,
+)
+from frcm.profiling import stage
+
+
+def sweep(
+    wd: dm.WeatherData | dm.ColumnarWeatherData,
+    params: mp.ParameterSet,
+    horizon_hours: float | None = None,
+    initial_state: dm.ModelState | None = None,
+) -> dm.BatchFireRiskPrediction:
+    """
+    Evaluates one weather series against many building parameter combinations
+    (archetypes or a sensitivity grid) in a single batched simulation.
+
+    The weather data is preprocessed once and every row of the batched kernel
+    is simulated with its own combination, e.g.
+
+        sweep(wd, mp.ParameterSet.grid(A_ex=[40, 50, 60], gamma=[200, 380]))
+
+    The explicit scheme couples the panels and the bulk air with a lag of one
+    timestep, which becomes unstable for a much larger exchange area per
+    volume than the defaults (e.g. A_ex = 80 m^2 for Vol = 120 m^3).
+
+    Args:
+        wd: WeatherData (or ColumnarWeatherData) of the zone.
+        params: An array-valued ParameterSet, one entry per combination.
+        horizon_hours: Limits the simulation to the given number of hours after
+            the start. Defaults to the whole span of the data.
+        initial_state: Optional warm start state, shared by all combinations.
+            By default every combination starts from its own equilibrium state.
+
+    Returns:
+        BatchFireRiskPrediction containing the hourly TTF matrix (combinations x
+        hours) and the model state of every combination.
+
+    Raises:
+        ValueError: If the data does not extend beyond the initial state.
+    """
+    combinations = len(params)
+
+    (start_time, time_interpolated_sec, temp_interpolated, humidity_interpolated) = (
+        pp.preprocess(
+            wd,
+            horizon_hours=horizon_hours,
+            start_time=initial_state.timestamp if initial_state else None,
+            delta_t=params.delta_t,
+            variables=pp.KERNEL_VARIABLES,
+        )[:4]
+    )
+    if len(time_interpolated_sec) == 0:
+        raise ValueError("Weather data ends before the initial state.")
+
+    if initial_state is None:
+        batch_state = initial_kernel_state(combinations, params)
+    else:
+        state = to_kernel_state(initial_state)
+        batch_state = state._replace(
+            wall=np.tile(state.wall, (combinations, 1)),
+            cw_in=np.full(combinations, state.cw_in),
+            c_wall=np.full(combinations, state.c_wall),
+        )
+
+    # The same weather for every combination
+    shape = (combinations, len(time_interpolated_sec))
+    with stage("kernel", size=combinations * len(time_interpolated_sec)):
+        rh_in, ttf, final_state = compute_fr_batch(
+            np.broadcast_to(temp_interpolated, shape),
+            np.broadcast_to(humidity_interpolated, shape),
+            initial_state=batch_state,
+            return_state=True,
+            params=params,
+        )
+
+    with stage("firerisks", size=ttf.size):
+        return batch_prediction(
+            start_time, time_interpolated_sec, params.delta_t, rh_in, ttf, final_state
+        )
+
+
+def sweep_zones(
+    series: Sequence[Tuple[Sequence[int], np.ndarray, np.ndarray]],
+    params: mp.ParameterSet,
+    equilibrium: bool = False,
+) -> np.ndarray:
+    """
+    Evaluates the weather of several zones against many building parameter
+    combinations in a single batched simulation (one row per zone and
+    combination), e.g. the archetypes of every zone of a fetch cycle.
+
+    Every combination starts at the start of the series, from the steady state
+    of the first interpolated values if `equilibrium` is set (and they are
+    valid), and from its default initial conditions otherwise.
+
+    Args:
+        series: Per zone the interpolated time axis (seconds after the common
+            start, every `params.delta_t`), temperature and humidity.
+        params: An array-valued ParameterSet, one entry per combination.
+        equilibrium: Whether to start from the steady state.
+
+    Returns:
+        The TTF of every timestep (zones x combinations x time).
+
+    Raises:
+        ValueError: If the time axes differ or are empty.
+    """
+    zones, combinations = len(series), len(params)
+    steps = len(series[0][0])
+    if steps == 0 or any(len(time_sec) != steps for time_sec, *_ in series):
+        raise ValueError("Batched weather series must share a common time axis.")
+
+    temp_interpolated = np.repeat(np.stack([s[1] for s in series]), combinations, 0)
+    humidity_interpolated = np.repeat(np.stack([s[2] for s in series]), combinations, 0)
+    # the combinations of every zone, one after another
+    rows = replace(
+        params,
+        **{
+            name: np.tile(np.broadcast_to(getattr(params, name), combinations), zones)
+            for name in mp.SWEEPABLE
+        },
+    )
+
+    batch_state = initial_kernel_state(len(temp_interpolated), rows)
+    if equilibrium:
+        first_temp, first_humidity = (
+            temp_interpolated[:, 0],
+            humidity_interpolated[:, 0],
+        )
+        valid = ~(np.isnan(first_temp) | np.isnan(first_humidity))
+        if valid.any():
+            steady = equilibrium_kernel_state(first_temp, first_humidity, rows)
+            batch_state.wall[valid] = steady.wall[valid]
+            batch_state.cw_in[valid] = steady.cw_in[valid]
+            batch_state.c_wall[valid] = steady.c_wall[valid]
+
+    # a stage of its own, to tell the cost of the combinations from the
+    # simulation of the zones
+    with stage("kernel.sweep", size=temp_interpolated.size):
+        _, ttf = compute_fr_batch(
+            temp_interpolated,
+            humidity_interpolated,
+            initial_state=batch_state,
+            params=rows,
+        )
+    return ttf.reshape(zones, combinations, steps)
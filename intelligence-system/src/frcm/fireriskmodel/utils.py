@@ -1,27 +1,37 @@
-import math
+from types import ModuleType
+
+import numpy as np
 
 import frcm.fireriskmodel.parameters as mp
 
+# All formulas below are element-wise: they accept python floats as well as numpy
+# arrays of broadcastable shapes (e.g. a whole time series at once).
+ArrayLike = float | np.ndarray
+
+# The parameters are read by attribute from the `parameters` module (default) or
+# from an injected ParameterSet, whose values may be arrays (one per combination).
+Parameters = ModuleType | mp.ParameterSet
+
 """Functions for computing saturation vapor pressure, and water concentrations"""
 """ pw_sat -- cw_sat -- cw_in -- initial fmc """
 
 
 # saturation vapor pressure at temperature Temp_c (celsius)
-def calc_pwsat(temp_c: float) -> float:
+def calc_pwsat(temp_c: ArrayLike) -> ArrayLike:
     """Calculates the saturation vapor pressure at a given temperature."""
-    pwsat = 610.78 * math.exp((17.2694 * temp_c) / (temp_c + 238.3))
+    pwsat = 610.78 * np.exp((17.2694 * temp_c) / (temp_c + 238.3))
     return pwsat
 
 
 # saturation water concentration based on saturated vapor pressure (pwsat)
-def calc_cwsat(pwsat: float, temp_c: float) -> float:
+def calc_cwsat(pwsat: ArrayLike, temp_c: ArrayLike, p: Parameters = mp) -> ArrayLike:
     """Calculates the saturation water concentration."""
-    cwsat = (pwsat * mp.mol_weight) / (mp.gas_constant * (temp_c + 273.15))
+    cwsat = (pwsat * p.mol_weight) / (p.gas_constant * (temp_c + 273.15))
     return cwsat
 
 
 # actual water concentration in air
-def calc_cw(rh: float, cwsat: float) -> float:
+def calc_cw(rh: ArrayLike, cwsat: ArrayLike) -> ArrayLike:
     """Calculates the actual water concentration in the air."""
     cw = rh / 100 * cwsat
     return cw
@@ -30,15 +40,9 @@ def calc_cw(rh: float, cwsat: float) -> float:
 # computes initial fmc of wooden panels
 # computes fmc from indoor rh (equilibrium state) rh must be given as a fraction,
 # e.g., 0.35
-def calc_fmc(rh: float) -> float:
+def calc_fmc(rh: ArrayLike) -> ArrayLike:
     """Computes the initial fuel moisture content of wooden panels."""
-    c_fmc = (
-        0.0017
-        + 0.2524 * rh
-        - 0.1986 * math.pow(rh, 2)
-        + 0.0279 * math.pow(rh, 3)
-        + 0.167 * math.pow(rh, 4)
-    )
+    c_fmc = 0.0017 + 0.2524 * rh - 0.1986 * rh**2 + 0.0279 * rh**3 + 0.167 * rh**4
     return c_fmc
 
 
@@ -47,11 +51,13 @@ def calc_fmc(rh: float) -> float:
 
 
 # air change per hour (ach)
-def calc_ach(temp_c_out: float, temp_c_in: float) -> float:
+def calc_ach(
+    temp_c_out: ArrayLike, temp_c_in: ArrayLike, p: Parameters = mp
+) -> ArrayLike:
     """Calculates the air change per hour."""
-    c_ach = mp.gamma * math.sqrt(
+    c_ach = p.gamma * np.sqrt(
         (
-            abs(1 / (temp_c_out + 273.15) - 1 / (temp_c_in + 273.15))
+            np.abs(1 / (temp_c_out + 273.15) - 1 / (temp_c_in + 273.15))
             / (temp_c_out + 273.15)
         )
     )
@@ -59,9 +65,9 @@ def calc_ach(temp_c_out: float, temp_c_in: float) -> float:
 
 
 # beta ventilation factor
-def calc_beta(c_ach: float) -> float:
+def calc_beta(c_ach: ArrayLike, p: Parameters = mp) -> ArrayLike:
     """Calculates the beta ventilation factor."""
-    c_beta = 1 - math.exp((-c_ach * mp.delta_t) / 3600)
+    c_beta = 1 - np.exp((-c_ach * p.delta_t) / 3600)
     return c_beta
 
 
@@ -69,7 +75,7 @@ def calc_beta(c_ach: float) -> float:
 
 
 # extrapolating wooden panel fmc to a surface value
-def calc_surf(c1_t: float, c2_t: float) -> float:
+def calc_surf(c1_t: ArrayLike, c2_t: ArrayLike) -> ArrayLike:
     """Extrapolates the wooden panel fuel moisture content to a surface value."""
     c_surf = c1_t - 0.5 * (c2_t - c1_t)
     return c_surf
@@ -77,29 +83,53 @@ def calc_surf(c1_t: float, c2_t: float) -> float:
 
 # water concentration difference between bulk air and wall boundary layer
 # - inputs from previous timestep
-def calc_deltac(rhin: float, rhwall: float, cwsatin: float) -> float:
+def calc_deltac(rhin: ArrayLike, rhwall: ArrayLike, cwsatin: ArrayLike) -> ArrayLike:
     """Calculates the water concentration difference."""
     deltac = (rhwall - rhin) * cwsatin
     return deltac
 
 
 # relative humidity at wooden panel surfaces - inputs surface fmc at equal timestep
-def calc_rhwall(cfmc: float) -> float:
+def calc_rhwall(cfmc: ArrayLike, p: Parameters = mp) -> ArrayLike:
     """Calculates the relative humidity at the wooden panel surfaces."""
-    rhwall = (
-        0.0698
-        - 1.258 * (cfmc / mp.rho_wood)
-        + 125.35 * math.pow((cfmc / mp.rho_wood), 2)
-        - 809.43 * math.pow((cfmc / mp.rho_wood), 3)
-        + 1583.8 * math.pow((cfmc / mp.rho_wood), 4)
-    )
+    u = cfmc / p.rho_wood
+    rhwall = 0.0698 - 1.258 * u + 125.35 * u**2 - 809.43 * u**3 + 1583.8 * u**4
     return rhwall
 
 
+# derivative of calc_rhwall w.r.t. the surface fmc (used by the implicit solver)
+def calc_rhwall_derivative(cfmc: ArrayLike, p: Parameters = mp) -> ArrayLike:
+    """Calculates the derivative of the surface relative humidity."""
+    u = cfmc / p.rho_wood
+    d_rhwall = (-1.258 + 250.7 * u - 2428.29 * u**2 + 6335.2 * u**3) / p.rho_wood
+    return d_rhwall
+
+
+# surface fmc at which calc_rhwall equals the given rh (inverse of calc_rhwall)
+# calc_rhwall increases monotonically for u = fmc / rho_wood in [0.0053, 0.4],
+# rh outside of its range (about 0.067 to 4.5) is clipped to the interval ends
+def calc_rhwall_inverse(rh: ArrayLike, p: Parameters = mp) -> ArrayLike:
+    """Calculates the surface fuel moisture content in equilibrium with rh."""
+    rh = np.asarray(rh, dtype=float)
+    lower = np.full(rh.shape, 0.0053 * p.rho_wood)
+    upper = np.full(rh.shape, 0.4 * p.rho_wood)
+    # bisection, 50 halvings are below double precision of the interval
+    for _ in range(50):
+        middle = 0.5 * (lower + upper)
+        below = calc_rhwall(middle, p) < rh
+        lower = np.where(below, middle, lower)
+        upper = np.where(below, upper, middle)
+    return 0.5 * (lower + upper)
+
+
 # indoor water concentration - input from previous timestep
 def calc_cwin(
-    cac: float, cwall: float, csupply: float, cwin: float, beta: float
-) -> float:
+    cac: ArrayLike,
+    cwall: ArrayLike,
+    csupply: ArrayLike,
+    cwin: ArrayLike,
+    beta: ArrayLike,
+) -> ArrayLike:
     """Calculates the indoor water concentration."""
     cwin = (1 - beta) * cwin + cac + cwall + csupply
     return cwin
@@ -112,49 +142,106 @@ def calc_cwin(
 # by use of fmc values in layer 1 and layer 2
 # inputs from previous timestep
 def calc_layer1(
-    rhin: float, rhwall: float, c1_t: float, c2_t: float, csatin: float
-) -> float:
+    rhin: ArrayLike,
+    rhwall: ArrayLike,
+    c1_t: ArrayLike,
+    c2_t: ArrayLike,
+    csatin: ArrayLike,
+    p: Parameters = mp,
+) -> ArrayLike:
     """Computes the fuel moisture content in layer 1."""
-    layer1 = c1_t + (mp.delta_t / mp.delta_x) * (
-        (mp.D_W_a / mp.boundary_layer) * (rhin - rhwall) * csatin
-        + (mp.D_w_s / mp.delta_x) * (c2_t - c1_t)
+    layer1 = c1_t + (p.delta_t / p.delta_x) * (
+        (p.D_W_a / p.boundary_layer) * (rhin - rhwall) * csatin
+        + (p.D_w_s / p.delta_x) * (c2_t - c1_t)
     )
     return layer1
 
 
 # computing the fmc in layers 2 to N-1 (second last layer) at time t+1
 # by second order central difference - inputs from previous timestep
-def calc_middle_layers(cn_t: float, c_prev_n_t: float, c_post_n_t: float) -> float:
+def calc_middle_layers(
+    cn_t: ArrayLike, c_prev_n_t: ArrayLike, c_post_n_t: ArrayLike, p: Parameters = mp
+) -> ArrayLike:
     """Computes the fuel moisture content in the middle layers."""
-    middle_layer = cn_t + mp.fourier * (c_prev_n_t - 2 * cn_t + c_post_n_t)
+    middle_layer = cn_t + p.fourier * (c_prev_n_t - 2 * cn_t + c_post_n_t)
     return middle_layer
 
 
 # computing the fmc in the last layer (backside of wooden panels)
 # based on fmc from layer N-1 and Layer N both from previous timestep
-def calc_outer_layer(cn_t: float, c_pre_n_t: float) -> float:
+def calc_outer_layer(
+    cn_t: ArrayLike, c_pre_n_t: ArrayLike, p: Parameters = mp
+) -> ArrayLike:
     """Computes the fuel moisture content in the outer layer."""
-    outer_layer = cn_t + mp.fourier * (c_pre_n_t - cn_t)
+    outer_layer = cn_t + p.fourier * (c_pre_n_t - cn_t)
     return outer_layer
 
 
+# explicit update operator for all wall layers (tridiagonal Fourier-number matrix)
+# wall(t+1) = operator @ wall(t), plus the boundary flux added to layer 1
+# array-valued parameters give one operator per combination (..., N, N)
+def calc_wall_operator(sub_layers: int, p: Parameters = mp) -> np.ndarray:
+    """Builds the explicit update matrix of the wooden panel diffusion."""
+    k1 = np.asarray((p.delta_t / p.delta_x) * (p.D_w_s / p.delta_x))
+    fourier = np.asarray(p.fourier)
+    shape = np.broadcast_shapes(k1.shape, fourier.shape)
+    operator = np.zeros(shape + (sub_layers, sub_layers))
+    # layer 1 (diffusion part of calc_layer1)
+    operator[..., 0, 0] = 1 - k1
+    operator[..., 0, 1] = k1
+    # layers 2 to N-1 (calc_middle_layers)
+    for n in range(1, sub_layers - 1):
+        operator[..., n, n - 1] = fourier
+        operator[..., n, n] = 1 - 2 * fourier
+        operator[..., n, n + 1] = fourier
+    # layer N (calc_outer_layer)
+    operator[..., -1, -2] = fourier
+    operator[..., -1, -1] = 1 - fourier
+    return operator
+
+
+# fmc change in layer 1 due to exchange with the bulk air (boundary part of
+# calc_layer1) - inputs from previous timestep
+def calc_wall_flux(
+    rhin: ArrayLike, rhwall: ArrayLike, csatin: ArrayLike, p: Parameters = mp
+) -> ArrayLike:
+    """Computes the fuel moisture content change of layer 1 from the boundary."""
+    flux = (p.delta_t / p.delta_x) * (
+        (p.D_W_a / p.boundary_layer) * (rhin - rhwall) * csatin
+    )
+    return flux
+
+
 """ The main contributions to change in indoor water concentration """
 """ Supply -- Air Change by Ventilation -- Humidity Exchange From Wooden Surfaces"""
 
 
-def calc_csupply(sup: float) -> float:
+def calc_csupply(sup: ArrayLike, p: Parameters = mp) -> ArrayLike:
     """Calculates the water concentration from supply."""
-    csupply = sup / mp.Vol
+    csupply = sup / p.Vol
     return csupply
 
 
-def calc_cac(beta: float, cw_out: float, temp_c_out: float, temp_c_in: float) -> float:
+def calc_cac(
+    beta: ArrayLike, cw_out: ArrayLike, temp_c_out: ArrayLike, temp_c_in: ArrayLike
+) -> ArrayLike:
     """Calculates the water concentration from air change."""
     cac = beta * cw_out * ((temp_c_out + 273.15) / (temp_c_in + 273.15))
     return cac
 
 
-def calc_cwall(deltac: float) -> float:
+def calc_cwall(deltac: ArrayLike, p: Parameters = mp) -> ArrayLike:
     """Calculates the water concentration from the wall."""
-    cwall = (mp.A_ex * mp.D_W_a * deltac * mp.delta_t / mp.boundary_layer) / mp.Vol
+    cwall = (p.A_ex * p.D_W_a * deltac * p.delta_t / p.boundary_layer) / p.Vol
     return cwall
+
+
+""" Time To Flashover """
+
+
+# time to flashover (minutes) from the wooden surface fmc
+def calc_ttf(c_surf: ArrayLike, p: Parameters = mp) -> ArrayLike:
+    """Calculates the time to flashover from the surface fuel moisture content."""
+    fmc = c_surf * (100 / p.rho_wood)
+    ttf = 2 * np.exp(0.16 * fmc)
+    return ttf
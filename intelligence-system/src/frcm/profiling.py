@@ -0,0 +1,164 @@
+"""
+Optional per-stage instrumentation of the FRCM pipeline.
+
+The pipeline marks its stages (MET transformation, validation, preprocessing,
+kernel, building the results) with `stage`. Nothing is recorded unless a
+Profiler is activated for the current context:
+
+    with profile() as profiler:
+        compute(wd)
+    print(profiler.format())
+
+Without an active profiler `stage` returns a shared no-op context manager, so
+the hooks cost a context variable lookup per stage (not per timestep or data
+point). The active profiler follows the context into asyncio tasks and
+`asyncio.to_thread`, recording from several threads is safe. Work in other
+processes is recorded there and added with `Profiler.merge`.
+"""
+
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, ContextManager, Dict, Iterator
+
+# Called with the stage name, its wall time (seconds) and size after every stage
+StageCallback = Callable[[str, float, int], None]
+
+
+@dataclass
+class StageStats:
+    """Accumulated measurements of one stage."""
+
+    calls: int = 0
+    # wall time (seconds), including nested stages
+    seconds: float = 0.0
+    # number of processed elements (data points, timesteps x zones, ...)
+    size: int = 0
+    max_size: int = 0
+
+
+class Profiler:
+    """Collects the wall time, call counts and sizes of the pipeline stages."""
+
+    def __init__(self, callback: StageCallback | None = None) -> None:
+        """
+        Args:
+            callback: Optional function called after every recorded stage, e.g.
+                to forward the measurements to a metrics client.
+        """
+        self.stages: Dict[str, StageStats] = {}
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, size: int = 0) -> None:
+        """Adds a measurement of the given stage."""
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.size += size
+            stats.max_size = max(stats.max_size, size)
+        if self.callback is not None:
+            self.callback(name, seconds, size)
+
+    @contextlib.contextmanager
+    def stage(self, name: str, size: int = 0) -> Iterator[None]:
+        """Measures the wall time of the enclosed block as the given stage."""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - begin, size)
+
+    def merge(self, stages: Dict[str, StageStats]) -> None:
+        """Adds measurements taken elsewhere, e.g. by a profiler in a subprocess."""
+        with self._lock:
+            for name, other in stages.items():
+                stats = self.stages.setdefault(name, StageStats())
+                stats.calls += other.calls
+                stats.seconds += other.seconds
+                stats.size += other.size
+                stats.max_size = max(stats.max_size, other.max_size)
+
+    def reset(self) -> None:
+        """Discards all measurements."""
+        with self._lock:
+            self.stages.clear()
+
+    def metrics(self, prefix: str = "frcm") -> Dict[str, float]:
+        """
+        Flattens the measurements to metric names, e.g.
+        "frcm_preprocess_seconds", "frcm_preprocess_calls" and
+        "frcm_preprocess_size" (dots of nested stages become underscores).
+        """
+        metrics: Dict[str, float] = {}
+        with self._lock:
+            for name, stats in self.stages.items():
+                key = f"{prefix}_{name.replace('.', '_')}"
+                metrics[f"{key}_seconds"] = stats.seconds
+                metrics[f"{key}_calls"] = stats.calls
+                metrics[f"{key}_size"] = stats.size
+                metrics[f"{key}_max_size"] = stats.max_size
+        return metrics
+
+    def format(self) -> str:
+        """Formats the measurements as a table in the order of first use."""
+        lines = [
+            f"{'stage':<24} {'calls':>7} {'total (ms)':>11} {'mean (ms)':>10} "
+            f"{'size':>10} {'max size':>9}"
+        ]
+        with self._lock:
+            for name, stats in self.stages.items():
+                lines.append(
+                    f"{name:<24} {stats.calls:>7} {stats.seconds * 1e3:>11.3f} "
+                    f"{stats.seconds * 1e3 / stats.calls:>10.3f} "
+                    f"{stats.size:>10} {stats.max_size:>9}"
+                )
+        return "\n".join(lines)
+
+
+_active: ContextVar[Profiler | None] = ContextVar("frcm_profiler", default=None)
+_DISABLED = contextlib.nullcontext()
+
+
+def stage(name: str, size: int = 0) -> ContextManager[None]:
+    """
+    Marks a stage of the pipeline, measured if a profiler is active.
+
+    Args:
+        name: Name of the stage, nested stages are named "outer.inner".
+        size: Number of elements the stage processes.
+    """
+    profiler = _active.get()
+    if profiler is None:
+        return _DISABLED
+    return profiler.stage(name, size)
+
+
+def active_profiler() -> Profiler | None:
+    """The profiler active in the current context, if any."""
+    return _active.get()
+
+
+@contextlib.contextmanager
+def profile(profiler: Profiler | None = None) -> Iterator[Profiler]:
+    """
+    Activates a profiler for the enclosed block (and the tasks and threads
+    started from it).
+
+    Args:
+        profiler: The profiler to record into, e.g. to accumulate several
+            blocks. Defaults to a new one.
+
+    Returns:
+        The active profiler.
+    """
+    if profiler is None:
+        profiler = Profiler()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
@@ -13,7 +13,10 @@ from db.database import (
     get_zone_by_geohash,
     seed_initial_zones,
 )
-from services.zone_processor import process_zone
+from frcm.profiling import Profiler, profile
+from services.compute_pool import compute_pool
+from services.result_cache import result_cache
+from services.zone_processor import process_zone, process_zones
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +24,8 @@ logger = logging.getLogger("IntelligenceSystem")
 
 # Redis Client
 redis_client = redis.from_url(settings.REDIS_URL)
+if settings.FRCM_CACHE_REDIS:
+    result_cache.redis = redis_client
 
 
 async def job() -> None:
@@ -36,11 +41,15 @@ async def job() -> None:
     # Limit concurrency to avoid overloading MET API or DB connection pool
     semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_FETCHES)
 
-    # Create tasks for all zones
-    tasks = [process_zone(zone, semaphore) for zone in monitored_zones]
-
-    # Run tasks concurrently
-    await asyncio.gather(*tasks)
+    # Fetch and save concurrently, compute the risk of all zones in one batch
+    if settings.FRCM_PROFILE:
+        with profile() as profiler:
+            await process_zones(monitored_zones, semaphore)
+        await publish_profile(profiler)
+    else:
+        await process_zones(monitored_zones, semaphore)
+    if settings.FRCM_CACHE_ENABLED:
+        await publish_cache_metrics()
 
     logger.info("Fetch cycle completed.")
 
@@ -52,6 +61,34 @@ async def job() -> None:
         logger.info(f"DEBUG - Latest data for {sample_geohash}: {latest_data}")
 
 
+async def publish_profile(profiler: Profiler) -> None:
+    """
+    Logs the FRCM stage timings of a fetch cycle and stores them as metrics in
+    the Redis hash `settings.FRCM_PROFILE_KEY` (overwritten every cycle).
+    """
+    logger.info(f"FRCM stage timings of the fetch cycle:\n{profiler.format()}")
+    try:
+        await redis_client.hset(settings.FRCM_PROFILE_KEY, mapping=profiler.metrics())
+    except Exception as e:
+        logger.warning(f"Could not store the FRCM profile: {e}")
+
+
+async def publish_cache_metrics() -> None:
+    """
+    Logs the hit rate of the FRCM result cache and stores its counters (since
+    the start of the worker) in the Redis hash `settings.FRCM_CACHE_METRICS_KEY`.
+    """
+    metrics = result_cache.metrics()
+    logger.info(
+        f"FRCM result cache: hit rate {metrics['frcm_cache_hit_rate']:.1%}, "
+        f"{metrics['frcm_cache_entries']} entries"
+    )
+    try:
+        await redis_client.hset(settings.FRCM_CACHE_METRICS_KEY, mapping=metrics)
+    except Exception as e:
+        logger.warning(f"Could not store the FRCM cache metrics: {e}")
+
+
 async def process_instant_queue() -> None:
     """Listens for instant requests pushed by the backend via Redis."""
     logger.info("Instant Queue Processor Started.")
@@ -77,8 +114,11 @@ async def process_instant_queue() -> None:
                     logger.error(f"Zone {loc_id} not found in database.")
                     continue
 
-                # 2. Process the zone
-                risk_data = await process_zone(zone)
+                # 2. Process the zone, starting from the steady state without
+                # spin-up to keep the latency low
+                risk_data = await process_zone(
+                    zone, spinup_hours=settings.FRCM_INSTANT_SPINUP_HOURS
+                )
 
                 if risk_data:
                     # 3. Publish the result back to Redis so the Backend can stream it
@@ -118,7 +158,10 @@ async def main() -> None:
     await seed_initial_zones()
 
     # Run instant queue and scheduled tasks concurrently
-    await asyncio.gather(process_instant_queue(), process_scheduled_locations())
+    try:
+        await asyncio.gather(process_instant_queue(), process_scheduled_locations())
+    finally:
+        compute_pool.shutdown()
 
 
 if __name__ == "__main__":
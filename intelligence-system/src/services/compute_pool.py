@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+from config import settings
+from frcm.profiling import StageStats, active_profiler, profile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Mount point of the cgroup file system, see `cgroup_cpu_limit`
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cgroup_cpu_limit(root: Path | None = None) -> float | None:
+    """
+    The CPU quota of the cgroup of the process in cores (e.g. 1.5 for
+    `docker run --cpus=1.5`), from cgroup v2 `cpu.max` or the cgroup v1 CFS
+    quota below `root` (default `CGROUP_ROOT`). None without a limit or cgroup
+    file system.
+    """
+    if root is None:
+        root = CGROUP_ROOT
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+    except (OSError, ValueError):
+        try:
+            quota = (root / "cpu" / "cpu.cfs_quota_us").read_text().strip()
+            period = (root / "cpu" / "cpu.cfs_period_us").read_text().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus() -> int:
+    """
+    Cores the process may use: the cores of its CPU affinity, at most its
+    cgroup CPU quota rounded up (a container sees all cores of the host in
+    `os.cpu_count`).
+    """
+    if hasattr(os, "process_cpu_count"):
+        count = os.process_cpu_count()
+    elif hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count()
+    count = count or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        count = min(count, max(1, math.ceil(limit)))
+    return count
+
+
+def _call(
+    fn: Callable[..., T],
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    profiled: bool,
+) -> Tuple[T, Dict[str, StageStats] | None]:
+    """
+    Runs a function in a worker process, profiling it if the caller has an
+    active profiler (the profiler itself lives in the parent process).
+    """
+    if not profiled:
+        return fn(*args, **kwargs), None
+    with profile() as profiler:
+        result = fn(*args, **kwargs)
+    return result, profiler.stages
+
+
+class ComputePool:
+    """
+    Runs the CPU-bound FRCM computations outside of the event loop, so that the
+    loop only does I/O (MET fetches, DB writes, the Redis instant queue).
+
+    With `workers` > 0 the computations run in a pool of worker processes,
+    which lets a single container use all of its cores. With `workers` = 0 they
+    run in a thread of the default executor instead (no pickling, e.g. for
+    tests), which still keeps the loop responsive between numpy calls.
+
+    At most `queue_size` computations are submitted at a time, further callers
+    wait in `run`, so that a large fetch cycle cannot pile up unbounded work
+    (and pickled inputs) in the executor queue.
+    """
+
+    def __init__(self, workers: int | None = None, queue_size: int | None = None):
+        """
+        Args:
+            workers: Number of worker processes, defaults to
+                `settings.FRCM_COMPUTE_WORKERS` or the cores available to the
+                process (see `available_cpus`).
+            queue_size: Maximum number of submitted computations, defaults to
+                `settings.FRCM_COMPUTE_QUEUE_SIZE` or twice the worker count.
+        """
+        if workers is None:
+            workers = settings.FRCM_COMPUTE_WORKERS
+        if workers is None:
+            workers = available_cpus()
+        if queue_size is None:
+            queue_size = settings.FRCM_COMPUTE_QUEUE_SIZE
+        if queue_size is None:
+            queue_size = 2 * max(1, workers)
+
+        self.workers = workers
+        self.queue_size = queue_size
+        # Created in the loop running the computations, see `_get_slots`
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        """
+        The semaphore bounding the submitted computations, created on first use
+        in the running loop (a semaphore cannot be shared between loops).
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.queue_size)
+            self._slots_loop = loop
+        return self._slots
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Starts the worker processes on first use."""
+        if self._executor is None:
+            # "spawn" starts clean interpreters, forking the running event loop
+            # (and the threads of its clients) is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Runs `fn(*args, **kwargs)` in the pool and waits for the result.
+
+        The function and its arguments must be picklable when worker processes
+        are used, i.e. module level functions and plain data.
+
+        Raises:
+            Whatever `fn` raises. If a worker process died, BrokenProcessPool is
+            raised for the computations running in the pool, which is started
+            again for the next call.
+        """
+        async with self._get_slots():
+            if self.workers == 0:
+                return await asyncio.to_thread(fn, *args, **kwargs)
+
+            profiler = active_profiler()
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                result, stages = await loop.run_in_executor(
+                    executor, _call, fn, args, kwargs, profiler is not None
+                )
+            except BrokenProcessPool:
+                # Only the first of the failed calls replaces the pool, the
+                # others must not stop the new one
+                if self._executor is executor:
+                    logger.error("FRCM compute worker died, restarting the pool.")
+                    self.shutdown(wait=False)
+                raise
+
+            if profiler is not None and stages:
+                profiler.merge(stages)
+            return result
+
+    def chunks(self, count: int) -> int:
+        """Number of parts to split `count` independent zones into."""
+        return max(1, min(self.workers, count))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the worker processes (they are restarted on the next run)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Shared by the zone processing of the worker
+compute_pool = ComputePool()
@@ -0,0 +1,294 @@
+"""
+Bulk re-scoring of the stored fire risks.
+
+The risk score and category are stored with every TTF at write time, so the
+history becomes inconsistent when the risk scale (`settings.RISK_SCORE_*`,
+`settings.RISK_CATEGOR*`) is retuned. `rescore_tables` recomputes them from
+the stored TTF with `calculate_risk_scores`, one chunk of
+`settings.RISK_RESCORE_CHUNK_SIZE` rows at a time:
+
+- the rows are read in primary key order (keyset pagination, no offsets),
+- each chunk is re-scored in one numpy call,
+- the changed rows of a chunk are written back in one batched UPDATE, in a
+  transaction of its own, so that row locks are held for one chunk only.
+
+An UPDATE only applies to rows whose TTF is still the one read, rows
+rewritten by the worker meanwhile are left as they are. The progress of every
+table (the last primary key done and row counts) is stored in the Redis hash
+`settings.RISK_RESCORE_PROGRESS_KEY` after every chunk, so an interrupted job
+continues where it stopped, unless the scale has changed since.
+
+Run against the configured database with:
+
+    PYTHONPATH=src python -m services.rescoring [--table TABLE ...] [--restart]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import bindparam, select, tuple_, update
+
+from config import settings
+from db.database import (
+    AsyncSessionLocal,
+    CurrentArchetypeFireRisk,
+    CurrentFireRisk,
+    FireRiskReading,
+)
+from services.result_cache import content_key
+from utils.fire_risk_service import RiskScale, calculate_risk_scores
+
+logger = logging.getLogger(__name__)
+
+# Tables storing risk scores, re-scored in this order
+RESCORE_MODELS = {
+    model.__tablename__: model
+    for model in (FireRiskReading, CurrentFireRisk, CurrentArchetypeFireRisk)
+}
+
+
+@dataclass
+class RescoreProgress:
+    """Progress of the re-scoring of one table."""
+
+    table: str
+    # content key of the RiskScale applied
+    scale: str
+    # primary key of the last row done (None before the first chunk)
+    last_key: List[Any] | None = None
+    rows_read: int = 0
+    rows_updated: int = 0
+    done: bool = False
+
+
+def scale_key(scale: RiskScale) -> str:
+    """Identifies a risk scale in the stored progress."""
+    return content_key("risk_scale", asdict(scale))
+
+
+async def load_progress(
+    redis: Any | None, table: str, scale: RiskScale
+) -> RescoreProgress:
+    """
+    Returns the stored progress of a table, or a fresh one if there is none
+    or it was made with another scale.
+    """
+    fresh = RescoreProgress(table=table, scale=scale_key(scale))
+    if redis is None:
+        return fresh
+    try:
+        raw = await redis.hget(settings.RISK_RESCORE_PROGRESS_KEY, table)
+    except Exception as e:
+        logger.warning(f"Could not read the re-scoring progress of {table}: {e}")
+        return fresh
+    if raw is None:
+        return fresh
+    progress = RescoreProgress(**json.loads(raw))
+    return progress if progress.scale == fresh.scale else fresh
+
+
+async def save_progress(redis: Any | None, progress: RescoreProgress) -> None:
+    """Stores the progress of a table (a field of the progress hash)."""
+    if redis is None:
+        return
+    try:
+        await redis.hset(
+            settings.RISK_RESCORE_PROGRESS_KEY,
+            progress.table,
+            json.dumps(asdict(progress)),
+        )
+    except Exception as e:
+        logger.warning(f"Could not store the re-scoring progress: {e}")
+
+
+def rescore_rows(rows: Sequence[Any], scale: RiskScale) -> List[Dict[str, Any]]:
+    """
+    Re-scores a chunk of rows (primary key columns followed by ttf,
+    risk_score and risk_category).
+
+    Returns:
+        The parameters of the UPDATE of the rows whose score or category
+        changes, keyed "pk_<i>" (primary key columns), "old_ttf", "new_score"
+        and "new_category".
+    """
+    keys = len(rows[0]) - 3 if rows else 0
+    ttf = np.array([row[keys] for row in rows], dtype=float)
+    old_score = np.array([row[keys + 1] for row in rows], dtype=float)
+    old_category = np.array([row[keys + 2] for row in rows], dtype=object)
+
+    score, category = calculate_risk_scores(ttf, scale)
+    changed = (score != old_score) | (category.astype(object) != old_category)
+
+    return [
+        {
+            **{f"pk_{i}": rows[index][i] for i in range(keys)},
+            "old_ttf": rows[index][keys],
+            "new_score": float(score[index]),
+            "new_category": str(category[index]),
+        }
+        for index in np.flatnonzero(changed)
+    ]
+
+
+async def rescore_table(
+    model: Any,
+    scale: RiskScale,
+    progress: RescoreProgress,
+    session_factory: Callable[[], Any] = AsyncSessionLocal,
+    redis: Any | None = None,
+    chunk_size: int | None = None,
+    pause_seconds: float | None = None,
+) -> RescoreProgress:
+    """
+    Re-scores the rows of a table after `progress.last_key`, see the module
+    docstring.
+
+    Args:
+        model: The ORM model of the table, with ttf, risk_score and
+            risk_category columns.
+        scale: The risk scale to apply.
+        progress: Where to continue, updated in place and stored after every
+            chunk.
+        session_factory: Creates the database session of a chunk.
+        redis: Async Redis client storing the progress, None to keep it in
+            memory only.
+        chunk_size: Rows per chunk, defaults to `settings.RISK_RESCORE_CHUNK_SIZE`.
+        pause_seconds: Pause between chunks, defaults to
+            `settings.RISK_RESCORE_PAUSE_SECONDS`.
+
+    Returns:
+        The final progress.
+    """
+    if chunk_size is None:
+        chunk_size = settings.RISK_RESCORE_CHUNK_SIZE
+    if pause_seconds is None:
+        pause_seconds = settings.RISK_RESCORE_PAUSE_SECONDS
+
+    table = model.__table__
+    primary_key = list(table.primary_key.columns)
+    statement = (
+        update(table)
+        .where(
+            *(column == bindparam(f"pk_{i}") for i, column in enumerate(primary_key)),
+            table.c.ttf == bindparam("old_ttf"),
+        )
+        .values(
+            risk_score=bindparam("new_score"),
+            risk_category=bindparam("new_category"),
+        )
+    )
+    if "updated_at" in table.c:
+        # a re-scored row is not a newer prediction
+        statement = statement.values(updated_at=table.c.updated_at)
+
+    while not progress.done:
+        query = (
+            select(*primary_key, table.c.ttf, table.c.risk_score, table.c.risk_category)
+            .where(table.c.ttf.is_not(None))
+            .order_by(*primary_key)
+            .limit(chunk_size)
+        )
+        if progress.last_key is not None:
+            query = query.where(tuple_(*primary_key) > tuple_(*progress.last_key))
+
+        async with session_factory() as db:
+            rows = (await db.execute(query)).all()
+            updates = rescore_rows(rows, scale)
+            if updates:
+                await db.execute(statement, updates)
+            await db.commit()
+
+        if rows:
+            progress.last_key = list(rows[-1][: len(primary_key)])
+            progress.rows_read += len(rows)
+            progress.rows_updated += len(updates)
+        progress.done = len(rows) < chunk_size
+        await save_progress(redis, progress)
+        logger.info(
+            f"Re-scored {progress.table}: {progress.rows_read} rows read, "
+            f"{progress.rows_updated} updated"
+        )
+        if not progress.done and pause_seconds > 0:
+            await asyncio.sleep(pause_seconds)
+
+    return progress
+
+
+async def rescore_tables(
+    tables: Sequence[str] | None = None,
+    scale: RiskScale | None = None,
+    session_factory: Callable[[], Any] = AsyncSessionLocal,
+    redis: Any | None = None,
+    restart: bool = False,
+    chunk_size: int | None = None,
+    pause_seconds: float | None = None,
+) -> Dict[str, RescoreProgress]:
+    """
+    Re-scores the stored risks of the given tables (default: all of
+    `RESCORE_MODELS`), continuing the stored progress unless `restart`.
+    Tables already done with the same scale are skipped.
+
+    Returns:
+        The final progress by table name.
+    """
+    if scale is None:
+        scale = RiskScale.from_settings()
+    results = {}
+    for name in tables or list(RESCORE_MODELS):
+        if restart:
+            progress = RescoreProgress(table=name, scale=scale_key(scale))
+        else:
+            progress = await load_progress(redis, name, scale)
+        results[name] = await rescore_table(
+            RESCORE_MODELS[name],
+            scale,
+            progress,
+            session_factory=session_factory,
+            redis=redis,
+            chunk_size=chunk_size,
+            pause_seconds=pause_seconds,
+        )
+    return results
+
+
+async def main(argv: List[str] | None = None) -> None:
+    """Re-scores the configured database, see the module docstring."""
+    import redis.asyncio as aioredis
+
+    parser = argparse.ArgumentParser(description="Re-score the stored fire risks.")
+    parser.add_argument(
+        "--table", action="append", choices=list(RESCORE_MODELS), dest="tables"
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore the stored progress"
+    )
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--pause-seconds", type=float)
+    args = parser.parse_args(argv)
+
+    redis_client = aioredis.from_url(settings.REDIS_URL)
+    try:
+        results = await rescore_tables(
+            args.tables,
+            redis=redis_client,
+            restart=args.restart,
+            chunk_size=args.chunk_size,
+            pause_seconds=args.pause_seconds,
+        )
+    finally:
+        await redis_client.aclose()
+    for progress in results.values():
+        logger.info(
+            f"{progress.table}: {progress.rows_read} rows, "
+            f"{progress.rows_updated} re-scored"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
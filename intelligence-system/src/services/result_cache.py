@@ -0,0 +1,295 @@
+"""
+Content-addressed cache of FRCM results.
+
+MET returns identical forecasts for neighbouring zones which fall into the same
+grid cell of its model, and for every poll until the next model run. The
+results are therefore cached by a hash of everything a simulation depends on
+(see `content_key`): the normalized weather arrays, the model parameters, the
+settings deciding the simulation window and the stored state it continues from.
+
+The cache has an in-process LRU tier of `settings.FRCM_CACHE_SIZE` entries and
+an optional Redis tier shared by all workers (`settings.FRCM_CACHE_REDIS`),
+whose entries expire after `settings.FRCM_CACHE_TTL_SECONDS`. Hits and misses
+are counted per tier, see `ResultCache.metrics`.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+import frcm.fireriskmodel.parameters as mp
+from config import settings
+from frcm.datamodel import model as dm
+
+logger = logging.getLogger(__name__)
+
+# Part of every key, to be increased when a change of the model changes results
+# (the Redis tier outlives deployments)
+CACHE_VERSION = 4
+
+# Module level model settings which are not part of a ParameterSet
+MODEL_SETTINGS = (
+    "wall_solver",
+    "implicit_delta_t",
+    "implicit_theta",
+    "precision",
+    "lookup_tables",
+)
+
+
+def weather_arrays(
+    wd: dm.WeatherData | dm.ColumnarWeatherData,
+) -> Tuple[np.ndarray, ...]:
+    """
+    Normalizes weather data to the arrays the simulation depends on: the
+    timestamps (epoch seconds) and the temperature, humidity and wind speed as
+    float64, sorted by time.
+    """
+    if isinstance(wd, dm.WeatherData):
+        wd = dm.ColumnarWeatherData.from_weather_data(wd)
+    timestamp, temperature, humidity, wind_speed = wd.columns()
+    return (
+        timestamp.astype("datetime64[us]").astype(np.int64) / 1e6,
+        np.asarray(temperature, dtype=float),
+        np.asarray(humidity, dtype=float),
+        np.asarray(wind_speed, dtype=float),
+    )
+
+
+def model_fingerprint() -> Dict[str, Any]:
+    """The current values of the model parameters in `parameters`."""
+    names = [field.name for field in fields(mp.ParameterSet)] + list(MODEL_SETTINGS)
+    return {name: getattr(mp, name) for name in names}
+
+
+def _update(digest: Any, value: Any) -> None:
+    """Feeds a value into the digest, with type tags so that kinds cannot collide."""
+    if isinstance(value, np.ndarray):
+        digest.update(f"a{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"l{len(value)}".encode())
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"d{len(value)}".encode())
+        for key in sorted(value):
+            _update(digest, key)
+            _update(digest, value[key])
+    elif isinstance(value, BaseModel):
+        _update(digest, value.model_dump())
+    elif isinstance(value, datetime.datetime):
+        digest.update(f"t{dm.to_epoch_seconds(value)!r}".encode())
+    elif isinstance(value, (float, np.floating)):
+        digest.update(f"f{float(value)!r}".encode())
+    else:
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+    digest.update(b"\0")
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Hashes the inputs of a computation (arrays, numbers, strings, datetimes,
+    pydantic models and containers of them) into a cache key.
+    """
+    digest = hashlib.sha256()
+    _update(digest, CACHE_VERSION)
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+
+def _default(value: Any) -> Any:
+    """JSON encoding of the non-JSON values in results."""
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, dm.ModelState):
+        return {"$state": value.model_dump(mode="json")}
+    raise TypeError(f"Cannot cache a value of type {type(value).__name__}")
+
+
+def _object_hook(value: Dict[str, Any]) -> Any:
+    """Decoding of the values encoded by `_default`."""
+    if "$datetime" in value:
+        return datetime.datetime.fromisoformat(value["$datetime"])
+    if "$state" in value:
+        return dm.ModelState.model_validate(value["$state"])
+    return value
+
+
+@dataclass
+class CacheStats:
+    """Lookups of a ResultCache since its creation (or reset)."""
+
+    hits: int = 0
+    redis_hits: int = 0
+    # lookups of a key missing earlier in the same batch, computed only once
+    duplicates: int = 0
+    misses: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.redis_hits + self.duplicates + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the lookups which did not need a simulation."""
+        if self.lookups == 0:
+            return 0.0
+        return 1 - self.misses / self.lookups
+
+
+class ResultCache:
+    """
+    LRU cache of results by content key, with an optional Redis tier.
+
+    The in-process tier is thread-safe. The Redis tier is used by the async
+    `get_many` and `put_many` only, errors of Redis are logged and treated as
+    misses.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        redis: Any | None = None,
+        ttl_seconds: int | None = None,
+        prefix: str | None = None,
+    ) -> None:
+        """
+        Args:
+            max_entries: Size of the in-process tier, defaults to
+                `settings.FRCM_CACHE_SIZE`.
+            redis: Async Redis client of the shared tier, None to disable it.
+            ttl_seconds: Expiry of the Redis entries, defaults to
+                `settings.FRCM_CACHE_TTL_SECONDS`.
+            prefix: Prefix of the Redis keys, defaults to
+                `settings.FRCM_CACHE_KEY_PREFIX`.
+        """
+        self.max_entries = (
+            settings.FRCM_CACHE_SIZE if max_entries is None else max_entries
+        )
+        self.redis = redis
+        self.ttl_seconds = (
+            settings.FRCM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.prefix = settings.FRCM_CACHE_KEY_PREFIX if prefix is None else prefix
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        """Returns the locally cached value of the key, without counting the lookup."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Caches a value locally, evicting the least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_many(self, keys: Sequence[str | None]) -> List[Any | None]:
+        """
+        Looks up the keys in both tiers and counts the lookups. None keys
+        (inputs which cannot be cached) are neither looked up nor counted.
+
+        Returns:
+            The cached values aligned with `keys`, None for misses.
+        """
+        values: List[Any | None] = [self.get(key) if key else None for key in keys]
+        missing = list(
+            dict.fromkeys(
+                key for key, value in zip(keys, values) if key and value is None
+            )
+        )
+        found: Dict[str, Any] = {}
+        if missing and self.redis is not None:
+            found = await self._redis_get(missing)
+
+        seen = set()
+        for index, (key, value) in enumerate(zip(keys, values)):
+            if not key:
+                continue
+            if value is not None:
+                self.stats.hits += 1
+            elif key in found:
+                values[index] = found[key]
+                self.stats.redis_hits += 1
+            elif key in seen:
+                self.stats.duplicates += 1
+            else:
+                self.stats.misses += 1
+            seen.add(key)
+        for key, value in found.items():
+            self.put(key, value)
+        return values
+
+    async def put_many(self, items: Dict[str, Any]) -> None:
+        """Caches the values in both tiers."""
+        for key, value in items.items():
+            self.put(key, value)
+        if items and self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, value in items.items():
+                        pipe.set(
+                            self.prefix + key,
+                            json.dumps(value, default=_default),
+                            ex=self.ttl_seconds,
+                        )
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Could not store FRCM results in Redis: {e}")
+
+    async def _redis_get(self, keys: List[str]) -> Dict[str, Any]:
+        """Fetches the given keys from the Redis tier."""
+        try:
+            raw = await self.redis.mget([self.prefix + key for key in keys])
+        except Exception as e:
+            logger.warning(f"Could not read FRCM results from Redis: {e}")
+            return {}
+        return {
+            key: json.loads(value, object_hook=_object_hook)
+            for key, value in zip(keys, raw)
+            if value is not None
+        }
+
+    def clear(self) -> None:
+        """Drops the local entries and the statistics."""
+        with self._lock:
+            self._entries.clear()
+        self.stats = CacheStats()
+
+    def metrics(self, prefix: str = "frcm_cache") -> Dict[str, float]:
+        """The lookup statistics as metrics, e.g. "frcm_cache_hit_rate"."""
+        stats = self.stats
+        return {
+            f"{prefix}_hits": stats.hits,
+            f"{prefix}_redis_hits": stats.redis_hits,
+            f"{prefix}_duplicates": stats.duplicates,
+            f"{prefix}_misses": stats.misses,
+            f"{prefix}_hit_rate": stats.hit_rate,
+            f"{prefix}_entries": len(self),
+        }
+
+
+# Shared by the zone processing of the worker, main attaches the Redis tier
+result_cache = ResultCache()
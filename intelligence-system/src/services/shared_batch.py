@@ -0,0 +1,421 @@
+"""
+Zero-copy transfer of the weather of a fetch cycle to the compute workers.
+
+A SharedWeatherBatch holds the batch as columns in one
+`multiprocessing.shared_memory` block: per zone (row) the timestamps (epoch
+seconds), temperature, humidity and wind speed, padded with NaN to the longest
+series, and the stored model state. The worker process fills it once per cycle,
+the compute processes attach to it by name and read their rows in place, and
+write the reported TTF, the TTF of the building archetypes and the new model
+state into the output columns of the same block. Only a BatchSpec and row
+ranges are pickled, instead of the MET JSON of every zone and the results.
+
+The computation equals `calculate_risk_batch`, see `compute_rows`.
+"""
+
+import asyncio
+import datetime
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+import frcm.fireriskmodel.parameters as mp
+from config import settings
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel.compute import run_batch, select_kernel, steps_per_hour
+from frcm.fireriskmodel.state import to_kernel_state
+from services.compute_pool import ComputePool
+from utils.fire_risk_service import (
+    group_by_window,
+    report_index,
+    simulate_archetypes,
+    window_series,
+)
+from utils.met_parser import parse_met_payload
+
+logger = logging.getLogger(__name__)
+
+# Columns of the block, the state columns hold the wall layers followed by
+# cw_in, rh_in and c_wall (see dm.ModelState)
+INPUT_COLUMNS = ("time", "temperature", "humidity", "wind_speed")
+STATE_EXTRA = 3
+
+
+class BatchSpec(NamedTuple):
+    """Name and dimensions of a shared batch, all a compute process needs."""
+
+    name: str
+    zones: int
+    # length of the longest series
+    points: int
+    sub_layers: int
+    # number of building archetypes computed per zone (0 if disabled)
+    archetypes: int = 0
+
+
+def _layout(
+    zones: int, points: int, sub_layers: int, archetypes: int = 0
+) -> Tuple[Dict[str, Tuple[int, Tuple[int, ...], np.dtype]], int]:
+    """
+    Returns the offset (bytes), shape and dtype of every column and the size of
+    the block. All dtypes have 8 bytes, so every column is aligned.
+    """
+    state_shape = (zones, sub_layers + STATE_EXTRA)
+    shapes: Dict[str, Tuple[int, ...]] = {
+        # inputs, filled by the worker process (time in epoch seconds, NaN when
+        # there is no stored state)
+        **{name: (zones, points) for name in INPUT_COLUMNS},
+        "length": (zones,),
+        "state_time": (zones,),
+        "state": state_shape,
+        # outputs, written by the compute processes (NaN times for failed zones)
+        "ttf": (zones,),
+        "ttf_time": (zones,),
+        "archetype_ttf": (zones, archetypes),
+        "archetype_time": (zones,),
+        "final_time": (zones,),
+        "final_state": state_shape,
+    }
+    layout = {}
+    offset = 0
+    for name, shape in shapes.items():
+        dtype = np.dtype(np.int64 if name == "length" else np.float64)
+        layout[name] = (offset, shape, dtype)
+        offset += int(np.prod(shape)) * dtype.itemsize
+    return layout, offset
+
+
+def _datetime(epoch: float) -> datetime.datetime:
+    """UTC timestamp of epoch seconds."""
+    return datetime.datetime.fromtimestamp(epoch, tz=datetime.timezone.utc)
+
+
+def _model_state(epoch: float, state: np.ndarray) -> dm.ModelState | None:
+    """The model state of the state columns of a zone, None for a NaN time."""
+    if np.isnan(epoch):
+        return None
+    return dm.ModelState(
+        timestamp=_datetime(epoch),
+        wall=state[:-STATE_EXTRA].tolist(),
+        cw_in=float(state[-3]),
+        rh_in=float(state[-2]),
+        c_wall=float(state[-1]),
+    )
+
+
+class SharedWeatherBatch:
+    """
+    Numpy views of the columns of a shared memory block, see the module
+    docstring. The creating process owns the block and must `unlink` it,
+    every process `close`s its views.
+    """
+
+    time: np.ndarray
+    temperature: np.ndarray
+    humidity: np.ndarray
+    wind_speed: np.ndarray
+    length: np.ndarray
+    state_time: np.ndarray
+    state: np.ndarray
+    ttf: np.ndarray
+    ttf_time: np.ndarray
+    archetype_ttf: np.ndarray
+    archetype_time: np.ndarray
+    final_time: np.ndarray
+    final_state: np.ndarray
+
+    def __init__(self, spec: BatchSpec, shm: shared_memory.SharedMemory) -> None:
+        self.spec = spec
+        self._shm = shm
+        self._columns, _ = _layout(
+            spec.zones, spec.points, spec.sub_layers, spec.archetypes
+        )
+        for name, (offset, shape, dtype) in self._columns.items():
+            setattr(
+                self,
+                name,
+                np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset),
+            )
+
+    @classmethod
+    def create(
+        cls,
+        weather_data: Sequence[dm.WeatherData | dm.ColumnarWeatherData | None],
+        initial_states: Sequence[dm.ModelState | None],
+        sub_layers: int = mp.sub_layers,
+        archetypes: bool = False,
+    ) -> "SharedWeatherBatch":
+        """
+        Allocates a block and fills it with the given zones.
+
+        Args:
+            weather_data: The weather per zone, None for zones without data.
+            initial_states: The stored model state per zone, if any.
+            sub_layers: Number of wall layers of the model states.
+            archetypes: Whether to also compute the building archetypes.
+        """
+        weather_data = [
+            dm.ColumnarWeatherData.from_weather_data(wd)
+            if isinstance(wd, dm.WeatherData)
+            else wd
+            for wd in weather_data
+        ]
+        points = max((len(wd) for wd in weather_data if wd is not None), default=0)
+        points = max(1, points)
+        archetype_count = len(mp.ARCHETYPES) if archetypes else 0
+        _, size = _layout(len(weather_data), points, sub_layers, archetype_count)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        batch = cls(
+            BatchSpec(shm.name, len(weather_data), points, sub_layers, archetype_count),
+            shm,
+        )
+
+        for name in (
+            *INPUT_COLUMNS,
+            "state_time",
+            "ttf_time",
+            "archetype_time",
+            "final_time",
+        ):
+            getattr(batch, name)[...] = np.nan
+        batch.length[:] = 0
+        for row, wd in enumerate(weather_data):
+            if wd is None:
+                continue
+            count = len(wd)
+            batch.time[row, :count] = wd.timestamp.astype(np.int64) / 1e6
+            batch.temperature[row, :count] = wd.temperature
+            batch.humidity[row, :count] = wd.humidity
+            batch.wind_speed[row, :count] = wd.wind_speed
+            batch.length[row] = count
+        for row, state in enumerate(initial_states):
+            if state is not None:
+                batch.state_time[row] = dm.to_epoch_seconds(state.timestamp)
+                batch.state[row] = [*state.wall, state.cw_in, state.rh_in, state.c_wall]
+        return batch
+
+    @classmethod
+    def from_met(
+        cls,
+        met_jsons: Sequence[Dict[str, Any]],
+        initial_states: Sequence[dm.ModelState | None],
+        spinup_hours: int,
+        archetypes: bool = False,
+    ) -> "SharedWeatherBatch":
+        """
+        Parses the MET JSON of every zone (see `utils.met_parser`) into a new
+        block, zones which cannot be parsed are left empty.
+        """
+        weather_data: List[dm.ColumnarWeatherData | None] = []
+        for met_json in met_jsons:
+            try:
+                weather_data.append(
+                    parse_met_payload(met_json, horizon_hours=spinup_hours)
+                )
+            except Exception as e:
+                logger.error(f"Error in risk calculation: {e}")
+                weather_data.append(None)
+        return cls.create(weather_data, initial_states, archetypes=archetypes)
+
+    @classmethod
+    def attach(cls, spec: BatchSpec) -> "SharedWeatherBatch":
+        """Maps the block of another process."""
+        # Compute processes share the resource tracker of the worker process,
+        # so the block is not unlinked when they exit
+        return cls(spec, shared_memory.SharedMemory(name=spec.name))
+
+    def results(self) -> List[Dict[str, Any] | None]:
+        """
+        Reads the output columns into the results of `calculate_risk_batch`,
+        one per zone (None where the calculation failed).
+        """
+        results: List[Dict[str, Any] | None] = []
+        for row in range(self.spec.zones):
+            if np.isnan(self.ttf_time[row]):
+                results.append(None)
+                continue
+            result = {
+                "timestamp": _datetime(self.ttf_time[row]),
+                "ttf": float(self.ttf[row]),
+                "state": _model_state(self.final_time[row], self.final_state[row]),
+            }
+            if not np.isnan(self.archetype_time[row]):
+                result["archetypes"] = dict(
+                    zip(mp.ARCHETYPES, self.archetype_ttf[row].tolist())
+                )
+            results.append(result)
+        return results
+
+    def close(self) -> None:
+        """Releases the views of this process (they must not be used anymore)."""
+        for name in self._columns:
+            self.__dict__.pop(name, None)
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Frees the block, called by the creating process once all are done."""
+        self._shm.unlink()
+
+
+def _weather(batch: SharedWeatherBatch, row: int) -> dm.ColumnarWeatherData:
+    """The weather of a zone, its columns in place except for the timestamps."""
+    length = int(batch.length[row])
+    timestamp = np.rint(batch.time[row, :length] * 1e6).astype(np.int64)
+    return dm.ColumnarWeatherData.trusted(
+        timestamp=timestamp.astype("datetime64[us]"),
+        temperature=batch.temperature[row, :length],
+        humidity=batch.humidity[row, :length],
+        wind_speed=batch.wind_speed[row, :length],
+    )
+
+
+def _compute_rows(
+    batch: SharedWeatherBatch, start: int, stop: int, spinup_hours: int
+) -> int:
+    """Computes rows [start, stop) of the batch, see `compute_rows`."""
+    weather_data = {
+        row: _weather(batch, row) for row in range(start, stop) if batch.length[row]
+    }
+    groups = group_by_window(
+        (
+            (row, wd, _model_state(batch.state_time[row], batch.state[row]))
+            for row, wd in weather_data.items()
+        ),
+        spinup_hours,
+    )
+
+    computed = 0
+    for (begin, horizon_hours, end), members in groups.items():
+        rows = [row for row, _ in members]
+        try:
+            backend = select_kernel(settings.FRCM_KERNEL, zones=len(members))
+            step = getattr(mp, backend.delta_t)
+            time_sec, rh_in, ttf, final_state = run_batch(
+                backend,
+                [window_series(weather_data[row], begin, end, step) for row in rows],
+                [to_kernel_state(state) if state else None for _, state in members],
+            )
+        except Exception as e:
+            logger.error(f"Error in batched risk calculation: {e}")
+            continue
+
+        # Report the hourly value at the end of the window, see calculate_risk
+        report_hour = report_index(horizon_hours)
+        report = report_hour * steps_per_hour(step)
+        if len(time_sec) <= report:
+            continue
+        begin_time = dm.to_epoch_seconds(begin)
+        batch.ttf[rows] = ttf[:, report]
+        batch.ttf_time[rows] = begin_time + time_sec[report]
+        batch.final_time[rows] = begin_time + time_sec[-1]
+        batch.final_state[rows, :-STATE_EXTRA] = final_state.wall
+        batch.final_state[rows, -3] = final_state.cw_in
+        batch.final_state[rows, -2] = rh_in[:, -1]
+        batch.final_state[rows, -1] = final_state.c_wall
+        computed += len(rows)
+
+        # The archetypes of the group in one simulation of the same window,
+        # see calculate_risk_batch
+        if batch.spec.archetypes:
+            try:
+                archetype_ttf = simulate_archetypes(
+                    [
+                        window_series(weather_data[row], begin, end, mp.delta_t)
+                        for row in rows
+                    ],
+                    report_hour,
+                )
+            except Exception as e:
+                logger.error(f"Error in archetype risk calculation: {e}")
+                continue
+            if archetype_ttf is not None:
+                batch.archetype_ttf[rows] = archetype_ttf
+                batch.archetype_time[rows] = batch.ttf_time[rows]
+    return computed
+
+
+def compute_rows(
+    spec: BatchSpec, start: int, stop: int, spinup_hours: int | None = None
+) -> int:
+    """
+    Computes the fire risk of rows [start, stop) of a shared batch in place,
+    as `calculate_risk_batch` does for the MET JSON of the zones. Runs in the
+    compute processes.
+
+    Returns:
+        The number of zones with a result.
+    """
+    if spinup_hours is None:
+        spinup_hours = settings.FRCM_SPINUP_HOURS
+
+    batch = SharedWeatherBatch.attach(spec)
+    try:
+        return _compute_rows(batch, start, stop, spinup_hours)
+    finally:
+        batch.close()
+
+
+async def _compute_range(
+    pool: ComputePool,
+    batch: SharedWeatherBatch,
+    start: int,
+    stop: int,
+    spinup_hours: int,
+) -> None:
+    """
+    Computes rows [start, stop) in the pool. If the worker process dies, the
+    rows fail (they may be half written), the other ranges are not affected.
+    """
+    try:
+        await pool.run(compute_rows, batch.spec, start, stop, spinup_hours)
+    except BrokenProcessPool:
+        logger.error(f"Risk calculation of zones {start}-{stop - 1} failed")
+        batch.ttf_time[start:stop] = np.nan
+
+
+async def calculate_risk_shared(
+    pool: ComputePool,
+    met_jsons: Sequence[Dict[str, Any]],
+    initial_states: Sequence[dm.ModelState | None] | None = None,
+    spinup_hours: int | None = None,
+    archetypes: bool | None = None,
+) -> List[Dict[str, Any] | None]:
+    """
+    `calculate_risk_batch` in the processes of the compute pool, which read the
+    weather from a shared batch. The zones are split into one contiguous range
+    of rows per worker. If a worker process dies, only the zones of its range
+    fail (None), see `ComputePool.run`.
+    """
+    if spinup_hours is None:
+        spinup_hours = settings.FRCM_SPINUP_HOURS
+    if archetypes is None:
+        archetypes = settings.FRCM_ARCHETYPES_ENABLED
+    if initial_states is None:
+        initial_states = [None] * len(met_jsons)
+
+    # Transforming the MET JSON is CPU work as well, keep it off the loop
+    batch = await asyncio.to_thread(
+        SharedWeatherBatch.from_met,
+        met_jsons,
+        initial_states,
+        spinup_hours,
+        archetypes,
+    )
+
+    try:
+        bounds = np.linspace(0, len(met_jsons), pool.chunks(len(met_jsons)) + 1)
+        bounds = bounds.round().astype(int).tolist()
+        await asyncio.gather(
+            *(
+                _compute_range(pool, batch, start, stop, spinup_hours)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+                if stop > start
+            )
+        )
+        return batch.results()
+    finally:
+        batch.close()
+        batch.unlink()
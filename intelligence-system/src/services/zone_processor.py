@@ -1,34 +1,205 @@
 import asyncio
 import logging
-from typing import Any, Dict
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, TypeVar
 
-from db.database import save_risk_data, save_weather_data
-from utils.fire_risk_service import calculate_risk, calculate_risk_score
+from config import settings
+from db.database import (
+    get_model_states,
+    save_archetype_risk_data,
+    save_model_states,
+    save_risk_data,
+    save_weather_data,
+)
+from services.compute_pool import compute_pool
+from services.result_cache import result_cache
+from services.shared_batch import calculate_risk_shared
+from utils.fire_risk_service import (
+    calculate_risk,
+    calculate_risk_batch,
+    calculate_risk_score,
+    risk_cache_key,
+)
 from utils.met_api import fetch_weather
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 async def process_zone(
-    zone: Any, semaphore: asyncio.Semaphore | None = None
+    zone: Any,
+    semaphore: asyncio.Semaphore | None = None,
+    spinup_hours: int | None = None,
 ) -> Dict[str, Any] | None:
     """
-    Fetches weather, calculates risk, and saves data for a single zone.
-    Uses semaphore to limit concurrency if provided.
+    Fetches weather, calculates risk (in the compute pool), and saves data for
+    a single zone. Uses semaphore to limit concurrency if provided.
+    `spinup_hours` overrides the default spin-up of a cold start.
     Returns the risk data if successful.
     """
     if semaphore:
         async with semaphore:
-            return await _do_process_zone(zone)
+            return await _do_process_zone(zone, spinup_hours)
     else:
-        return await _do_process_zone(zone)
+        return await _do_process_zone(zone, spinup_hours)
 
 
-async def _do_process_zone(zone: Any) -> Dict[str, Any] | None:
-    """Internal helper to process a zone."""
+async def process_zones(
+    zones: Sequence[Any], semaphore: asyncio.Semaphore | None = None
+) -> List[Dict[str, Any] | None]:
+    """
+    Fetches weather and saves data for all zones concurrently, but calculates
+    the risk of all zones in batched simulations, one per compute worker (see
+    `services.shared_batch`).
+    Returns the risk data per zone (None where processing failed).
+    """
+    # 1. Fetch weather for all zones
+    met_data = await asyncio.gather(
+        *(_limited(_fetch_zone_weather(zone), semaphore) for zone in zones)
+    )
+    fetched = [i for i, data in enumerate(met_data) if data]
+
+    # 2. Compute Risk for all fetched zones at once, continuing from the stored
+    # model states where available. Zones with the inputs of a cached result
+    # (or of another zone) are not simulated again.
+    states = await get_model_states([zones[i].geohash for i in fetched])
+    fetched_met_data = [met_data[i] for i in fetched]
+    initial_states = [states.get(zones[i].geohash) for i in fetched]
+    keys: List[str | None] = [None] * len(fetched)
+    if settings.FRCM_CACHE_ENABLED:
+        keys = await asyncio.to_thread(
+            lambda: [
+                risk_cache_key(met_json, initial_state=state)
+                for met_json, state in zip(fetched_met_data, initial_states)
+            ]
+        )
+    risk_results = await _cached(
+        keys,
+        lambda todo: _calculate_risk_batch(
+            [fetched_met_data[i] for i in todo], [initial_states[i] for i in todo]
+        ),
+    )
+
+    await save_model_states(
+        {
+            zones[i].geohash: risk_result["state"]
+            for i, risk_result in zip(fetched, risk_results)
+            if risk_result and risk_result.get("state")
+        }
+    )
+
+    # 3. Save risk results to DB
+    to_store = []
+    for i, risk_result in zip(fetched, risk_results):
+        if risk_result:
+            to_store.append((i, risk_result))
+        else:
+            logger.warning(f"Risk calculation failed for zone {zones[i].geohash}")
+    risk_data = await asyncio.gather(
+        *(
+            _limited(_store_zone_risk(zones[i], risk_result), semaphore)
+            for i, risk_result in to_store
+        )
+    )
+
+    results: List[Dict[str, Any] | None] = [None] * len(zones)
+    for (i, _), data in zip(to_store, risk_data):
+        results[i] = data
+    return results
+
+
+async def _calculate_risk_batch(
+    met_jsons: Sequence[Any], initial_states: Sequence[Any]
+) -> List[Dict[str, Any] | None]:
+    """
+    Calculates the risk of several zones in batched simulations. Worker
+    processes get one range of zones each and read their weather from shared
+    memory (see `services.shared_batch`).
+    """
+    if not met_jsons:
+        return []
+    if compute_pool.workers > 0:
+        return await calculate_risk_shared(compute_pool, met_jsons, initial_states)
+    return await compute_pool.run(
+        calculate_risk_batch, list(met_jsons), initial_states=list(initial_states)
+    )
+
+
+async def _calculate_risk(
+    met_json: Any, spinup_hours: int | None, initial_state: Any
+) -> Dict[str, Any] | None:
+    """
+    Calculates the risk of a zone in the compute pool, None if the worker
+    process died (the pool restarts for the next zones).
+    """
+    try:
+        return await compute_pool.run(
+            calculate_risk,
+            met_json,
+            spinup_hours=spinup_hours,
+            initial_state=initial_state,
+        )
+    except BrokenProcessPool:
+        return None
+
+
+async def _cached(
+    keys: Sequence[str | None],
+    calculate: Callable[[List[int]], Awaitable[List[T | None]]],
+) -> List[T | None]:
+    """
+    Looks up results in the result cache and calculates the missing ones, the
+    results of equal keys only once.
+
+    Args:
+        keys: Content key per input, None for inputs which are not cached.
+        calculate: Calculates the results of the given input indices, None
+            where the calculation failed (which is not cached).
+
+    Returns:
+        The result per input.
+    """
+    results = await result_cache.get_many(keys)
+    todo: List[int] = []
+    first: Dict[str, int] = {}
+    for index, (key, result) in enumerate(zip(keys, results)):
+        if result is not None:
+            continue
+        if key is None:
+            todo.append(index)
+        elif key not in first:
+            first[key] = index
+            todo.append(index)
+
+    calculated = dict(zip(todo, await calculate(todo))) if todo else {}
+    await result_cache.put_many(
+        {
+            keys[index]: result
+            for index, result in calculated.items()
+            if keys[index] is not None and result is not None
+        }
+    )
+
+    for index, key in enumerate(keys):
+        if results[index] is None:
+            results[index] = calculated.get(index if key is None else first[key])
+    return results
+
+
+async def _limited(awaitable: Awaitable[T], semaphore: asyncio.Semaphore | None) -> T:
+    """Awaits the given awaitable, holding the semaphore if provided."""
+    if semaphore:
+        async with semaphore:
+            return await awaitable
+    return await awaitable
+
+
+async def _fetch_zone_weather(zone: Any) -> Any | None:
+    """Fetches and saves the raw weather data of a zone."""
     logger.info(f"Processing zone: {zone.name} ({zone.geohash})")
 
-    # 1. Fetch weather for the center of the zone
+    # Fetch weather for the center of the zone
     met_data = await fetch_weather(zone.center_lat, zone.center_lon)
 
     if not met_data:
@@ -42,32 +213,79 @@ async def _do_process_zone(zone: Any) -> Dict[str, Any] | None:
         lon=zone.center_lon,
         weather_json=met_data,
     )
+    return met_data
 
-    # 2. Compute Risk
-    risk_result = calculate_risk(met_data)
 
-    if risk_result:
-        logger.info(f"Zone: {zone.geohash}, TTF: {risk_result['ttf']}")
+async def _store_zone_risk(zone: Any, risk_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Saves the risk result of a zone and prepares it for Redis/Streaming. The
+    risk of the building archetypes, computed with the zone (see
+    `calculate_risk`), is saved with the same prediction timestamp.
+    """
+    logger.info(f"Zone: {zone.geohash}, TTF: {risk_result['ttf']}")
 
-        # 3. Save risk result to DB
-        await save_risk_data(
-            location_name=zone.geohash,
-            lat=zone.center_lat,
-            lon=zone.center_lon,
-            risk_result=risk_result,
+    await save_risk_data(
+        location_name=zone.geohash,
+        lat=zone.center_lat,
+        lon=zone.center_lon,
+        risk_result=risk_result,
+    )
+
+    risk_score, risk_category = calculate_risk_score(risk_result["ttf"])
+    risk_data = {
+        "location_id": zone.geohash,
+        "risk_level": risk_category,
+        "risk_score": risk_score,
+        "ttf": risk_result["ttf"],
+        "timestamp": risk_result["timestamp"].isoformat()
+        if hasattr(risk_result["timestamp"], "isoformat")
+        else risk_result["timestamp"],
+    }
+
+    if risk_result.get("archetypes"):
+        await save_archetype_risk_data(
+            zone.geohash,
+            {"timestamp": risk_result["timestamp"], "ttf": risk_result["archetypes"]},
         )
+        risk_data["archetypes"] = risk_result["archetypes"]
+    elif settings.FRCM_ARCHETYPES_ENABLED:
+        logger.warning(f"Archetype risk calculation failed for zone {zone.geohash}")
 
-        # Prepare risk data for Redis/Streaming
-        risk_score, risk_category = calculate_risk_score(risk_result["ttf"])
-        return {
-            "location_id": zone.geohash,
-            "risk_level": risk_category,
-            "risk_score": risk_score,
-            "ttf": risk_result["ttf"],
-            "timestamp": risk_result["timestamp"].isoformat()
-            if hasattr(risk_result["timestamp"], "isoformat")
-            else risk_result["timestamp"],
-        }
+    return risk_data
+
+
+async def _do_process_zone(
+    zone: Any, spinup_hours: int | None = None
+) -> Dict[str, Any] | None:
+    """Internal helper to process a zone."""
+    # 1. Fetch weather for the center of the zone
+    met_data = await _fetch_zone_weather(zone)
+
+    if not met_data:
+        return None
+
+    # 2. Compute Risk, continuing from the stored model state if available
+    states = await get_model_states([zone.geohash])
+    initial_state = states.get(zone.geohash)
+    keys = [None]
+    if settings.FRCM_CACHE_ENABLED:
+        keys = [
+            await asyncio.to_thread(
+                risk_cache_key, met_data, spinup_hours, initial_state
+            )
+        ]
+    (risk_result,) = await _cached(
+        keys,
+        lambda _: asyncio.gather(
+            _calculate_risk(met_data, spinup_hours, initial_state)
+        ),
+    )
+
+    if risk_result:
+        if risk_result.get("state"):
+            await save_model_states({zone.geohash: risk_result["state"]})
+        # 3. Save risk result to DB
+        return await _store_zone_risk(zone, risk_result)
     else:
         logger.warning(f"Risk calculation failed for zone {zone.geohash}")
         return None
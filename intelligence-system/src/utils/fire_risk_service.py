@@ -1,65 +1,280 @@
 import datetime
 import logging
-from typing import Any, Dict, Tuple
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
+import numpy as np
+
+from config import settings
 from frcm.datamodel import model as dm
-from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel import parameters as mp
+from frcm.fireriskmodel import preprocess as pp
+from frcm.fireriskmodel.compute import compute, compute_batch, steps_per_hour
+from frcm.fireriskmodel.parameters import ArrayLike
+from frcm.fireriskmodel.state import equilibrium_state
+from frcm.fireriskmodel.sweep import sweep_zones
+from services.result_cache import content_key, model_fingerprint, weather_arrays
+from utils.met_parser import parse_met_payload
 
 logger = logging.getLogger(__name__)
 
+# Start, simulated hours and end of a simulation window, see `group_by_window`
+Window = Tuple[datetime.datetime, float, datetime.datetime]
+
 
-def transform_met_data_to_model(met_json: Dict[str, Any]) -> dm.WeatherData:
+def simulation_window(
+    weather_data: dm.WeatherData | dm.ColumnarWeatherData,
+    initial_state: dm.ModelState | None,
+    spinup_hours: int,
+) -> Tuple[dm.ModelState | None, datetime.datetime, float]:
     """
-    Parses the raw JSON from MET.no and converts it into the
-    internal WeatherData object required by the FRCM compute function.
+    Decides where the simulation of a zone starts and how long it runs.
+
+    Every window ends at the reported hour, `spinup_hours` after the first
+    forecast hour, so that the zones of a cycle report the same hour whether
+    they start warm or cold. A stored model state is used as warm start if it
+    is not older than `settings.FRCM_STATE_MAX_AGE_HOURS` and at least one hour
+    before the reported hour, the simulation then continues from the state up
+    to the reported hour (a state at a fractional hour reports the last full
+    hour of its window). Otherwise the simulation starts cold at the first
+    forecast hour and runs for `spinup_hours`, from the steady state of that
+    hour if `settings.FRCM_EQUILIBRIUM_START` is set (else from the guessed
+    defaults).
+
+    Returns:
+        A tuple of the state to start from (None for a cold start), the start
+        time and the number of hours to simulate.
     """
-    timeseries = met_json["properties"]["timeseries"]
-    data_points = []
+    if isinstance(weather_data, dm.ColumnarWeatherData):
+        first_time = weather_data.start_time
+    else:
+        first_time = min(point.timestamp for point in weather_data.data)
 
-    for entry in timeseries:
-        time_str = entry["time"]
-        # MET.no uses 'Z' for UTC, fromisoformat handles +00:00
-        dt = datetime.datetime.fromisoformat(time_str.replace("Z", "+00:00"))
+    if initial_state is not None:
+        age_hours = (first_time - initial_state.timestamp).total_seconds() / 3600
+        horizon_hours = age_hours + spinup_hours
+        if horizon_hours >= 1 and age_hours <= settings.FRCM_STATE_MAX_AGE_HOURS:
+            return initial_state, initial_state.timestamp, horizon_hours
 
-        instant_details = entry["data"]["instant"]["details"]
+    if settings.FRCM_EQUILIBRIUM_START:
+        state = equilibrium_state(weather_data)
+        if state is not None:
+            return state, state.timestamp, float(spinup_hours)
 
-        # Create WeatherDataPoint with fields matching the datamodel
-        dp = dm.WeatherDataPoint(
-            timestamp=dt,
-            temperature=instant_details.get("air_temperature"),
-            humidity=instant_details.get("relative_humidity"),
-            wind_speed=instant_details.get("wind_speed", 0.0),
-        )
-        data_points.append(dp)
+    return None, first_time, float(spinup_hours)
+
+
+def report_index(horizon_hours: float) -> int:
+    """
+    Index of the hourly value reported for a simulation window of
+    `horizon_hours`, the last full hour of the window (a warm start from a state
+    at a fractional hour ends between two hourly values).
+    """
+    return math.floor(horizon_hours)
+
+
+def group_by_window(
+    zones: Iterable[Tuple[int, dm.ColumnarWeatherData, dm.ModelState | None]],
+    spinup_hours: int,
+) -> Dict[Window, List[Tuple[int, dm.ModelState | None]]]:
+    """
+    Groups zones by their simulation window (see `simulation_window`), the
+    zones of a group share a time axis and are simulated together. Zones whose
+    window cannot be decided are left out.
+
+    Args:
+        zones: Per zone its index, weather and stored model state (if any).
+        spinup_hours: The spin-up window of cold starts.
+
+    Returns:
+        Per start, simulated hours and end of the window the indices of its
+        zones and the state each of them starts from.
+    """
+    groups: Dict[Window, List[Tuple[int, dm.ModelState | None]]] = {}
+    for index, wd, initial_state in zones:
+        try:
+            state, start, horizon_hours = simulation_window(
+                wd, initial_state, spinup_hours
+            )
+        except Exception as e:
+            logger.error(f"Error in risk calculation: {e}")
+            continue
+        end = min(start + datetime.timedelta(hours=horizon_hours), wd.end_time)
+        groups.setdefault((start, horizon_hours, end), []).append((index, state))
+    return groups
+
+
+def window_series(
+    wd: dm.ColumnarWeatherData,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    delta_t: int,
+) -> Tuple[Sequence[int], np.ndarray, np.ndarray]:
+    """
+    Interpolates the weather of a zone over its simulation window, every
+    `delta_t` seconds (see `preprocess`).
+
+    Returns:
+        A tuple of the time axis (seconds after `start`), temperature and
+        humidity, the input of `run_batch` and `simulate_archetypes`.
+    """
+    preprocessed = pp.preprocess(
+        wd,
+        horizon_hours=(end - start).total_seconds() / 3600,
+        start_time=start,
+        delta_t=delta_t,
+        variables=pp.KERNEL_VARIABLES,
+    )
+    return preprocessed.time_sec, preprocessed.temperature, preprocessed.humidity
 
-    # Wrap the list of points in the WeatherData container
-    return dm.WeatherData(data=data_points)
 
+def risk_cache_key(
+    met_json: Dict[str, Any],
+    spinup_hours: int | None = None,
+    initial_state: dm.ModelState | None = None,
+    archetypes: bool | None = None,
+) -> str | None:
+    """
+    Returns the content key of `calculate_risk` for the given inputs (see
+    `services.result_cache`), None if the MET JSON cannot be transformed.
+    """
+    if spinup_hours is None:
+        spinup_hours = settings.FRCM_SPINUP_HOURS
+    if archetypes is None:
+        archetypes = settings.FRCM_ARCHETYPES_ENABLED
 
-def calculate_risk(met_json: Dict[str, Any]) -> Dict[str, Any] | None:
+    try:
+        weather_data = parse_met_payload(met_json, horizon_hours=spinup_hours)
+    except Exception:
+        return None
+    return content_key(
+        "risk",
+        weather_arrays(weather_data),
+        spinup_hours,
+        initial_state,
+        settings.FRCM_KERNEL,
+        settings.FRCM_EQUILIBRIUM_START,
+        settings.FRCM_STATE_MAX_AGE_HOURS,
+        {name: vars(params) for name, params in mp.ARCHETYPES.items()}
+        if archetypes
+        else None,
+        model_fingerprint(),
+    )
+
+
+def simulate_archetypes(
+    series: Sequence[Tuple[Sequence[int], np.ndarray, np.ndarray]],
+    report_hour: int,
+) -> np.ndarray | None:
+    """
+    Simulates the building archetypes in
+    `frcm.fireriskmodel.parameters.ARCHETYPES` of several zones in one batched
+    simulation (see `sweep_zones`), over the simulation window of their
+    default enclosure.
+
+    As only the state of the default enclosure is persisted, the archetypes
+    start at the start of the window, from the steady state of its first
+    values if `settings.FRCM_EQUILIBRIUM_START` is set (else from the guessed
+    defaults).
+
+    Args:
+        series: Per zone the interpolated time axis (seconds after the start
+            of the window, every `mp.delta_t`), temperature and humidity.
+        report_hour: The hour after the start of the window to report.
+
+    Returns:
+        The reported TTF matrix (zones x archetypes, in the order of
+        `ARCHETYPES`), None if the window ends before the reported hour.
+    """
+    params = mp.ParameterSet.stack(list(mp.ARCHETYPES.values()))
+    report = report_hour * steps_per_hour(params.delta_t)
+    if len(series[0][0]) <= report:
+        return None
+    ttf = sweep_zones(series, params, equilibrium=settings.FRCM_EQUILIBRIUM_START)
+    return ttf[:, :, report]
+
+
+def _add_archetype_risks(
+    results: Sequence[Dict[str, Any]],
+    weather_data: Sequence[dm.ColumnarWeatherData],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    report_hour: int,
+) -> None:
+    """
+    Adds the TTF per archetype name ("archetypes") to the results of zones
+    sharing a simulation window, see `simulate_archetypes`. A failure of the
+    archetypes leaves the results of the default enclosure as they are.
+    """
+    try:
+        series = [window_series(wd, start, end, mp.delta_t) for wd in weather_data]
+        ttf = simulate_archetypes(series, report_hour)
+    except Exception as e:
+        logger.error(f"Error in archetype risk calculation: {e}")
+        return
+    if ttf is not None:
+        for result, zone_ttf in zip(results, ttf):
+            result["archetypes"] = dict(zip(mp.ARCHETYPES, zone_ttf.tolist()))
+
+
+def calculate_risk(
+    met_json: Dict[str, Any],
+    spinup_hours: int | None = None,
+    initial_state: dm.ModelState | None = None,
+    archetypes: bool | None = None,
+) -> Dict[str, Any] | None:
     """
     Orchestrates the risk calculation:
-    MET JSON -> WeatherData -> Compute() -> Result
+    MET JSON -> ColumnarWeatherData -> Compute() -> Result
+
+    Without a usable `initial_state` only the first `spinup_hours` hours of the
+    forecast (default `settings.FRCM_SPINUP_HOURS`) are simulated and the fire
+    risk at the end of that window is reported. With a warm start the model
+    continues from the given state, see `simulation_window`.
+
+    The result also holds the model state at the reported timestamp, to be used
+    as `initial_state` in the next cycle, and with `archetypes` (default
+    `settings.FRCM_ARCHETYPES_ENABLED`) the TTF per building archetype at the
+    same timestamp (see `simulate_archetypes`).
     """
+    if spinup_hours is None:
+        spinup_hours = settings.FRCM_SPINUP_HOURS
+    if archetypes is None:
+        archetypes = settings.FRCM_ARCHETYPES_ENABLED
+
     try:
-        # 1. Transform Data
-        weather_data = transform_met_data_to_model(met_json)
+        # 1. Transform Data (see utils.met_parser)
+        weather_data = parse_met_payload(met_json, horizon_hours=spinup_hours)
+        state, start, horizon_hours = simulation_window(
+            weather_data, initial_state, spinup_hours
+        )
 
         # 2. Run the FRCM Simulation
         # This returns a dm.FireRiskPrediction object containing a list of risks
-        prediction_result = compute(weather_data)
+        prediction_result = compute(
+            weather_data,
+            kernel=settings.FRCM_KERNEL,
+            horizon_hours=horizon_hours,
+            initial_state=state,
+        )
 
         # 3. Extract the most relevant result
-        # The compute function returns a simulation for the whole forecast period.
-        # We take the second element as the "current" risk, as the first is
-        # based on initial hardcoded parameters.
-        if prediction_result.firerisks and len(prediction_result.firerisks) > 1:
-            current_risk = prediction_result.firerisks[1]
+        # A cold simulation starts from initial hardcoded parameters, hence we
+        # report the risk at the end of the simulated window as "current" risk.
+        report = report_index(horizon_hours)
+        if len(prediction_result.firerisks) > report:
+            current_risk = prediction_result.firerisks[report]
 
-            return {
+            result = {
                 "timestamp": current_risk.timestamp,
                 "ttf": current_risk.ttf,  # Time To Flashover (Lower = Higher Risk)
+                "state": prediction_result.state,
             }
+            if archetypes:
+                end = start + datetime.timedelta(hours=horizon_hours)
+                _add_archetype_risks([result], [weather_data], start, end, report)
+            return result
 
         return None
 
@@ -68,7 +283,160 @@ def calculate_risk(met_json: Dict[str, Any]) -> Dict[str, Any] | None:
         return None
 
 
-def calculate_risk_score(ttf: float) -> Tuple[float, str]:
+def calculate_risk_batch(
+    met_jsons: Sequence[Dict[str, Any]],
+    spinup_hours: int | None = None,
+    initial_states: Sequence[dm.ModelState | None] | None = None,
+    archetypes: bool | None = None,
+) -> List[Dict[str, Any] | None]:
+    """
+    Batched variant of `calculate_risk` for all zones of a fetch cycle.
+
+    Zones with the same simulation window are simulated together in a single
+    `compute_batch` call (and their archetypes in a single `sweep_zones` call).
+    The result list is aligned with `met_jsons`, with None for zones whose
+    calculation failed.
+    """
+    if spinup_hours is None:
+        spinup_hours = settings.FRCM_SPINUP_HOURS
+    if archetypes is None:
+        archetypes = settings.FRCM_ARCHETYPES_ENABLED
+    if initial_states is None:
+        initial_states = [None] * len(met_jsons)
+    results: List[Dict[str, Any] | None] = [None] * len(met_jsons)
+
+    # 1. Transform Data and group the zones by their simulation window
+    weather_data: Dict[int, dm.ColumnarWeatherData] = {}
+    for index, met_json in enumerate(met_jsons):
+        try:
+            weather_data[index] = parse_met_payload(
+                met_json, horizon_hours=spinup_hours
+            )
+        except Exception as e:
+            logger.error(f"Error in risk calculation: {e}")
+    groups = group_by_window(
+        ((index, wd, initial_states[index]) for index, wd in weather_data.items()),
+        spinup_hours,
+    )
+
+    # 2. Run one FRCM simulation per group
+    for (start, horizon_hours, end), members in groups.items():
+        indices = [index for index, _ in members]
+        try:
+            prediction = compute_batch(
+                [weather_data[i] for i in indices],
+                horizon_hours=(end - start).total_seconds() / 3600,
+                initial_states=[state for _, state in members],
+                kernel=settings.FRCM_KERNEL,
+            )
+        except Exception as e:
+            logger.error(f"Error in batched risk calculation: {e}")
+            continue
+
+        # 3. Extract the most relevant result, see calculate_risk
+        report = report_index(horizon_hours)
+        if len(prediction.timestamps) > report:
+            for row, index in enumerate(indices):
+                results[index] = {
+                    "timestamp": prediction.timestamps[report],
+                    "ttf": float(prediction.ttf[row, report]),
+                    "state": prediction.states[row],
+                }
+            if archetypes:
+                _add_archetype_risks(
+                    [results[i] for i in indices],
+                    [weather_data[i] for i in indices],
+                    start,
+                    end,
+                    report,
+                )
+
+    return results
+
+
+@dataclass(frozen=True)
+class RiskScale:
+    """
+    Mapping of the Time To Flashover (minutes) to a risk score and category.
+
+    The score is interpolated linearly between the points (`ttf_minutes`,
+    `scores`) and constant beyond them (a NaN TTF gets the last score). The
+    category of a TTF is the first one of `categories` whose bound in
+    `category_ttf_minutes` it is below, the last category has no bound.
+    """
+
+    ttf_minutes: Tuple[float, ...]
+    scores: Tuple[float, ...]
+    categories: Tuple[str, ...]
+    category_ttf_minutes: Tuple[float, ...]
+
+    def __post_init__(self) -> None:
+        if len(self.ttf_minutes) == 0 or len(self.ttf_minutes) != len(self.scores):
+            raise ValueError("Risk scale needs as many scores as TTF points")
+        if len(self.categories) != len(self.category_ttf_minutes) + 1:
+            raise ValueError("Risk scale needs one category more than bounds")
+        for points in (self.ttf_minutes, self.category_ttf_minutes):
+            if np.any(np.diff(points) <= 0):
+                raise ValueError("Risk scale TTF points must be increasing")
+
+    @classmethod
+    def from_settings(cls) -> "RiskScale":
+        """The scale configured by the RISK_SCORE_* and RISK_CATEGOR* settings."""
+        return cls(
+            ttf_minutes=tuple(settings.RISK_SCORE_TTF_MINUTES),
+            scores=tuple(settings.RISK_SCORE_VALUES),
+            categories=tuple(settings.RISK_CATEGORIES),
+            category_ttf_minutes=tuple(settings.RISK_CATEGORY_TTF_MINUTES),
+        )
+
+
+def calculate_risk_scores(
+    ttf: ArrayLike, scale: RiskScale | None = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the normalized risk scores (0-100) and categories of an array
+    of Time To Flashover values.
+
+    Args:
+        ttf: Time To Flashover in minutes (lower means higher risk).
+        scale: The scale to apply, defaults to the configured one.
+
+    Returns:
+        A tuple containing:
+        - risk_score: The scores rounded to one decimal (100 = Extreme Risk).
+        - risk_category: The categories, e.g. Low, Moderate, High, Extreme.
+    """
+    if scale is None:
+        scale = RiskScale.from_settings()
+    ttf = np.asarray(ttf, dtype=float)
+    points = np.asarray(scale.ttf_minutes, dtype=float)
+    values = np.asarray(scale.scores, dtype=float)
+
+    # Every segment is evaluated as the original if/elif chain did, so that
+    # the default scale reproduces its scores bit for bit
+    segment = np.searchsorted(points, ttf, side="right") - 1
+    start = np.clip(segment, 0, max(len(points) - 2, 0))
+    end = np.minimum(start + 1, len(points) - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = values[start] - (
+            (ttf - points[start]) / (points[end] - points[start])
+        ) * (values[start] - values[end])
+    score = np.where(segment < 0, values[0], score)
+    # beyond the last point, NaN sorts there too
+    score = np.where(segment >= len(points) - 1, values[-1], score)
+    # Python's round (correctly rounded) differs from np.round in the last
+    # digit for some values
+    score = np.array(
+        [round(value, 1) for value in score.ravel().tolist()], dtype=float
+    ).reshape(score.shape)
+
+    bounds = np.searchsorted(scale.category_ttf_minutes, ttf, side="right")
+    return score, np.asarray(scale.categories)[bounds]
+
+
+def calculate_risk_score(
+    ttf: float, scale: RiskScale | None = None
+) -> Tuple[float, str]:
     """
     Calculates a normalized risk score (0-100) and
     category based on Time To Flashover (TTF).
@@ -77,37 +445,13 @@ def calculate_risk_score(ttf: float) -> Tuple[float, str]:
 
     Args:
         ttf: Time To Flashover in minutes.
+        scale: The scale to apply, defaults to the configured one (see
+            `calculate_risk_scores`).
 
     Returns:
         A tuple containing:
         - risk_score: A float between 0 and 100 (100 = Extreme Risk).
         - risk_category: A string description (Low, Moderate, High, Extreme).
     """
-    if ttf <= 0:
-        return 100.0, "Extreme"
-
-    # Define thresholds
-    # These are heuristic values and can be tuned.
-    if ttf < 5:
-        # Extreme Risk: TTF < 5 mins
-        # Map 0-5 mins to 80-100 score
-        score = 100 - (ttf / 5) * 20
-        category = "Extreme"
-    elif ttf < 15:
-        # High Risk: 5-15 mins
-        # Map 5-15 mins to 60-80 score
-        score = 80 - ((ttf - 5) / 10) * 20
-        category = "High"
-    elif ttf < 30:
-        # Moderate Risk: 15-30 mins
-        # Map 15-30 mins to 30-60 score
-        score = 60 - ((ttf - 15) / 15) * 30
-        category = "Moderate"
-    else:
-        # Low Risk: > 30 mins
-        # Map 30+ mins to 0-30 score
-        # Decay function: score approaches 0 as ttf increases
-        score = max(0.0, 30 - ((ttf - 30) / 30) * 30)
-        category = "Low"
-
-    return round(score, 1), category
+    score, category = calculate_risk_scores([ttf], scale)
+    return float(score[0]), str(category[0])
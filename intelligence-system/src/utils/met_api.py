@@ -3,6 +3,8 @@ from typing import Any
 
 import httpx
 
+from utils.met_parser import loads
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,7 +38,8 @@ async def fetch_weather(lat: float, lon: float) -> Any | None:
             response = await client.get(MET_URL, headers=HEADERS, params=params)
             response.raise_for_status()
 
-            return response.json()
+            # decoded with orjson, see utils.met_parser
+            return loads(response.content)
 
         except httpx.HTTPError as e:
             logger.error(f"Failed to fetch MET data: {e}")
@@ -0,0 +1,284 @@
+"""
+Fast ingestion of MET.no locationforecast payloads.
+
+`parse_met_payload` reads a payload (the raw response body or the decoded
+JSON) straight into the columns of ColumnarWeatherData: only the time and the
+three variables the model uses are read from each entry, the timestamps are
+converted in one numpy call and no object is created or validated per data
+point. Raw bodies are decoded with orjson (about 1.7x faster than the json
+module on MET payloads).
+
+Run as a script to compare it with `transform_met_data_to_model` on recorded
+payloads, e.g. exported from weather_data_readings.data (without files, on
+synthetic payloads of the size of a MET compact forecast):
+
+    PYTHONPATH=src python -m utils.met_parser [payload.json ...] [--repeat N]
+"""
+
+import argparse
+import bisect
+import datetime
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+import orjson
+
+from frcm.datamodel import model as dm
+from frcm.profiling import stage
+
+
+def loads(body: bytes | str) -> Any:
+    """Decodes a JSON body with orjson."""
+    return orjson.loads(body)
+
+
+def parse_timestamps(times: Sequence[str]) -> np.ndarray:
+    """
+    Converts ISO 8601 timestamps to datetime64[us] in UTC. MET uses 'Z' for
+    UTC, such timestamps are parsed by numpy in one call, others one by one.
+    """
+    if all(t.endswith("Z") for t in times):
+        return np.array([t[:-1] for t in times], dtype="datetime64[us]")
+    return np.array(
+        [dm.to_datetime64(datetime.datetime.fromisoformat(t)) for t in times],
+        dtype="datetime64[us]",
+    )
+
+
+def _horizon_count(timeseries: List[Dict[str, Any]], horizon_hours: float) -> int:
+    """
+    Number of entries up to the first one at or after `horizon_hours` into the
+    forecast. Timestamps in the format of MET ("2024-05-01T00:00:00Z") sort as
+    strings, so the entry is found by a binary search without parsing the rest.
+    """
+    first = timeseries[0]["time"]
+    delta = np.timedelta64(datetime.timedelta(hours=horizon_hours))
+    if first.endswith("Z"):
+        end = np.datetime64(first[:-1], "us") + delta
+        end_time = f"{np.datetime_as_string(end, unit='s')}Z"
+        if len(end_time) == len(first):
+            index = bisect.bisect_left(timeseries, end_time, key=lambda e: e["time"])
+            return min(len(timeseries), index + 1)
+
+    # other formats, in the order given
+    timestamp = parse_timestamps([entry["time"] for entry in timeseries])
+    past_end = np.flatnonzero(timestamp >= timestamp[0] + delta)
+    index = int(past_end[0]) if len(past_end) else len(timeseries)
+    return min(len(timeseries), index + 1)
+
+
+def parse_met_payload(
+    payload: bytes | str | Dict[str, Any], horizon_hours: float | None = None
+) -> dm.ColumnarWeatherData:
+    """
+    Reads a MET.no payload into ColumnarWeatherData, the fast equivalent of
+    `transform_met_data_to_model`.
+
+    Missing temperatures and humidities are NaN (interpolated by the
+    preprocessing), missing wind speeds 0.
+
+    Args:
+        payload: The response body, or the JSON decoded already.
+        horizon_hours: If given, the entries past the first one at or after
+            that many hours into the forecast are skipped.
+
+    Raises:
+        KeyError, TypeError or ValueError: If the payload is not a forecast.
+    """
+    if isinstance(payload, (bytes, bytearray, memoryview, str)):
+        payload = loads(payload)
+    timeseries = payload["properties"]["timeseries"]
+
+    with stage("transform.parse", size=len(timeseries)):
+        count = len(timeseries)
+        if horizon_hours is not None and count:
+            count = _horizon_count(timeseries, horizon_hours)
+        timestamp = parse_timestamps([entry["time"] for entry in timeseries[:count]])
+
+    with stage("transform.extract", size=count):
+        details = [entry["data"]["instant"]["details"] for entry in timeseries[:count]]
+        columns = dict(
+            timestamp=timestamp,
+            temperature=np.array(
+                [d.get("air_temperature") for d in details], dtype=float
+            ),
+            humidity=np.array(
+                [d.get("relative_humidity") for d in details], dtype=float
+            ),
+            wind_speed=np.array(
+                [d.get("wind_speed", 0.0) for d in details], dtype=float
+            ),
+        )
+        if np.any(timestamp[1:] < timestamp[:-1]):
+            # not in the order of MET, the validating constructor sorts
+            return dm.ColumnarWeatherData(**columns, utc=True)
+        return dm.ColumnarWeatherData.trusted(**columns, utc=True)
+
+
+def synthetic_payload(seed: int = 0) -> Dict[str, Any]:
+    """
+    A payload shaped like a MET compact forecast: hourly entries for 60 hours,
+    then 6-hourly ones up to 9 days, with all the fields MET sends.
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    hours = list(range(61)) + list(range(66, 9 * 24 + 1, 6))
+
+    def summary(hour: int) -> Dict[str, Any]:
+        return {
+            "summary": {"symbol_code": "partlycloudy_day"},
+            "details": {"precipitation_amount": round(float(rng.gamma(0.5)), 1)},
+        }
+
+    timeseries = []
+    for hour in hours:
+        entry: Dict[str, Any] = {
+            "time": (start + datetime.timedelta(hours=hour)).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            ),
+            "data": {
+                "instant": {
+                    "details": {
+                        "air_pressure_at_sea_level": round(
+                            1010 + 8 * float(rng.standard_normal()), 1
+                        ),
+                        "air_temperature": round(
+                            8
+                            + 5 * np.sin(2 * np.pi * (hour - 9) / 24)
+                            + float(rng.standard_normal()),
+                            1,
+                        ),
+                        "cloud_area_fraction": round(100 * float(rng.random()), 1),
+                        "relative_humidity": round(60 + 30 * float(rng.random()), 1),
+                        "wind_from_direction": round(360 * float(rng.random()), 1),
+                        "wind_speed": round(6 * float(rng.random()), 1),
+                    }
+                },
+                "next_6_hours": summary(hour),
+                "next_12_hours": {"summary": {"symbol_code": "cloudy"}, "details": {}},
+            },
+        }
+        if hour <= 60:
+            entry["data"]["next_1_hours"] = summary(hour)
+        timeseries.append(entry)
+
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [5.3221, 60.3913, 12]},
+        "properties": {
+            "meta": {
+                "updated_at": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "units": {
+                    "air_pressure_at_sea_level": "hPa",
+                    "air_temperature": "celsius",
+                    "cloud_area_fraction": "%",
+                    "precipitation_amount": "mm",
+                    "relative_humidity": "%",
+                    "wind_from_direction": "degrees",
+                    "wind_speed": "m/s",
+                },
+            },
+            "timeseries": timeseries,
+        },
+    }
+
+
+def transform_met_data_to_model(
+    met_json: Dict[str, Any], horizon_hours: float | None = None
+) -> dm.WeatherData:
+    """
+    Converts a decoded MET.no payload into WeatherData point by point, as the
+    worker did before `parse_met_payload`. Kept as the baseline of `benchmark`
+    and the reference of the tests of the parser.
+
+    If `horizon_hours` is given, the entries past the first one at or after
+    that many hours into the forecast are skipped.
+    """
+    entries = []
+    end_time = None
+    for entry in met_json["properties"]["timeseries"]:
+        # MET.no uses 'Z' for UTC, fromisoformat handles +00:00
+        dt = datetime.datetime.fromisoformat(entry["time"].replace("Z", "+00:00"))
+        entries.append((dt, entry["data"]["instant"]["details"]))
+
+        if horizon_hours is not None:
+            if end_time is None:
+                end_time = dt + datetime.timedelta(hours=horizon_hours)
+            if dt >= end_time:
+                break
+
+    return dm.WeatherData(
+        data=[
+            dm.WeatherDataPoint(
+                timestamp=dt,
+                temperature=instant_details.get("air_temperature"),
+                humidity=instant_details.get("relative_humidity"),
+                wind_speed=instant_details.get("wind_speed", 0.0),
+            )
+            for dt, instant_details in entries
+        ]
+    )
+
+
+def benchmark(
+    bodies: Sequence[bytes], horizon_hours: float | None = None, repeat: int = 5
+) -> Dict[str, float]:
+    """
+    Measures the ingestion of raw payloads: decoding with the json module and
+    `transform_met_data_to_model` against `parse_met_payload`, after decoding
+    with the json module and with orjson.
+
+    Returns:
+        The best time per payload (seconds) by method name.
+    """
+    methods: Dict[str, Callable[[bytes], Any]] = {
+        "json + transform_met_data_to_model": lambda body: transform_met_data_to_model(
+            json.loads(body), horizon_hours=horizon_hours
+        ),
+        "json + parse_met_payload": lambda body: parse_met_payload(
+            json.loads(body), horizon_hours=horizon_hours
+        ),
+        "orjson + parse_met_payload": lambda body: parse_met_payload(
+            body, horizon_hours=horizon_hours
+        ),
+    }
+    timings = {}
+    for name, method in methods.items():
+        best = float("inf")
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            for body in bodies:
+                method(body)
+            best = min(best, time.perf_counter() - begin)
+        timings[name] = best / len(bodies)
+    return timings
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Prints the benchmark of the ingestion methods, see the module docstring."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("payloads", type=Path, nargs="*", help="recorded MET payloads")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.payloads:
+        bodies = [path.read_bytes() for path in args.payloads]
+    else:
+        bodies = [json.dumps(synthetic_payload(seed)).encode() for seed in range(20)]
+    size = sum(len(body) for body in bodies) / len(bodies)
+    print(f"{len(bodies)} payloads, {size / 1024:.1f} KiB on average")
+
+    for horizon_hours in (None, 1):
+        window = "whole forecast" if horizon_hours is None else "1 h spin-up window"
+        timings = benchmark(bodies, horizon_hours=horizon_hours, repeat=args.repeat)
+        baseline = next(iter(timings.values()))
+        print(f"\n{window}:")
+        for name, seconds in timings.items():
+            print(f"  {name:<40} {seconds * 1e6:>9.1f} us  x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,30 @@
+import datetime
 from unittest.mock import AsyncMock, MagicMock
 
+import numpy as np
 import pytest
 
+from frcm.datamodel import model as dm
+from services.compute_pool import compute_pool
+from services.result_cache import result_cache
+
+
+@pytest.fixture(autouse=True)
+def threaded_compute_pool(monkeypatch):
+    """
+    Runs the compute pool in threads, so that computations patched by the tests
+    (mocks cannot be pickled to worker processes) are called.
+    """
+    monkeypatch.setattr(compute_pool, "workers", 0)
+
+
+@pytest.fixture(autouse=True)
+def empty_result_cache():
+    """Starts every test with an empty result cache (mocked results are cached too)."""
+    result_cache.clear()
+    yield
+    result_cache.clear()
+
 
 @pytest.fixture
 def mock_db_session():
@@ -38,3 +61,26 @@ def mock_db_session():
     mock_scalars.first.return_value = None
 
     return session
+
+
+@pytest.fixture
+def weather_data() -> dm.WeatherData:
+    """
+    Synthetic MET-like forecast: 9 days of hourly points with a diurnal
+    temperature and humidity cycle.
+    """
+    start = datetime.datetime(2024, 1, 10, tzinfo=datetime.timezone.utc)
+    hours = np.arange(9 * 24)
+    temperature = -2.0 + 6.0 * np.sin(2 * np.pi * (hours - 9) / 24)
+    humidity = 75.0 - 20.0 * np.sin(2 * np.pi * (hours - 9) / 24)
+    return dm.WeatherData(
+        data=[
+            dm.WeatherDataPoint(
+                timestamp=start + datetime.timedelta(hours=int(h)),
+                temperature=float(t),
+                humidity=float(rh),
+                wind_speed=3.0,
+            )
+            for h, t, rh in zip(hours, temperature, humidity)
+        ]
+    )
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from test_fire_risk_service import make_met_json
+
+from frcm.profiling import profile
+from services import compute_pool
+from services.compute_pool import ComputePool, available_cpus, cgroup_cpu_limit
+from utils.fire_risk_service import calculate_risk
+
+
+def die():
+    """Ends the worker process running it."""
+    os._exit(1)
+
+
+@pytest.mark.asyncio
+async def test_process_pool_matches_inline_computation():
+    """Worker processes compute the same risk as the event loop process, and
+    their stage timings are merged into the active profiler."""
+    pool = ComputePool(workers=2)
+    met_json = make_met_json(48, 10.0, 60.0)
+    try:
+        with profile() as profiler:
+            results = await asyncio.gather(
+                pool.run(calculate_risk, met_json, spinup_hours=3),
+                pool.run(calculate_risk, met_json, spinup_hours=6),
+            )
+    finally:
+        pool.shutdown()
+
+    for result, spinup_hours in zip(results, [3, 6]):
+        expected = calculate_risk(met_json, spinup_hours=spinup_hours)
+        assert result["timestamp"] == expected["timestamp"]
+        assert result["ttf"] == expected["ttf"]
+        assert result["state"] == expected["state"]
+    assert profiler.stages["kernel"].calls == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_bounds_submitted_computations():
+    """No more than queue_size computations run at a time."""
+    pool = ComputePool(workers=0, queue_size=2)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return True
+
+    results = await asyncio.gather(*(pool.run(work) for _ in range(6)))
+
+    assert all(results)
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive():
+    """The loop keeps serving other tasks while a computation runs."""
+    pool = ComputePool(workers=0)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    await pool.run(time.sleep, 0.1)
+    task.cancel()
+
+    assert ticks > 5
+
+
+def test_chunks_per_worker():
+    """Zones are split into at most one batch per worker."""
+    assert ComputePool(workers=4).chunks(10) == 4
+    assert ComputePool(workers=4).chunks(2) == 2
+    assert ComputePool(workers=0).chunks(10) == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_restarts_after_a_worker_died():
+    """Only the calls running when a worker dies fail, the next ones succeed."""
+    pool = ComputePool(workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(die)
+        assert await pool.run(abs, -3) == 3
+    finally:
+        pool.shutdown()
+
+
+def test_pool_is_used_by_several_loops():
+    """The queue slots are bound to the loop running the computations."""
+    pool = ComputePool(workers=0, queue_size=1)
+
+    async def cycle():
+        return await asyncio.gather(pool.run(abs, -3), pool.run(abs, -4))
+
+    for _ in range(2):
+        assert asyncio.run(cycle()) == [3, 4]
+
+
+def test_workers_default_to_the_cgroup_limit(tmp_path, monkeypatch):
+    """A container's CPU quota limits the default worker count."""
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+    assert cgroup_cpu_limit(tmp_path / "missing") is None
+
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 1.5
+
+    monkeypatch.setattr(compute_pool, "CGROUP_ROOT", tmp_path)
+    monkeypatch.setattr(os, "process_cpu_count", lambda: 8, raising=False)
+    monkeypatch.setattr(compute_pool.settings, "FRCM_COMPUTE_WORKERS", None)
+    assert available_cpus() == 2
+    assert ComputePool().workers == 2
@@ -1,13 +1,18 @@
+import datetime
 from unittest.mock import patch
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
 from db.database import (
+    MODEL_STATE_CHUNK_SIZE,
     MonitoredZone,
     get_monitored_zones,
+    save_model_states,
     save_risk_data,
     save_weather_data,
 )
+from frcm.datamodel import model as dm
 
 
 @pytest.mark.asyncio
@@ -73,3 +78,26 @@ async def test_get_monitored_zones(mock_db_session):
         assert len(zones) == 1
         assert zones[0].geohash == "u4p9x"
         assert zones[0].center_lat == 60.39
+
+
+@pytest.mark.asyncio
+async def test_save_model_states_in_chunks(mock_db_session):
+    """Thousands of zones are written in statements within the bind parameter
+    limit of Postgres, in a single transaction."""
+    state = dm.ModelState(
+        timestamp=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        wall=[0.1] * 5,
+        cw_in=0.005,
+        rh_in=0.5,
+        c_wall=0.0,
+    )
+    states = {f"zone{i}": state for i in range(2 * MODEL_STATE_CHUNK_SIZE + 500)}
+
+    with patch("db.database.AsyncSessionLocal", return_value=mock_db_session):
+        await save_model_states(states)
+
+    statements = [call.args[0] for call in mock_db_session.execute.call_args_list]
+    assert len(statements) == 3
+    for stmt in statements:
+        assert len(stmt.compile(dialect=postgresql.dialect()).params) < 32767
+    assert mock_db_session.commit.call_count == 1
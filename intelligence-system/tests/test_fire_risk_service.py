@@ -0,0 +1,290 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from config import settings
+from frcm.fireriskmodel import parameters as mp
+from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel.state import equilibrium_state
+from frcm.profiling import profile
+from utils.fire_risk_service import (
+    RiskScale,
+    calculate_risk,
+    calculate_risk_batch,
+    calculate_risk_score,
+    calculate_risk_scores,
+)
+from utils.met_parser import transform_met_data_to_model
+
+
+def make_met_json(
+    hours: int, temperature: float, humidity: float, start_hour: int = 0
+) -> dict:
+    """Builds a minimal MET.no locationforecast payload."""
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    start += datetime.timedelta(hours=start_hour)
+    return {
+        "type": "Feature",
+        "properties": {
+            "timeseries": [
+                {
+                    "time": (start + datetime.timedelta(hours=h)).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                    "data": {
+                        "instant": {
+                            "details": {
+                                "air_temperature": temperature + h % 5,
+                                "relative_humidity": humidity,
+                                "wind_speed": 2.0,
+                            }
+                        }
+                    },
+                }
+                for h in range(hours)
+            ]
+        },
+    }
+
+
+def test_calculate_risk_batch_matches_single_zone():
+    """Batched results equal per-zone results, across differing time axes."""
+    met_jsons = [
+        make_met_json(48, 10.0, 60.0),
+        make_met_json(48, 15.0, 30.0),
+        make_met_json(24, 5.0, 90.0),
+        {"invalid": "payload"},
+    ]
+
+    results = calculate_risk_batch(met_jsons)
+
+    assert len(results) == len(met_jsons)
+    assert results[-1] is None
+    for met_json, result in zip(met_jsons[:-1], results[:-1]):
+        expected = calculate_risk(met_json)
+        assert result["timestamp"] == expected["timestamp"]
+        assert result["ttf"] == pytest.approx(expected["ttf"], rel=1e-12)
+
+
+def test_calculate_risk_reports_end_of_spinup():
+    """The reported risk is the simulated risk after the spin-up window."""
+    met_json = make_met_json(48, 10.0, 60.0)
+    weather_data = transform_met_data_to_model(met_json)
+    full = compute(weather_data, initial_state=equilibrium_state(weather_data))
+
+    result = calculate_risk(met_json, spinup_hours=3)
+
+    assert result["timestamp"] == full.firerisks[3].timestamp
+    assert result["ttf"] == pytest.approx(full.firerisks[3].ttf, rel=1e-12)
+
+
+def test_calculate_risk_without_spinup():
+    """Without spin-up the risk of the steady state of the first hour is reported."""
+    met_json = make_met_json(48, 10.0, 60.0)
+
+    result = calculate_risk(met_json, spinup_hours=0)
+    spun_up = calculate_risk(met_json, spinup_hours=24)
+
+    assert result["timestamp"] == datetime.datetime(
+        2024, 5, 1, tzinfo=datetime.timezone.utc
+    )
+    assert result["state"].timestamp == result["timestamp"]
+    assert result["ttf"] == pytest.approx(spun_up["ttf"], rel=0.2)
+
+
+def test_calculate_risk_warm_start():
+    """
+    A fresh state is continued up to the reported hour, the hour a cold start
+    of the same forecast reports, a stale one not.
+    """
+    first_cycle = calculate_risk(make_met_json(48, 10.0, 60.0), spinup_hours=1)
+    state = first_cycle["state"]
+    assert state.timestamp == first_cycle["timestamp"]
+
+    next_cycle = calculate_risk(
+        make_met_json(48, 10.0, 60.0, start_hour=3), initial_state=state
+    )
+    cold_next_cycle = calculate_risk(make_met_json(48, 10.0, 60.0, start_hour=3))
+    assert next_cycle["timestamp"] == state.timestamp + datetime.timedelta(hours=3)
+    assert next_cycle["timestamp"] == cold_next_cycle["timestamp"]
+    assert next_cycle["ttf"] != cold_next_cycle["ttf"]
+    assert next_cycle["state"].timestamp == next_cycle["timestamp"]
+
+    stale_cycle = calculate_risk(
+        make_met_json(48, 10.0, 60.0, start_hour=30),
+        spinup_hours=1,
+        initial_state=state,
+    )
+    cold_cycle = calculate_risk(
+        make_met_json(48, 10.0, 60.0, start_hour=30), spinup_hours=1
+    )
+    assert stale_cycle == cold_cycle
+
+
+def test_warm_start_steps_whole_hours():
+    """
+    A state at a fractional hour reports the last full hour of its window, a
+    state of the first forecast hour steps one hour and a state less than an
+    hour before the reported hour is not continued.
+    """
+    state = calculate_risk(make_met_json(48, 10.0, 60.0), spinup_hours=1)["state"]
+    met_json = make_met_json(48, 10.0, 60.0, start_hour=3)
+    weather_data = transform_met_data_to_model(met_json)
+
+    for age in (2.5, 0.0):
+        start = state.model_copy(
+            update={
+                "timestamp": weather_data.data[0].timestamp
+                - datetime.timedelta(hours=age)
+            }
+        )
+        hours = int(age + 1)
+        expected = compute(weather_data, horizon_hours=age + 1, initial_state=start)
+
+        result = calculate_risk(met_json, spinup_hours=1, initial_state=start)
+
+        assert result["timestamp"] == start.timestamp + datetime.timedelta(hours=hours)
+        assert result["ttf"] == pytest.approx(expected.firerisks[hours].ttf, rel=1e-12)
+        assert result["state"] == expected.state
+        assert calculate_risk_batch(
+            [met_json], spinup_hours=1, initial_states=[start]
+        ) == [result]
+
+    recent = state.model_copy(
+        update={
+            "timestamp": weather_data.data[0].timestamp + datetime.timedelta(hours=0.5)
+        }
+    )
+    assert calculate_risk(met_json, spinup_hours=1, initial_state=recent) == (
+        calculate_risk(met_json, spinup_hours=1)
+    )
+
+
+def test_archetypes_match_single_runs():
+    """Every archetype equals a separate simulation with its parameters."""
+    met_json = make_met_json(48, 10.0, 60.0)
+    weather_data = transform_met_data_to_model(met_json)
+
+    result = calculate_risk(met_json, spinup_hours=6, archetypes=True)
+
+    assert list(result["archetypes"]) == list(mp.ARCHETYPES)
+    for name, params in mp.ARCHETYPES.items():
+        expected = compute(
+            weather_data,
+            horizon_hours=6,
+            initial_state=equilibrium_state(weather_data, params),
+            params=params,
+        ).firerisks[6]
+        assert expected.timestamp == result["timestamp"]
+        assert result["archetypes"][name] == pytest.approx(expected.ttf, rel=1e-9)
+
+
+def test_archetypes_share_the_window_of_a_warm_start():
+    """
+    The archetypes are simulated over the window of the warm-started default
+    enclosure, from the start of its state, and reported at its timestamp.
+    """
+    state = calculate_risk(make_met_json(48, 10.0, 60.0), spinup_hours=1)["state"]
+    met_jsons = [make_met_json(48, 10.0, 60.0, start_hour=3)] * 2
+    weather_data = transform_met_data_to_model(met_jsons[0])
+
+    result = calculate_risk(met_jsons[0], initial_state=state, archetypes=True)
+    batch = calculate_risk_batch(met_jsons, initial_states=[state, None])
+
+    assert result["timestamp"] == state.timestamp + datetime.timedelta(hours=3)
+    for name, params in mp.ARCHETYPES.items():
+        start = equilibrium_state(weather_data, params).model_copy(
+            update={"timestamp": state.timestamp}
+        )
+        expected = compute(
+            weather_data, horizon_hours=3, initial_state=start, params=params
+        ).firerisks[3]
+        assert result["archetypes"][name] == pytest.approx(expected.ttf, rel=1e-9)
+        assert batch[0]["archetypes"][name] == pytest.approx(
+            result["archetypes"][name], rel=1e-12
+        )
+    assert batch[1]["archetypes"] != batch[0]["archetypes"]
+    assert "archetypes" not in calculate_risk(met_jsons[0], archetypes=False)
+
+
+def test_calculate_risk_records_transform_stages():
+    """The MET timestamp parsing and value extraction are profiled as stages."""
+    with profile() as profiler:
+        calculate_risk(make_met_json(48, 10.0, 60.0), spinup_hours=3)
+
+    assert profiler.stages["transform.parse"].size == 48
+    # the values of entries past the spin-up window are not read
+    assert profiler.stages["transform.extract"].size == 4
+    assert profiler.stages["kernel"].calls == 1
+
+
+def test_risk_scores_of_the_default_scale():
+    """The default scale keeps the thresholds of the original if/elif chain."""
+    ttf = [-1.0, 0.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0]
+
+    scores, categories = calculate_risk_scores(ttf)
+
+    assert list(scores) == [100, 100, 90, 80, 70, 60, 50, 30, 15, 0, 0]
+    assert list(categories) == (
+        ["Extreme"] * 3 + ["High"] * 2 + ["Moderate"] * 2 + ["Low"] * 4
+    )
+    assert calculate_risk_score(20.0) == (50.0, "Moderate")
+
+
+def original_risk_score(ttf):
+    """The hardcoded if/elif chain the default scale replaced."""
+    if ttf <= 0:
+        return 100.0, "Extreme"
+    if ttf < 5:
+        score, category = 100 - (ttf / 5) * 20, "Extreme"
+    elif ttf < 15:
+        score, category = 80 - ((ttf - 5) / 10) * 20, "High"
+    elif ttf < 30:
+        score, category = 60 - ((ttf - 15) / 15) * 30, "Moderate"
+    else:
+        score, category = max(0.0, 30 - ((ttf - 30) / 30) * 30), "Low"
+    return round(score, 1), category
+
+
+def test_default_scale_reproduces_the_original_chain():
+    """Bit for bit on a dense grid with the .x25/.x75 rounding boundaries and NaN."""
+    ttf = np.concatenate(
+        [
+            np.arange(-2000, 80000) / 1000,
+            np.arange(-20, 800) / 10 + 0.025,
+            np.arange(-20, 800) / 10 + 0.075,
+            [np.nan, np.inf, -np.inf],
+        ]
+    )
+
+    scores, categories = calculate_risk_scores(ttf)
+
+    expected = [original_risk_score(value) for value in ttf.tolist()]
+    assert scores.tolist() == [score for score, _ in expected]
+    assert categories.tolist() == [category for _, category in expected]
+    assert calculate_risk_score(float("nan")) == (0.0, "Low")
+
+
+def test_risk_scores_match_the_scalar_function():
+    ttf = np.random.default_rng(0).uniform(-5, 100, 1000)
+
+    scores, categories = calculate_risk_scores(ttf)
+
+    for value, score, category in zip(ttf, scores, categories):
+        assert calculate_risk_score(value) == (score, category)
+
+
+def test_risk_scale_is_configurable(monkeypatch):
+    monkeypatch.setattr(settings, "RISK_SCORE_TTF_MINUTES", [0, 20])
+    monkeypatch.setattr(settings, "RISK_SCORE_VALUES", [100, 0])
+    monkeypatch.setattr(settings, "RISK_CATEGORIES", ["High", "Low"])
+    monkeypatch.setattr(settings, "RISK_CATEGORY_TTF_MINUTES", [10])
+
+    assert calculate_risk_score(5.0) == (75.0, "High")
+    assert calculate_risk_score(10.0) == (50.0, "Low")
+
+    with pytest.raises(ValueError):
+        RiskScale((0.0, 20.0), (100.0, 0.0), ("High", "Low"), ())
+    with pytest.raises(ValueError):
+        RiskScale((20.0, 0.0), (100.0, 0.0), ("High",), ())
@@ -0,0 +1,147 @@
+import os
+import sys
+
+import pytest
+
+import frcm
+from frcm import batch, console_main
+from frcm.batch import find_inputs, format_summary, output_paths, run_batch
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel.compute import compute
+
+run_file = batch._run_file
+
+
+def run_file_or_die(file, *args):
+    """Ends the worker process computing the second station."""
+    if file.stem == "station1":
+        os._exit(1)
+    return run_file(file, *args)
+
+
+@pytest.fixture
+def stations(tmp_path, weather_data):
+    """Station CSV files in two subdirectories, with different weather."""
+    files = []
+    for index in range(4):
+        data = [
+            point.model_copy(update={"temperature": point.temperature + index})
+            for point in weather_data.data[: 48 + 24 * index]
+        ]
+        file = tmp_path / "stations" / f"region{index % 2}" / f"station{index}.csv"
+        file.parent.mkdir(parents=True, exist_ok=True)
+        dm.WeatherData(data=data).write_csv(file)
+        files.append(file)
+    return files
+
+
+def test_inputs_and_outputs(tmp_path, stations):
+    """Globs and directories list their files, results mirror their layout."""
+    root = tmp_path / "stations"
+
+    assert find_inputs(root / "**" / "*.csv") == sorted(stations)
+    assert find_inputs(root / "region1") == [stations[1], stations[3]]
+    assert output_paths(stations[:2], tmp_path / "out") == [
+        tmp_path / "out" / "region0" / "station0.csv",
+        tmp_path / "out" / "region1" / "station1.csv",
+    ]
+    with pytest.raises(ValueError):
+        output_paths(stations, root)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_batch_writes_one_result_per_input(tmp_path, stations, jobs):
+    """Every file is computed as in the single file mode, also in processes."""
+    outputs = output_paths(stations, tmp_path / "out")
+
+    results = list(run_batch(stations, outputs, jobs=jobs))
+
+    assert sorted(result.input for result in results) == sorted(stations)
+    for file, output in zip(stations, outputs):
+        expected = compute(dm.WeatherData.read_csv(file))
+        assert output.read_text().splitlines() == str(expected).splitlines()
+        (result,) = [r for r in results if r.input == file]
+        assert result.error is None
+        assert result.hours == len(expected.firerisks)
+
+
+def test_run_batch_survives_a_dead_worker(tmp_path, stations, monkeypatch):
+    """Only the file whose worker process died fails, the others are computed."""
+    monkeypatch.setattr(batch, "_run_file", run_file_or_die)
+    outputs = output_paths(stations, tmp_path / "out")
+
+    results = list(run_batch(stations, outputs, jobs=2))
+
+    assert sorted(result.input for result in results) == sorted(stations)
+    assert {r.input: r.error for r in results if r.error} == {
+        stations[1]: "worker process died"
+    }
+    assert not outputs[1].exists()
+    assert all(output.exists() for output in outputs[::2] + outputs[3:])
+
+
+def test_console_batch_mode(tmp_path, stations, monkeypatch, capsys):
+    """Progress and a throughput summary are printed, failures set the exit code."""
+    broken = tmp_path / "stations" / "region0" / "broken.csv"
+    broken.write_text("timestamp,temperature,humidity,wind_speed\n")
+    pattern = str(tmp_path / "stations" / "**" / "*.csv")
+    monkeypatch.setattr(sys, "argv", ["frcm", pattern, str(tmp_path / "out"), "-j1"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        console_main()
+
+    assert exit_info.value.code == 1
+    out, err = capsys.readouterr()
+    assert "[5/5]" in out
+    assert "Computed 4 files" in out and "hours/s" in out and "1 failed" in out
+    assert "broken.csv failed" in err
+    assert len(list((tmp_path / "out").rglob("*.csv"))) == 4
+
+
+def test_format_summary():
+    results = list(run_batch([], []))
+
+    assert format_summary(results, 1.0).startswith("Computed 0 files (0 hours)")
+
+
+def test_console_kernel_defaults_to_the_environment(tmp_path, stations, monkeypatch):
+    """The console reads FRCM_KERNEL, the compute functions do not."""
+    kernels = []
+    monkeypatch.setattr(
+        frcm,
+        "compute",
+        lambda wd, kernel=None: kernels.append(kernel) or compute(wd, kernel=kernel),
+    )
+    monkeypatch.setenv("FRCM_KERNEL", "reference")
+    output = tmp_path / "risks.csv"
+    for argv in ([], ["--kernel", "batched"]):
+        monkeypatch.setattr(sys, "argv", ["frcm", str(stations[0]), str(output), *argv])
+        console_main()
+
+    assert kernels == ["reference", "batched"]
+
+
+def test_console_stream_writes_only_risks_to_stdout(stations, monkeypatch, capsys):
+    """Without an output file the streamed CSV is the only output on stdout."""
+    monkeypatch.setattr(sys, "argv", ["frcm", str(stations[0]), "--stream"])
+
+    console_main()
+
+    out, err = capsys.readouterr()
+    expected = compute(dm.WeatherData.read_csv(stations[0]))
+    assert out.splitlines()[0] == dm.FireRisk.csv_header()
+    assert len(out.splitlines()) == len(expected.firerisks) + 1
+    assert "Streaming FireRisk computation" in err
+
+
+def test_console_stream_rejects_parquet_output(tmp_path, stations, monkeypatch):
+    """The streaming mode does not write CSV lines into a .parquet file."""
+    output = tmp_path / "risks.parquet"
+    monkeypatch.setattr(
+        sys, "argv", ["frcm", str(stations[0]), str(output), "--stream"]
+    )
+
+    with pytest.raises(SystemExit, match="CSV"):
+        console_main()
+
+    assert not output.exists()
@@ -0,0 +1,81 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import frcm.fireriskmodel.preprocess as pp
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel.compute import compute, compute_batch
+from frcm.fireriskmodel.golden import synthetic_corpus
+from frcm.fireriskmodel.state import equilibrium_state
+
+
+def test_columns_round_trip(weather_data):
+    """Converting to columns and back keeps every data point."""
+    columns = dm.ColumnarWeatherData.from_weather_data(weather_data)
+
+    assert len(columns) == len(weather_data.data)
+    assert columns.timestamp.dtype == np.dtype("datetime64[us]")
+    assert columns.start_time == weather_data.data[0].timestamp
+    assert columns.to_weather_data() == weather_data
+
+
+def test_validated_construction_converts_and_sorts():
+    """The constructor accepts datetimes and lists, and sorts the columns."""
+    start = datetime.datetime(2024, 5, 1)
+    columns = dm.ColumnarWeatherData(
+        timestamp=[start + datetime.timedelta(hours=h) for h in (2, 0, 1)],
+        temperature=[2, 0, 1],
+        humidity=[52.0, 50.0, 51.0],
+        wind_speed=[0.0, 0.0, 0.0],
+    )
+
+    assert columns.temperature.tolist() == [0.0, 1.0, 2.0]
+    assert columns.humidity.dtype == np.float64
+    # naive timestamps stay naive
+    assert columns.start_time == start
+
+    with pytest.raises(ValueError):
+        dm.ColumnarWeatherData(
+            timestamp=[start], temperature=[1.0, 2.0], humidity=[1.0], wind_speed=[0.0]
+        )
+
+
+def test_trusted_construction_does_not_copy(weather_data):
+    """Trusted columns and their slices are views of the given arrays."""
+    columns = dm.ColumnarWeatherData.from_weather_data(weather_data)
+    trusted = dm.ColumnarWeatherData.trusted(*columns.columns())
+
+    assert trusted.temperature is columns.temperature
+    assert np.shares_memory(trusted.slice(stop=5).humidity, columns.humidity)
+
+
+@pytest.mark.parametrize("name", sorted(synthetic_corpus()))
+def test_preprocess_is_bit_identical(name):
+    """Columns preprocess exactly like the list of points, with and without a
+    horizon or an explicit start time."""
+    wd = synthetic_corpus()[name]
+    columns = dm.ColumnarWeatherData.from_weather_data(wd)
+    start = wd.data[0].timestamp + datetime.timedelta(minutes=30)
+
+    for kwargs in ({}, {"horizon_hours": 5}, {"start_time": start, "delta_t": 3600}):
+        expected = pp.preprocess(wd, **kwargs)
+        result = pp.preprocess(columns, **kwargs)
+
+        assert result[0] == expected[0]
+        assert list(result[1]) == list(expected[1])
+        for got, want in zip(result[2:5], expected[2:5]):
+            np.testing.assert_array_equal(got, want)
+        assert result[5] == expected[5]
+
+
+def test_compute_accepts_columns(weather_data):
+    """compute and compute_batch give the same results for columns."""
+    columns = dm.ColumnarWeatherData.from_weather_data(weather_data)
+    expected = compute(weather_data, horizon_hours=48)
+
+    assert compute(columns, horizon_hours=48) == expected
+    assert equilibrium_state(columns) == equilibrium_state(weather_data)
+
+    batch = compute_batch([columns, weather_data], horizon_hours=48)
+    np.testing.assert_array_equal(batch.ttf[0], batch.ttf[1])
@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel import parameters as mp
+from frcm.fireriskmodel import preprocess as pp
+from frcm.fireriskmodel import utils as func
+from frcm.fireriskmodel.compute import (
+    compute,
+    compute_batch,
+    compute_fr,
+    compute_fr_batch,
+    compute_fr_vectorized,
+    select_kernel,
+)
+from frcm.fireriskmodel.precision import precision_drift
+from frcm.fireriskmodel.state import equilibrium_kernel_state
+
+
+def test_vectorized_kernel_matches_reference(weather_data):
+    """The vectorized kernel reproduces the reference kernel."""
+    _, _, temp, humidity, _, _ = pp.preprocess(weather_data)
+
+    rh_in_ref, ttf_ref = compute_fr(temp, humidity)
+    rh_in, ttf = compute_fr_vectorized(temp, humidity)
+
+    np.testing.assert_allclose(rh_in, rh_in_ref, rtol=1e-12)
+    np.testing.assert_allclose(ttf, ttf_ref, rtol=1e-12)
+
+
+def test_compute_with_vectorized_kernel(weather_data):
+    """compute() accepts an alternative kernel and keeps the hourly output."""
+    reference = compute(weather_data)
+    vectorized = compute(weather_data, kernel=compute_fr_vectorized)
+
+    assert len(vectorized.firerisks) == len(reference.firerisks)
+    assert len(reference.firerisks) == len(weather_data.data)
+    for ref, vec in zip(reference.firerisks, vectorized.firerisks):
+        assert vec.timestamp == ref.timestamp
+        assert np.isclose(vec.ttf, ref.ttf, rtol=1e-12)
+
+
+def test_wall_operator_matches_layer_formulas():
+    """One operator step equals the per-layer explicit update."""
+    rng = np.random.default_rng(0)
+    wall = rng.uniform(30, 60, mp.sub_layers)
+    rh_in, rh_wall, cw_sat_in = 0.35, 0.5, 0.019
+
+    expected = np.empty(mp.sub_layers)
+    expected[0] = func.calc_layer1(rh_in, rh_wall, wall[0], wall[1], cw_sat_in)
+    for n in range(1, mp.sub_layers - 1):
+        expected[n] = func.calc_middle_layers(wall[n], wall[n - 1], wall[n + 1])
+    expected[-1] = func.calc_outer_layer(wall[-1], wall[-2])
+
+    stepped = func.calc_wall_operator(mp.sub_layers) @ wall
+    stepped[0] += func.calc_wall_flux(rh_in, rh_wall, cw_sat_in)
+
+    np.testing.assert_allclose(stepped, expected, rtol=1e-12)
+
+
+def test_compute_batch_matches_single_zone(weather_data):
+    """Every row of the batched TTF matrix matches a single-zone run."""
+    humid = weather_data.model_copy(deep=True)
+    for point in humid.data:
+        point.humidity = min(100.0, point.humidity + 20)
+
+    batch = compute_batch([weather_data, humid])
+
+    assert len(batch) == 2
+    for row, wd in enumerate([weather_data, humid]):
+        single = compute(wd)
+        assert batch.timestamps == [r.timestamp for r in single.firerisks]
+        np.testing.assert_allclose(
+            batch.ttf[row], [r.ttf for r in single.firerisks], rtol=1e-12
+        )
+
+
+def test_compute_batch_rejects_misaligned_series(weather_data):
+    """Zones must share a common time axis."""
+    shorter = dm.WeatherData(data=weather_data.data[:-5])
+
+    with pytest.raises(ValueError):
+        compute_batch([weather_data, shorter])
+
+
+def test_compute_horizon_is_prefix_of_full_run(weather_data):
+    """A horizon-limited run reproduces the start of the full simulation."""
+    full = compute(weather_data)
+    limited = compute(weather_data, horizon_hours=6)
+
+    assert len(limited.firerisks) == 7
+    assert limited.firerisks == full.firerisks[:7]
+
+
+def test_compute_warm_start_continues_simulation(weather_data):
+    """Restarting from the final state reproduces the uninterrupted run."""
+    full = compute(weather_data)
+    first = compute(weather_data, horizon_hours=24)
+    second = compute(weather_data, initial_state=first.state)
+
+    assert first.state.timestamp == full.firerisks[24].timestamp
+    assert second.firerisks == full.firerisks[24:]
+
+    batch = compute_batch(
+        [weather_data, weather_data], initial_states=[first.state, first.state]
+    )
+    np.testing.assert_allclose(
+        batch.ttf[0], [r.ttf for r in full.firerisks[24:]], rtol=1e-12
+    )
+    assert batch.states[0].timestamp == full.firerisks[-1].timestamp
+
+
+def test_equilibrium_state_is_steady():
+    """Under constant outdoor conditions the equilibrium state does not change."""
+    temp = np.array([10.0, -10.0, 25.0, 0.0])
+    humidity = np.array([60.0, 90.0, 30.0, 100.0])
+    state = equilibrium_kernel_state(temp, humidity)
+
+    _, ttf = compute_fr_batch(
+        np.repeat(temp[:, None], 100, axis=1),
+        np.repeat(humidity[:, None], 100, axis=1),
+        initial_state=state,
+    )
+    np.testing.assert_allclose(ttf, ttf[:, :1].repeat(100, axis=1), rtol=1e-12)
+
+    single = equilibrium_kernel_state(temp[0], humidity[0])
+    _, ttf_single = compute_fr([temp[0]] * 10, [humidity[0]] * 10, single)
+    np.testing.assert_allclose(ttf_single, ttf[0, :10], rtol=1e-12)
+
+
+def test_float32_batch_stays_float32(weather_data):
+    """The float32 mode keeps its arrays in float32 and stays close to float64."""
+    _, _, temp, humidity, _, _ = pp.preprocess(weather_data)
+    temps = np.stack([temp, temp - 5])
+    humidities = np.stack([humidity, humidity])
+
+    rh_in, ttf, state = compute_fr_batch(
+        temps, humidities, return_state=True, dtype="float32"
+    )
+    _, ttf_ref = compute_fr_batch(temps, humidities)
+
+    assert rh_in.dtype == ttf.dtype == state.wall.dtype == np.float32
+    np.testing.assert_allclose(ttf, ttf_ref, rtol=1e-4)
+
+
+def test_precision_drift_report(weather_data):
+    """The verification routine reports the float32 drift of the TTF."""
+    drift = precision_drift([weather_data])
+
+    assert 0 < drift.max_abs_ttf < 1e-3
+    assert drift.mean_abs_ttf <= drift.max_abs_ttf
+    assert drift.max_abs_rh_in < 1e-4
+
+
+def test_select_kernel_by_name_and_size(monkeypatch):
+    """Kernels are selected by name or by input size, not by the environment."""
+    monkeypatch.setenv("FRCM_KERNEL", "reference")
+    assert select_kernel("reference").kernel is compute_fr
+    assert select_kernel(steps=2).kernel is compute_fr
+    assert select_kernel(steps=1000).kernel is compute_fr_vectorized
+    assert select_kernel(zones=100).kernel is compute_fr_batch
+
+    with pytest.raises(ValueError):
+        select_kernel("missing")
+
+
+def test_auto_selects_kernels_taking_parameters(weather_data, monkeypatch):
+    """With injected parameters "auto" skips the reference and implicit kernels."""
+    params = mp.ParameterSet(A_ex=60)
+    assert select_kernel(steps=2, params=True).kernel is compute_fr_vectorized
+    assert select_kernel(zones=100, params=True).kernel is compute_fr_batch
+    with pytest.raises(ValueError, match="does not take building parameters"):
+        compute(weather_data, kernel="reference", params=params)
+
+    expected = compute(weather_data, kernel="vectorized", params=params)
+    short = dm.WeatherData(data=weather_data.data[:2])
+    monkeypatch.setattr(mp, "wall_solver", "implicit")
+    assert compute(weather_data, kernel="auto", params=params) == expected
+    assert len(compute(short, kernel="auto", params=params).firerisks) == 2
+
+
+@pytest.mark.parametrize("kernel", ["reference", "vectorized", "batched"])
+def test_registered_kernels_agree(weather_data, kernel):
+    """Every explicit kernel gives the reference result, single or batched."""
+    humid = weather_data.model_copy(deep=True)
+    for point in humid.data:
+        point.humidity = min(100.0, point.humidity + 15)
+
+    reference = compute(weather_data, kernel=compute_fr)
+    single = compute(weather_data, kernel=kernel)
+    batch = compute_batch([weather_data, humid], kernel=kernel)
+    reference_batch = compute_batch([weather_data, humid], kernel="reference")
+
+    np.testing.assert_allclose(
+        [r.ttf for r in single.firerisks],
+        [r.ttf for r in reference.firerisks],
+        rtol=1e-12,
+    )
+    np.testing.assert_allclose(batch.ttf, reference_batch.ttf, rtol=1e-12)
+    assert single.state.wall == pytest.approx(reference.state.wall, rel=1e-12)
@@ -0,0 +1,201 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from frcm.datamodel import csv_io
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel.compute import compute
+
+HEADER = "timestamp,temperature,humidity,wind_speed\n"
+
+
+def reference_lines(text):
+    """The lines of a weather CSV parsed one by one, as the datamodel did."""
+    return [
+        dm.WeatherDataPoint.from_csv_line(line)
+        for line in text.splitlines()[1:]
+        if line.strip()
+    ]
+
+
+def test_parse_matches_float_and_fromisoformat():
+    """Numbers and timestamps are parsed exactly like float() and fromisoformat."""
+    rng = np.random.default_rng(1)
+    numbers = [f"{x:.{rng.integers(0, 6)}f}" for x in rng.normal(0, 500, 2000).tolist()]
+    numbers += ["-0.0", "+3.5", "12.", ".5", "1e-05", "nan", "-inf", "007.25"]
+    numbers += ["123456789012345.6", "0.1234567890123456", "99999999999999.9"]
+    lines = [
+        f"2024-03-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00+02:00,{a},{b},{c}"
+        for i, (a, b, c) in enumerate(zip(numbers, numbers[1:], numbers[2:]))
+    ]
+    text = HEADER + "\n".join(lines) + "\n"
+
+    chunk = csv_io.parse_csv_chunk(text.split("\n", 1)[1].encode(), 3)
+
+    expected = reference_lines(text)
+    assert chunk.utc
+    values = np.array([[p.temperature, p.humidity, p.wind_speed] for p in expected])
+    assert np.array_equal(chunk.values, values, equal_nan=True)
+    assert np.array_equal(np.signbit(chunk.values), np.signbit(values))
+    assert chunk.timestamp.tolist() == [
+        p.timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        for p in expected
+    ]
+
+
+@pytest.mark.parametrize("cell", ["nan", "-inf", "inf", "1_000"])
+def test_long_numbers_next_to_non_numeric_cells(tmp_path, cell):
+    """
+    The sign of a number longer than the digit window does not hide a
+    non-numeric cell of the same block from float(): as many long negative
+    temperatures as the cell has non-digit characters.
+    """
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    signs = sum(not c.isdigit() for c in cell) - cell.startswith("-")
+    points = [
+        dm.WeatherDataPoint(
+            timestamp=start + datetime.timedelta(hours=i),
+            temperature=-3.141592653589793 - i if i < signs else 1.5,
+            humidity=80.0,
+            wind_speed=2.0,
+        )
+        for i in range(signs + 1)
+    ]
+    file = tmp_path / "weather.csv"
+    dm.WeatherData(data=points).write_csv(file)
+    text = file.read_text()
+    last = text.rindex(",80.0,")
+    file.write_text(f"{text[:last]},{cell},{text[last + 6 :]}")
+
+    columns = dm.ColumnarWeatherData.read_csv(file)
+    read = dm.WeatherData.read_csv(file).data
+
+    assert np.array_equal(columns.humidity[-1], float(cell), equal_nan=True)
+    assert np.array_equal(read[-1].humidity, float(cell), equal_nan=True)
+    assert columns.temperature.tolist() == [p.temperature for p in points]
+
+
+@pytest.mark.parametrize("chunk_bytes", [7, 64, 1 << 20])
+def test_read_in_chunks(tmp_path, weather_data, chunk_bytes):
+    """The rows are the same however the file is split into blocks."""
+    file = tmp_path / "weather.csv"
+    weather_data.write_csv(file)
+
+    columns = dm.ColumnarWeatherData.read_csv(file, chunk_bytes=chunk_bytes)
+    chunks = list(dm.ColumnarWeatherData.iter_csv(file, chunk_bytes=chunk_bytes))
+
+    expected = dm.ColumnarWeatherData.from_weather_data(weather_data)
+    for actual, wanted in zip(columns.columns(), expected.columns()):
+        assert np.array_equal(actual, wanted)
+    assert columns.utc
+    assert sum(len(chunk) for chunk in chunks) == len(expected)
+    if chunk_bytes < 1 << 20:
+        assert len(chunks) > 1
+
+
+def test_irregular_lines(tmp_path):
+    """Blank lines, CRLF line breaks, mixed widths and a missing final break."""
+    file = tmp_path / "weather.csv"
+    text = (
+        HEADER
+        + "2024-01-01T00:00:00,1.5,80.0,2.0\r\n"
+        + "\r\n"
+        + "2024-01-01T01:00:00.250000,-1e3,nan,0\r\n"
+        + "2024-01-01T02:00:00,3,90,1.25"
+    )
+    file.write_bytes(text.encode())
+
+    points = dm.WeatherData.read_csv(file).data
+
+    assert len(points) == 3
+    assert points[0] == reference_lines(text)[0]
+    assert points[1].timestamp == datetime.datetime(2024, 1, 1, 1, 0, 0, 250000)
+    assert points[1].temperature == -1000.0
+    assert np.isnan(points[1].humidity)
+    assert points[2].wind_speed == 1.25
+
+
+def test_malformed_lines_raise(tmp_path):
+    file = tmp_path / "weather.csv"
+    file.write_text(HEADER + "2024-01-01T00:00:00,1.5,80.0\n")
+    with pytest.raises(ValueError):
+        dm.ColumnarWeatherData.read_csv(file)
+
+    file.write_text(HEADER + "2024-01-01T00:00:00,1.5,eighty,2.0\n")
+    with pytest.raises(ValueError):
+        dm.ColumnarWeatherData.read_csv(file)
+
+    file.write_text(
+        HEADER + "2024-01-01T00:00:00,1.5,80.0,2.0\n2024-01-01T01:00:00Z,1,2,3\n"
+    )
+    with pytest.raises(ValueError):
+        dm.ColumnarWeatherData.read_csv(file)
+
+
+def test_write_matches_csv_line(tmp_path, weather_data):
+    """The bulk formatted rows equal the csv_line of every data point."""
+    points = [
+        p.model_copy(update={"temperature": value})
+        for p, value in zip(weather_data.data, [-0.0, 1e-7, float("nan"), 1e22])
+    ] + weather_data.data[4:]
+    points[1] = points[1].model_copy(
+        update={"timestamp": points[1].timestamp.replace(microsecond=5)}
+    )
+    wd = dm.WeatherData(data=points)
+    expected = HEADER + "".join(f"{p.csv_line()}\n" for p in points)
+
+    wd.write_csv(tmp_path / "points.csv")
+    dm.ColumnarWeatherData.from_weather_data(wd).write_csv(
+        tmp_path / "columns.csv", chunk_rows=5
+    )
+
+    assert (tmp_path / "points.csv").read_text() == expected
+    assert (tmp_path / "columns.csv").read_text() == expected
+
+
+def test_fire_risk_round_trip(tmp_path):
+    timestamps = [
+        datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        + datetime.timedelta(minutes=30 * i)
+        for i in range(100)
+    ]
+    risks = dm.FireRiskPrediction(
+        firerisks=[
+            dm.FireRisk(timestamp=t, ttf=5.0 + i / 7) for i, t in enumerate(timestamps)
+        ]
+    )
+    file = tmp_path / "risks.csv"
+
+    risks.write_csv(file)
+
+    assert file.read_text() == str(risks) + "\n"
+    assert dm.FireRiskPrediction.read_csv(file) == risks
+
+
+@pytest.mark.parametrize("chunk_bytes", [64, csv_io.CHUNK_BYTES])
+def test_timestamps_keep_a_common_offset(tmp_path, chunk_bytes):
+    """Timestamps sharing a UTC offset are handed out, computed and written
+    at it, as parsing them line by line does; mixed offsets are in UTC."""
+    lines = [f"2024-06-01T{hour:02d}:00:00+02:00,15.0,60.0,3.0" for hour in range(8)]
+    src = tmp_path / "local.csv"
+    src.write_text(HEADER + "\n".join(lines) + "\n")
+
+    columns = dm.ColumnarWeatherData.read_csv(src, chunk_bytes)
+    points = list(dm.WeatherData.iter_csv(src))
+
+    expected = [p.timestamp for p in reference_lines(src.read_text())]
+    assert columns.start_time.isoformat() == "2024-06-01T00:00:00+02:00"
+    assert [p.timestamp.isoformat() for p in points] == [
+        t.isoformat() for t in expected
+    ]
+    columns.write_csv(tmp_path / "out.csv")
+    assert (tmp_path / "out.csv").read_text() == src.read_text()
+    risks = compute(columns).firerisks
+    assert risks[-1].timestamp.isoformat() == "2024-06-01T07:00:00+02:00"
+
+    mixed = tmp_path / "mixed.csv"
+    mixed.write_text(HEADER + lines[0] + "\n2024-06-01T00:30:00+01:00,15.0,60.0,3.0\n")
+    assert dm.ColumnarWeatherData.read_csv(mixed).start_time.isoformat() == (
+        "2024-05-31T22:00:00+00:00"
+    )
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel.golden import (
+    TOLERANCES,
+    evaluate_kernels,
+    harness_kernels,
+    load_golden,
+    synthetic_corpus,
+)
+
+GOLDEN_FILE = Path(__file__).parent / "golden" / "frcm_golden.npz"
+
+
+@pytest.fixture(scope="module")
+def golden_cases():
+    return load_golden(GOLDEN_FILE)
+
+
+def test_golden_corpus_covers_edge_cases(golden_cases):
+    """The stored corpus is the synthetic one, including its edge cases."""
+    assert set(golden_cases) >= set(synthetic_corpus())
+
+    nan_gaps = golden_cases["nan_gaps"].weather.data
+    assert any(np.isnan(point.temperature) for point in nan_gaps)
+    assert any(np.isnan(point.humidity) for point in nan_gaps)
+    assert min(p.temperature for p in golden_cases["sub_zero"].weather.data) < -15
+    assert max(p.humidity for p in golden_cases["saturated"].weather.data) == 100
+    assert golden_cases["long_horizon"].time_sec[-1] >= 29 * 24 * 3600
+
+
+@pytest.mark.parametrize("kernel", list(harness_kernels()))
+def test_kernel_matches_golden(golden_cases, kernel):
+    """Every kernel reproduces the golden trajectories within its tolerance."""
+    (accuracy,) = evaluate_kernels(golden_cases, [kernel], repeat=1)
+    ttf_tolerance, rh_in_tolerance = TOLERANCES[kernel]
+
+    assert accuracy.max_abs_ttf <= ttf_tolerance
+    assert accuracy.max_abs_rh_in <= rh_in_tolerance
+    assert accuracy.mean_abs_ttf <= accuracy.max_abs_ttf
+
+
+def test_compute_matches_golden(golden_cases):
+    """The hourly output of compute() pins to the golden TTF trajectories."""
+    for case in golden_cases.values():
+        prediction = compute(case.weather, kernel="reference")
+        ttf = [risk.ttf for risk in prediction.firerisks]
+
+        np.testing.assert_allclose(ttf, case.ttf[::5], rtol=0, atol=1e-9)
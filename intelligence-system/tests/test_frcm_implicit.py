@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from frcm.fireriskmodel import parameters as mp
+from frcm.fireriskmodel import preprocess as pp
+from frcm.fireriskmodel.compute import compute, compute_batch, steps_per_hour
+from frcm.fireriskmodel.implicit import compute_fr_implicit, solver_deviation
+
+
+def test_implicit_solver_stays_close_to_explicit(weather_data):
+    """At hourly steps the implicit TTF stays within the documented bound."""
+    deviation = solver_deviation(weather_data)
+
+    assert deviation.implicit_steps * 5 <= deviation.explicit_steps + 5
+    assert deviation.max_abs_ttf < 0.2
+    assert deviation.max_rel_ttf < 0.05
+
+
+def test_implicit_solver_is_stable_for_large_steps(weather_data):
+    """Steps far beyond the explicit stability limit give bounded results."""
+    _, _, temp, humidity, _, _ = pp.preprocess(weather_data, delta_t=6 * 3600)
+    rh_in, ttf = compute_fr_implicit(temp, humidity, delta_t=6 * 3600)
+
+    assert np.all(np.isfinite(ttf))
+    assert np.all((rh_in > 0) & (rh_in < 1))
+    assert np.all((ttf > 2) & (ttf < 20))
+
+
+def test_implicit_batch_matches_single_zone(weather_data):
+    """Zones of a batched implicit run match single-zone runs."""
+    _, _, temp, humidity, _, _ = pp.preprocess(weather_data, delta_t=3600)
+    temps = np.stack([temp, temp + 5])
+    humidities = np.stack([humidity, np.clip(humidity + 10, 0, 100)])
+
+    _, ttf = compute_fr_implicit(temps, humidities)
+    for row in range(2):
+        _, ttf_single = compute_fr_implicit(temps[row], humidities[row])
+        np.testing.assert_allclose(ttf[row], ttf_single, rtol=1e-12)
+
+
+def test_compute_selects_solver_from_parameters(weather_data, monkeypatch):
+    """compute() and compute_batch() use the solver chosen in parameters."""
+    explicit = compute(weather_data)
+    monkeypatch.setattr(mp, "wall_solver", "implicit")
+    implicit = compute(weather_data)
+    batch = compute_batch([weather_data])
+
+    assert [r.timestamp for r in implicit.firerisks] == [
+        r.timestamp for r in explicit.firerisks
+    ]
+    ttf = np.array([r.ttf for r in implicit.firerisks])
+    ttf_explicit = np.array([r.ttf for r in explicit.firerisks])
+    assert not np.allclose(ttf, ttf_explicit, rtol=1e-9)
+    np.testing.assert_allclose(ttf, ttf_explicit, atol=0.2)
+    np.testing.assert_allclose(batch.ttf[0], ttf, rtol=1e-12)
+
+
+def test_hourly_output_of_other_implicit_steps(weather_data, monkeypatch):
+    """Steps dividing an hour keep the hourly output, others are rejected."""
+    monkeypatch.setattr(mp, "wall_solver", "implicit")
+    monkeypatch.setattr(mp, "implicit_delta_t", 1800)
+    half_hourly = compute(weather_data, horizon_hours=12)
+
+    assert [r.timestamp for r in half_hourly.firerisks] == [
+        p.timestamp for p in weather_data.data[:13]
+    ]
+    assert steps_per_hour(720) == 5
+    for step in (5400, 7200, 1000):
+        monkeypatch.setattr(mp, "implicit_delta_t", step)
+        with pytest.raises(ValueError, match="divide an hour"):
+            compute(weather_data, horizon_hours=12)
+
+
+def test_states_continue_across_solvers(weather_data):
+    """
+    An implicit state holds c_wall per explicit step, so that the explicit
+    scheme continues it like a state of its own.
+    """
+    explicit = compute(weather_data, kernel="vectorized", horizon_hours=48).state
+    implicit = compute(weather_data, kernel="implicit", horizon_hours=48).state
+
+    assert implicit.c_wall == pytest.approx(explicit.c_wall, rel=0.25)
+    continued = [
+        [
+            r.ttf
+            for r in compute(
+                weather_data, kernel="vectorized", initial_state=state, horizon_hours=24
+            ).firerisks
+        ]
+        for state in (explicit, implicit)
+    ]
+    np.testing.assert_allclose(continued[1], continued[0], atol=0.2)
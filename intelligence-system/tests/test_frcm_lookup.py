@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import frcm.fireriskmodel.parameters as mp
+from frcm.fireriskmodel import lookup as lk
+from frcm.fireriskmodel import preprocess as pp
+from frcm.fireriskmodel import utils as func
+from frcm.fireriskmodel.compute import (
+    compute_fr,
+    compute_fr_batch,
+    compute_fr_vectorized,
+    steps_per_hour,
+)
+from frcm.fireriskmodel.implicit import compute_fr_implicit
+from frcm.fireriskmodel.stream import compute_iter
+
+
+def test_table_errors_within_bounds():
+    """The tables stay within the documented interpolation error."""
+    errors = lk.table_errors(samples=200_001)
+
+    assert errors["calc_pwsat"].max_rel < 1e-7
+    assert errors["calc_rhwall"].max_abs < 3e-8
+    assert errors["calc_fmc"].max_abs < 3e-9
+
+
+@pytest.mark.parametrize(
+    "lookup, closed, x",
+    [
+        (
+            lk.lookup_pwsat,
+            func.calc_pwsat,
+            np.array([-75.0, -60.0, 3.3, 60.0, 70.0, np.nan]),
+        ),
+        (lk.lookup_rhwall, func.calc_rhwall, np.array([-1.0, 0.0, 80.0, 225.0, 300.0])),
+        (lk.lookup_fmc, func.calc_fmc, np.array([0.0, 0.35, 1.0, 1.2])),
+    ],
+)
+def test_lookup_matches_closed_form(lookup, closed, x):
+    """Small arrays, large arrays and scalars match the closed form, values
+    outside of the tables and NaN included."""
+    np.testing.assert_allclose(lookup(x), closed(x), rtol=1e-7, atol=1e-9)
+    large = np.repeat(x, lk.SMALL_ARRAY_SIZE)
+    np.testing.assert_allclose(lookup(large), closed(large), rtol=1e-7, atol=1e-9)
+    for value in x:
+        assert lookup(float(value)) == pytest.approx(
+            closed(value), rel=1e-7, abs=1e-9, nan_ok=True
+        )
+
+
+def test_lookup_forms_agree():
+    """Scalars, small and large arrays interpolate the same table."""
+    x = np.linspace(-59.0, 59.0, 1001)
+
+    large = lk.PWSAT_TABLE(x)
+    np.testing.assert_allclose(large, lk.PWSAT_TABLE.interpolate(x), rtol=1e-13)
+    assert [lk.PWSAT_TABLE(value) for value in x[:5]] == pytest.approx(
+        large[:5], rel=1e-13
+    )
+
+
+def test_every_kernel_uses_the_tables(weather_data):
+    """With the tables on, every kernel interpolates: the results stay within
+    the table error of the closed forms and do not depend on the zone count."""
+    _, _, temp, humidity, _, _ = pp.preprocess(weather_data)
+    zones = lk.SMALL_ARRAY_SIZE + 1
+
+    _, ttf_closed = compute_fr(temp, humidity)
+    _, ttf_reference = compute_fr(temp, humidity, lookup=True)
+    _, ttf_vectorized = compute_fr_vectorized(temp, humidity, lookup=True)
+    _, ttf_single = compute_fr_batch(temp[None], humidity[None], lookup=True)
+    _, ttf_zones = compute_fr_batch(
+        np.tile(temp, (zones, 1)), np.tile(humidity, (zones, 1)), lookup=True
+    )
+
+    assert not np.array_equal(ttf_reference, ttf_closed)
+    np.testing.assert_allclose(ttf_reference, ttf_closed, rtol=1e-6)
+    np.testing.assert_allclose(ttf_vectorized, ttf_reference, rtol=1e-9)
+    for ttf in (ttf_single[0], ttf_zones[0]):
+        np.testing.assert_allclose(ttf, ttf_vectorized, rtol=1e-12)
+
+
+def test_lookup_keeps_float32():
+    """Reduced precision arrays are not promoted by the tables."""
+    surface = np.array([60.0, 80.0], dtype=np.float32)
+
+    assert lk.lookup_rhwall(surface).dtype == np.float32
+
+
+def test_implicit_and_streaming_use_the_tables(weather_data):
+    """The implicit solver and the streaming stepper interpolate as well."""
+    _, _, temp, humidity, _, _ = pp.preprocess(weather_data)
+    _, ttf_vectorized = compute_fr_vectorized(temp, humidity, lookup=True)
+    hourly = slice(None, None, steps_per_hour(mp.delta_t))
+
+    _, ttf_closed = compute_fr_implicit(temp[hourly], humidity[hourly], delta_t=3600)
+    _, ttf_implicit = compute_fr_implicit(
+        temp[hourly], humidity[hourly], delta_t=3600, lookup=True
+    )
+    streamed = [ttf for _, ttf, _ in compute_iter(weather_data.data, lookup=True)]
+
+    assert not np.array_equal(ttf_implicit, ttf_closed)
+    np.testing.assert_allclose(ttf_implicit, ttf_closed, rtol=1e-6)
+    np.testing.assert_allclose(streamed, ttf_vectorized[hourly], rtol=1e-12)
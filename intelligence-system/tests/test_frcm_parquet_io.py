@@ -0,0 +1,118 @@
+import sys
+
+import numpy as np
+import pytest
+
+from frcm import console_main
+from frcm.datamodel import model as dm
+from frcm.datamodel import parquet_io
+from frcm.fireriskmodel.compute import compute, compute_batch
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def assert_same_columns(actual, expected):
+    for a, e in zip(actual.columns(), expected.columns()):
+        assert np.array_equal(a, e, equal_nan=True)
+    assert actual.utc == expected.utc
+
+
+def test_weather_round_trip_in_row_groups(tmp_path, weather_data):
+    """Row groups are streamed one by one, reading only the weather columns."""
+    file = tmp_path / "weather.parquet"
+    parquet_io.write_weather(weather_data, file, row_group_rows=10)
+
+    chunks = list(parquet_io.iter_weather(file))
+
+    expected = dm.ColumnarWeatherData.from_weather_data(weather_data)
+    assert pq.ParquetFile(file).num_row_groups == len(chunks) > 1
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert_same_columns(parquet_io.read_weather(file), expected)
+    assert np.array_equal(
+        np.concatenate([chunk.temperature for chunk in chunks]), expected.temperature
+    )
+
+
+def test_column_projection_and_nulls(tmp_path):
+    """Extra columns are skipped, nulls read as NaN, missing columns raise."""
+    file = tmp_path / "weather.parquet"
+    timestamp = np.array(["2024-01-01T00:00", "2024-01-01T01:00"], "datetime64[us]")
+    table = pa.table(
+        {
+            "station": ["a", "b"],
+            "timestamp": pa.array(timestamp, pa.timestamp("ms")),
+            "temperature": [1.5, None],
+            "humidity": [80.0, 81.0],
+            "wind_speed": [2.0, 3.0],
+        }
+    )
+    pq.write_table(table, file)
+
+    wd = parquet_io.read_weather(file)
+
+    assert np.array_equal(wd.timestamp, timestamp)
+    assert not wd.utc
+    assert wd.temperature[0] == 1.5 and np.isnan(wd.temperature[1])
+    (chunk,) = parquet_io.iter_columns(file, ["humidity"])
+    assert set(chunk) == {"timestamp", "humidity", "utc"}
+
+    pq.write_table(table.drop(["wind_speed"]), file)
+    with pytest.raises(ValueError, match="wind_speed"):
+        parquet_io.read_weather(file)
+
+
+def test_fire_risk_round_trip(tmp_path, weather_data):
+    risks = compute(weather_data)
+    file = tmp_path / "risks.parquet"
+
+    parquet_io.write_fire_risks(risks, file)
+
+    assert parquet_io.read_fire_risks(file).firerisks == risks.firerisks
+
+
+def test_zones_partitioned_by_geohash(tmp_path, weather_data):
+    """Zones written for a batch are read back for compute_batch and its results."""
+    zones = {
+        geohash: weather_data.model_copy(
+            update={
+                "data": [
+                    p.model_copy(update={"temperature": p.temperature + i})
+                    for p in weather_data.data
+                ]
+            }
+        )
+        for i, geohash in enumerate(["u4pru", "u4prv", "u4pry"])
+    }
+    parquet_io.write_weather_zones(tmp_path / "weather", zones)
+
+    read = parquet_io.read_weather_zones(tmp_path / "weather")
+    batch = compute_batch(list(read.values()))
+    parquet_io.write_risk_zones(tmp_path / "risks", list(read), batch)
+
+    assert list(read) == sorted(zones)
+    assert (tmp_path / "weather" / "geohash=u4prv" / "part-0.parquet").is_file()
+    assert_same_columns(
+        read["u4prv"], dm.ColumnarWeatherData.from_weather_data(zones["u4prv"])
+    )
+    risks = parquet_io.read_risk_zones(tmp_path / "risks", ["u4pry", "u4pru"])
+    assert list(risks) == ["u4pry", "u4pru"]
+    assert risks["u4pru"].firerisks == batch.prediction(0).firerisks
+    # the hive layout is one dataset for analysis tools
+    dataset = pa.dataset.dataset(tmp_path / "risks", partitioning="hive")
+    assert dataset.to_table().num_rows == batch.ttf.size
+    with pytest.raises(ValueError, match="u4prz"):
+        parquet_io.read_risk_zones(tmp_path / "risks", ["u4prz"])
+
+
+def test_console_reads_and_writes_parquet(tmp_path, weather_data, monkeypatch):
+    source = tmp_path / "station.parquet"
+    parquet_io.write_weather(weather_data, source)
+    output = tmp_path / "risks.parquet"
+    monkeypatch.setattr(sys, "argv", ["frcm", str(source), str(output)])
+
+    console_main()
+
+    assert parquet_io.read_fire_risks(output).firerisks == (
+        compute(weather_data).firerisks
+    )
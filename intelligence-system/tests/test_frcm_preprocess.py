@@ -0,0 +1,89 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import frcm.fireriskmodel.preprocess as pp
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel.golden import synthetic_corpus
+
+
+def legacy_preprocess(wd, horizon_hours=None, start_time=None, delta_t=720):
+    """The original list based preprocessing, as reference for the bit pattern."""
+    sorted_data = sorted(wd.data, key=lambda x: x.timestamp)
+    if start_time is None:
+        start_time = sorted_data[0].timestamp
+    if horizon_hours is not None:
+        sorted_data = pp.truncate_to_horizon(sorted_data, horizon_hours, start_time)
+    time_sec = [
+        round((t - start_time).total_seconds())
+        for t in pp.extract_variable(sorted_data, "timestamp")
+    ]
+    cleaned = [
+        pp.clean_nan(pp.extract_variable(sorted_data, name), time_sec)
+        for name in pp.VARIABLES
+    ]
+    end = time_sec[-1]
+    if horizon_hours is not None:
+        end = min(end, round(horizon_hours * 3600))
+    axis = list(range(0, end + 1, delta_t))
+    gap = pp.find_data_gap(cleaned[0][1], cleaned[1][1])
+    return (
+        start_time,
+        axis,
+        *(np.interp(axis, times, data) for data, times in cleaned),
+        gap,
+    )
+
+
+@pytest.mark.parametrize("name", sorted(synthetic_corpus()))
+def test_preprocess_is_bit_compatible(name):
+    """Both representations give exactly the output of the list based code."""
+    wd = synthetic_corpus()[name]
+    columns = dm.ColumnarWeatherData.from_weather_data(wd)
+    start = wd.data[0].timestamp + datetime.timedelta(minutes=30)
+
+    for kwargs in ({}, {"horizon_hours": 5}, {"start_time": start, "delta_t": 3600}):
+        expected = legacy_preprocess(wd, **kwargs)
+        for data in (wd, columns):
+            result = pp.preprocess(data, **kwargs)
+            assert result.start_time == expected[0]
+            assert result.time_sec.tolist() == expected[1]
+            for got, want in zip(result[2:5], expected[2:5]):
+                np.testing.assert_array_equal(got, want)
+            assert result.max_time_delta == expected[5]
+
+
+def test_only_requested_variables_are_interpolated(weather_data):
+    """The kernels' variables equal the full preprocessing, the rest is None."""
+    full = pp.preprocess(weather_data)
+    kernel = pp.preprocess(weather_data, variables=pp.KERNEL_VARIABLES)
+
+    assert kernel.wind_speed is None
+    np.testing.assert_array_equal(kernel.temperature, full.temperature)
+    np.testing.assert_array_equal(kernel.humidity, full.humidity)
+    assert kernel.max_time_delta == full.max_time_delta
+
+
+def test_gap_validity_flag():
+    """A gap in the temperature or humidity data beyond the limit is flagged."""
+    start = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+    humidity = [60.0, np.nan, np.nan, np.nan, 60.0]
+    wd = dm.ColumnarWeatherData(
+        timestamp=[start + datetime.timedelta(hours=3 * h) for h in range(5)],
+        temperature=[5.0] * 5,
+        humidity=humidity,
+        wind_speed=[np.nan] * 5,
+    )
+
+    result = pp.preprocess(wd, variables=pp.KERNEL_VARIABLES)
+
+    assert result.max_time_delta == 12 * 3600
+    assert not result.gaps_valid()
+    assert result.gaps_valid(max_gap=12 * 3600)
+    assert pp.preprocess(
+        wd, horizon_hours=3, variables=pp.KERNEL_VARIABLES
+    ).gaps_valid()
+    # the missing wind speed only matters if it is requested
+    with pytest.raises(ValueError):
+        pp.preprocess(wd)
@@ -0,0 +1,75 @@
+import asyncio
+
+from frcm.fireriskmodel.compute import compute, compute_batch
+from frcm.profiling import Profiler, profile, stage
+
+
+def test_stages_are_not_recorded_without_profiler(weather_data):
+    """Without an active profiler the hooks are shared no-ops."""
+    assert stage("kernel") is stage("preprocess.sort", size=10)
+
+    profiler = Profiler()
+    compute(weather_data)
+
+    assert profiler.stages == {}
+
+
+def test_profile_records_compute_stages(weather_data):
+    """Wall time, calls and sizes are recorded for every stage of compute()."""
+    with profile() as profiler:
+        prediction = compute(weather_data, kernel="vectorized")
+        compute_batch([weather_data, weather_data], kernel="batched")
+
+    stages = profiler.stages
+    assert set(stages) == {
+        "preprocess.sort",
+        "preprocess.interpolate",
+        "kernel",
+        "firerisks",
+    }
+    assert stages["preprocess.sort"].calls == 3
+    assert stages["preprocess.sort"].max_size == len(weather_data.data)
+    assert stages["kernel"].calls == 2
+    steps = (len(weather_data.data) - 1) * 5 + 1
+    assert stages["kernel"].size == steps + 2 * steps
+    assert stages["kernel"].max_size == 2 * steps
+    assert stages["firerisks"].max_size == 2 * steps
+    assert len(prediction.firerisks) == len(weather_data.data)
+    assert all(s.seconds > 0 for s in stages.values())
+
+    # the profiler is deactivated after the block
+    compute(weather_data)
+    assert stages["kernel"].calls == 2
+
+
+def test_profiler_metrics_and_callback():
+    """Measurements are flattened to metric names and passed to the callback."""
+    recorded = []
+    profiler = Profiler(callback=lambda *args: recorded.append(args))
+
+    with profile(profiler):
+        with stage("transform.parse", size=3):
+            pass
+
+    metrics = profiler.metrics()
+    assert metrics["frcm_transform_parse_calls"] == 1
+    assert metrics["frcm_transform_parse_size"] == 3
+    assert metrics["frcm_transform_parse_seconds"] >= 0
+    assert [name for name, _, _ in recorded] == ["transform.parse"]
+    assert "transform.parse" in profiler.format()
+
+
+def test_profile_follows_into_worker_threads(weather_data):
+    """Stages run via asyncio.to_thread are recorded by the active profiler."""
+
+    async def run():
+        with profile() as profiler:
+            await asyncio.gather(
+                asyncio.to_thread(compute, weather_data),
+                asyncio.to_thread(compute, weather_data),
+            )
+        return profiler
+
+    profiler = asyncio.run(run())
+
+    assert profiler.stages["kernel"].calls == 2
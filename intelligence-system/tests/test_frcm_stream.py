@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import frcm.fireriskmodel.parameters as mp
+from frcm.datamodel import model as dm
+from frcm.fireriskmodel import stream
+from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel.stream import compute_iter
+
+
+def test_compute_iter_matches_compute(weather_data):
+    """Streaming yields the hourly risks of compute(), NaN gaps included."""
+    weather_data.data[0].humidity = float("nan")
+    weather_data.data[5].temperature = float("nan")
+    weather_data.data[-1].temperature = float("nan")
+    reference = compute(weather_data)
+
+    streamed = list(compute_iter(iter(weather_data.data)))
+
+    assert [ts for ts, _, _ in streamed] == [r.timestamp for r in reference.firerisks]
+    np.testing.assert_allclose(
+        [ttf for _, ttf, _ in streamed],
+        [r.ttf for r in reference.firerisks],
+        rtol=1e-12,
+    )
+
+
+def test_compute_iter_requires_sorted_data(weather_data):
+    """Out of order data points cannot be streamed."""
+    points = weather_data.data[:10]
+    points[3], points[4] = points[4], points[3]
+
+    with pytest.raises(ValueError):
+        list(compute_iter(points))
+
+
+def test_compute_iter_streams_coarse_data(weather_data):
+    """Data points further apart than max_data_gap are interpolated as by
+    compute()."""
+    points = weather_data.data[::12]
+    assert (points[1].timestamp - points[0].timestamp).total_seconds() > (
+        mp.max_data_gap
+    )
+    reference = compute(dm.WeatherData(data=points))
+
+    streamed = list(compute_iter(points))
+
+    assert [ts for ts, _, _ in streamed] == [r.timestamp for r in reference.firerisks]
+    assert [ttf for _, ttf, _ in streamed] == pytest.approx(
+        [r.ttf for r in reference.firerisks], rel=1e-12
+    )
+
+
+def test_compute_iter_bounds_its_buffer(weather_data, monkeypatch):
+    """A variable is buffered over a run of NaN values of the other one up to
+    MAX_BUFFERED_POINTS data points, a longer run raises."""
+    monkeypatch.setattr(stream, "MAX_BUFFERED_POINTS", 20)
+    points = weather_data.data[:48]
+    for point in points[10:25]:
+        point.humidity = float("nan")
+    reference = compute(dm.WeatherData(data=points))
+
+    streamed = list(compute_iter(points))
+
+    assert [ttf for _, ttf, _ in streamed] == pytest.approx(
+        [r.ttf for r in reference.firerisks], rel=1e-12
+    )
+
+    for point in points[25:35]:
+        point.humidity = float("nan")
+    with pytest.raises(ValueError, match="in a row"):
+        list(compute_iter(points))
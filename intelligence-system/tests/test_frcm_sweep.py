@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from frcm.fireriskmodel import parameters as mp
+from frcm.fireriskmodel.compute import compute
+from frcm.fireriskmodel.sweep import sweep
+
+
+def test_default_parameter_set_matches_module(weather_data):
+    """A ParameterSet with the defaults reproduces the module parameters."""
+    reference = compute(weather_data)
+    injected = compute(weather_data, params=mp.ParameterSet())
+
+    for ref, inj in zip(reference.firerisks, injected.firerisks):
+        assert inj.timestamp == ref.timestamp
+        assert np.isclose(inj.ttf, ref.ttf, rtol=1e-9)
+
+
+def test_sweep_matches_single_runs(weather_data):
+    """Every row of a sweep matches compute() with that combination."""
+    grid = mp.ParameterSet.grid(
+        A_ex=[40, 60], gamma=[200, 380], panel_thickness=[0.012, 0.015]
+    )
+    result = sweep(weather_data, grid)
+
+    assert result.ttf.shape == (8, len(weather_data.data))
+    for row in range(len(grid)):
+        single = mp.ParameterSet(
+            A_ex=grid.A_ex[row],
+            gamma=grid.gamma[row],
+            panel_thickness=grid.panel_thickness[row],
+        )
+        prediction = compute(weather_data, params=single)
+        np.testing.assert_allclose(
+            result.ttf[row], [r.ttf for r in prediction.firerisks], rtol=1e-9
+        )
+        assert result.states[row].wall == pytest.approx(prediction.state.wall)
+
+
+def test_parameter_grid_rejects_unknown_parameters():
+    """Only the building parameters can be swept."""
+    with pytest.raises(ValueError):
+        mp.ParameterSet.grid(delta_t=[360, 720])
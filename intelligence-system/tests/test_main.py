@@ -5,6 +5,7 @@ from unittest.mock import AsyncMock, patch
 import pytest
 
 from db.database import MonitoredZone
+from frcm.profiling import stage
 from main import job, process_instant_queue
 
 
@@ -46,8 +47,13 @@ async def test_job_cycle(mock_db_session):
     with (
         patch("db.database.AsyncSessionLocal", return_value=mock_db_session),
         patch("main.get_monitored_zones", return_value=[mock_zone]),
+        patch("main.redis_client", AsyncMock()),
         patch("services.zone_processor.fetch_weather", return_value=mock_met_data),
-        patch("services.zone_processor.calculate_risk", return_value=mock_risk_result),
+        patch(
+            "services.zone_processor.calculate_risk_batch",
+            return_value=[mock_risk_result],
+        ),
+        patch("services.zone_processor.settings.FRCM_ARCHETYPES_ENABLED", False),
     ):
         await job()
 
@@ -90,3 +96,45 @@ async def test_process_instant_queue_success():
         mock_redis.publish.assert_called_with(
             "location_updates:u4p9x", json.dumps(risk_data)
         )
+
+
+@pytest.mark.asyncio
+async def test_job_publishes_profile():
+    """With FRCM_PROFILE the stage timings of the cycle are stored in Redis."""
+    mock_redis = AsyncMock()
+
+    async def fake_process_zones(zones, semaphore):
+        with stage("kernel", size=10):
+            pass
+
+    with (
+        patch("main.settings.FRCM_PROFILE", True),
+        patch("main.redis_client", mock_redis),
+        patch("main.get_monitored_zones", return_value=[]),
+        patch("main.process_zones", side_effect=fake_process_zones),
+    ):
+        await job()
+
+    hashes = {
+        call.args[0]: call.kwargs["mapping"] for call in mock_redis.hset.mock_calls
+    }
+    metrics = hashes["metrics:frcm_profile"]
+    assert metrics["frcm_kernel_calls"] == 1
+    assert metrics["frcm_kernel_size"] == 10
+
+
+@pytest.mark.asyncio
+async def test_job_publishes_cache_metrics():
+    """The counters of the result cache are stored in Redis every cycle."""
+    mock_redis = AsyncMock()
+
+    with (
+        patch("main.redis_client", mock_redis),
+        patch("main.get_monitored_zones", return_value=[]),
+        patch("main.process_zones", return_value=[]),
+    ):
+        await job()
+
+    mock_redis.hset.assert_called_once()
+    assert mock_redis.hset.call_args.args == ("metrics:frcm_cache",)
+    assert "frcm_cache_hit_rate" in mock_redis.hset.call_args.kwargs["mapping"]
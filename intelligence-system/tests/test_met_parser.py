@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+import pytest
+from test_fire_risk_service import make_met_json
+
+from frcm.datamodel import model as dm
+from utils.fire_risk_service import calculate_risk
+from utils.met_parser import (
+    benchmark,
+    parse_met_payload,
+    parse_timestamps,
+    synthetic_payload,
+    transform_met_data_to_model,
+)
+
+
+def assert_same_weather(result, expected):
+    assert isinstance(result, dm.ColumnarWeatherData)
+    assert result.utc
+    np.testing.assert_array_equal(result.timestamp, expected.timestamp)
+    np.testing.assert_array_equal(result.temperature, expected.temperature)
+    np.testing.assert_array_equal(result.humidity, expected.humidity)
+    np.testing.assert_array_equal(result.wind_speed, expected.wind_speed)
+
+
+@pytest.mark.parametrize("horizon_hours", [None, 0, 1, 6, 100, 1000])
+def test_parse_matches_transform(horizon_hours):
+    """The columns equal those of the WeatherData of the current transformer."""
+    payload = synthetic_payload(seed=3)
+
+    result = parse_met_payload(payload, horizon_hours=horizon_hours)
+
+    expected = dm.ColumnarWeatherData.from_weather_data(
+        transform_met_data_to_model(payload, horizon_hours=horizon_hours)
+    )
+    assert_same_weather(result, expected)
+
+
+@pytest.mark.parametrize("horizon_hours", [None, 0, 1, 6, 100])
+def test_parse_matches_transform_with_offsets(horizon_hours):
+    """Timestamps with UTC offsets take the slow path, with the same result."""
+    payload = synthetic_payload(seed=4)
+    for entry in payload["properties"]["timeseries"]:
+        entry["time"] = entry["time"].replace("Z", "+00:00")
+
+    result = parse_met_payload(payload, horizon_hours=horizon_hours)
+
+    expected = dm.ColumnarWeatherData.from_weather_data(
+        transform_met_data_to_model(payload, horizon_hours=horizon_hours)
+    )
+    assert_same_weather(result, expected)
+
+
+def test_parse_raw_body():
+    """Response bodies are decoded, as bytes or text."""
+    payload = synthetic_payload(seed=1)
+    body = json.dumps(payload)
+
+    expected = parse_met_payload(payload, horizon_hours=12)
+    assert_same_weather(parse_met_payload(body.encode(), horizon_hours=12), expected)
+    assert_same_weather(parse_met_payload(body, horizon_hours=12), expected)
+
+
+def test_parse_timestamps_with_offsets():
+    """Timestamps with UTC offsets instead of 'Z' are converted to UTC."""
+    result = parse_timestamps(["2024-05-01T02:00:00+02:00", "2024-05-01T01:00:00Z"])
+
+    np.testing.assert_array_equal(
+        result, np.array(["2024-05-01T00:00", "2024-05-01T01:00"], "datetime64[us]")
+    )
+
+
+def test_missing_values():
+    """Missing temperatures and humidities are NaN, missing wind speeds 0."""
+    payload = make_met_json(4, 10.0, 60.0)
+    details = [
+        e["data"]["instant"]["details"] for e in payload["properties"]["timeseries"]
+    ]
+    del details[1]["air_temperature"]
+    details[2]["relative_humidity"] = None
+    del details[3]["wind_speed"]
+
+    result = parse_met_payload(payload)
+
+    assert np.isnan(result.temperature[1])
+    assert np.isnan(result.humidity[2])
+    assert list(result.wind_speed) == [2.0, 2.0, 2.0, 0.0]
+
+
+def test_invalid_payload():
+    with pytest.raises(KeyError):
+        parse_met_payload({"invalid": "payload"})
+
+
+def test_calculate_risk_unchanged():
+    """The risk equals the calculation from the transformed WeatherData."""
+    payload = synthetic_payload(seed=5)
+
+    result = calculate_risk(payload, spinup_hours=6)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(
+            "utils.fire_risk_service.parse_met_payload", transform_met_data_to_model
+        )
+        expected = calculate_risk(payload, spinup_hours=6)
+    assert result["timestamp"] == expected["timestamp"]
+    assert result["ttf"] == pytest.approx(expected["ttf"], rel=1e-12)
+
+
+def test_benchmark_reports_both_methods():
+    timings = benchmark([json.dumps(synthetic_payload()).encode()], repeat=1)
+
+    assert len(timings) >= 2
+    assert all(seconds > 0 for seconds in timings.values())
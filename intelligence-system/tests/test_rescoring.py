@@ -0,0 +1,157 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.sql import Select
+
+from db.database import CurrentArchetypeFireRisk, FireRiskReading
+from services.rescoring import (
+    RescoreProgress,
+    load_progress,
+    rescore_rows,
+    rescore_table,
+    rescore_tables,
+    scale_key,
+)
+from utils.fire_risk_service import RiskScale
+
+SCALE = RiskScale(
+    ttf_minutes=(0.0, 10.0),
+    scores=(100.0, 0.0),
+    categories=("High", "Low"),
+    category_ttf_minutes=(5.0,),
+)
+
+
+class FakeRedis:
+    """The hash commands of the async Redis client, backed by a dict."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    async def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = value.encode()
+
+
+def fake_sessions(chunks):
+    """
+    A session factory whose SELECTs return the given chunks in turn.
+
+    Returns:
+        The factory, the executed SELECTs, the parameters of the UPDATEs and
+        the commit mock.
+    """
+    chunks = list(chunks)
+    selects, updates = [], []
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=None)
+    session.commit = AsyncMock()
+
+    async def execute(statement, params=None):
+        result = MagicMock()
+        if isinstance(statement, Select):
+            selects.append(statement)
+            result.all.return_value = chunks.pop(0) if chunks else []
+        else:
+            updates.append(params)
+        return result
+
+    session.execute = AsyncMock(side_effect=execute)
+    return (lambda: session), selects, updates, session.commit
+
+
+def test_rescore_rows_returns_changed_rows():
+    """Only rows whose score or category changes are updated."""
+    rows = [
+        (1, 2.0, 80.0, "High"),  # unchanged
+        (2, 2.0, 70.0, "High"),  # score changed
+        (3, 8.0, 20.0, "High"),  # category changed
+        (4, 8.0, None, None),  # never scored
+    ]
+
+    updates = rescore_rows(rows, SCALE)
+
+    assert updates == [
+        {"pk_0": 2, "old_ttf": 2.0, "new_score": 80.0, "new_category": "High"},
+        {"pk_0": 3, "old_ttf": 8.0, "new_score": 20.0, "new_category": "Low"},
+        {"pk_0": 4, "old_ttf": 8.0, "new_score": 20.0, "new_category": "Low"},
+    ]
+    assert rescore_rows([], SCALE) == []
+
+
+@pytest.mark.asyncio
+async def test_rescore_table_in_chunks():
+    """Every chunk is updated and committed on its own, the progress stored."""
+    factory, selects, updates, commit = fake_sessions(
+        [[(1, 2.0, 0.0, "Low"), (2, 20.0, 0.0, "Low")], [(5, 4.0, 0.0, "Low")]]
+    )
+    redis = FakeRedis()
+    progress = RescoreProgress(table="fire_risk_readings", scale=scale_key(SCALE))
+
+    result = await rescore_table(
+        FireRiskReading, SCALE, progress, factory, redis=redis, chunk_size=2
+    )
+
+    assert len(selects) == 2
+    assert "fire_risk_readings.id > " not in str(selects[0])
+    assert "(fire_risk_readings.id) > " in str(selects[1])
+    assert [[row["pk_0"] for row in chunk] for chunk in updates] == [[1], [5]]
+    assert commit.await_count == 2
+    assert result.done
+    assert result.last_key == [5]
+    assert (result.rows_read, result.rows_updated) == (3, 2)
+    stored = redis.hashes["jobs:risk_rescore"]["fire_risk_readings"]
+    assert json.loads(stored)["last_key"] == [5]
+
+
+@pytest.mark.asyncio
+async def test_rescore_composite_primary_key():
+    """Tables keyed by several columns are paged by the tuple of them."""
+    factory, selects, updates, _ = fake_sessions([[("u4p9x", "cabin", 2.0, 0.0, "")]])
+    progress = RescoreProgress(
+        table="current_archetype_fire_risks",
+        scale=scale_key(SCALE),
+        last_key=["u4p9w", "cabin"],
+    )
+
+    await rescore_table(CurrentArchetypeFireRisk, SCALE, progress, factory)
+
+    assert "(current_archetype_fire_risks.geohash, " in str(selects[0])
+    assert updates[0][0]["pk_0"] == "u4p9x"
+    assert updates[0][0]["pk_1"] == "cabin"
+    assert progress.last_key == ["u4p9x", "cabin"]
+
+
+@pytest.mark.asyncio
+async def test_progress_is_resumed_for_the_same_scale():
+    """A stored progress is continued unless the scale changed or on restart."""
+    redis = FakeRedis()
+    stored = RescoreProgress(
+        table="fire_risk_readings", scale=scale_key(SCALE), last_key=[7], done=True
+    )
+    redis.hashes["jobs:risk_rescore"] = {
+        "fire_risk_readings": json.dumps(stored.__dict__).encode()
+    }
+
+    assert await load_progress(redis, "fire_risk_readings", SCALE) == stored
+    other = RiskScale.from_settings()
+    assert (await load_progress(redis, "fire_risk_readings", other)).last_key is None
+
+    factory, selects, _, _ = fake_sessions([])
+    await rescore_tables(
+        ["fire_risk_readings"], scale=SCALE, session_factory=factory, redis=redis
+    )
+    assert selects == []
+
+    await rescore_tables(
+        ["fire_risk_readings"],
+        scale=SCALE,
+        session_factory=factory,
+        redis=redis,
+        restart=True,
+    )
+    assert len(selects) == 1
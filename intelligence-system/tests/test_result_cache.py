@@ -0,0 +1,118 @@
+import datetime
+
+import numpy as np
+import pytest
+from test_fire_risk_service import make_met_json
+
+from frcm.fireriskmodel import parameters as mp
+from services.result_cache import ResultCache, content_key
+from utils.fire_risk_service import calculate_risk, risk_cache_key
+
+
+class FakeRedis:
+    """The part of the async Redis client used by the cache, backed by a dict."""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+
+    async def execute(self):
+        for key, value, ex in self.commands:
+            self.redis.values[key] = value.encode()
+            self.redis.expiry[key] = ex
+
+
+def test_content_key_depends_on_all_inputs():
+    """Equal inputs give equal keys, any difference a different key."""
+    arrays = (np.arange(4.0), np.ones(4))
+    state = calculate_risk(make_met_json(48, 10.0, 60.0))["state"]
+
+    assert content_key("risk", arrays, 1) == content_key("risk", arrays, 1)
+    assert content_key("risk", arrays, 1) != content_key("risk", arrays, 2)
+    assert content_key("risk", arrays, None) != content_key("risk", arrays, state)
+    assert content_key(arrays) != content_key((arrays[0], arrays[1] * 2))
+    assert content_key(1) != content_key(1.0) != content_key("1")
+
+
+def test_risk_key_covers_the_simulated_window(monkeypatch):
+    """Forecasts differing only after the spin-up window share their key."""
+    short = make_met_json(4, 10.0, 60.0)
+    long = make_met_json(48, 10.0, 60.0)
+    other = make_met_json(48, 12.0, 60.0)
+
+    assert risk_cache_key(short, spinup_hours=1) == risk_cache_key(long, spinup_hours=1)
+    assert risk_cache_key(long, spinup_hours=1) != risk_cache_key(other, spinup_hours=1)
+    assert risk_cache_key(long, spinup_hours=6) != risk_cache_key(short, spinup_hours=6)
+    assert risk_cache_key({"invalid": "payload"}) is None
+
+    key = risk_cache_key(long)
+    monkeypatch.setattr(mp, "gamma", 200)
+    assert risk_cache_key(long) != key
+
+
+def test_lru_eviction():
+    """The least recently used entries are evicted beyond the size limit."""
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_between_workers():
+    """A result stored by one worker is a hit for another one."""
+    redis = FakeRedis()
+    first = ResultCache(redis=redis, ttl_seconds=60)
+    second = ResultCache(redis=redis)
+    result = calculate_risk(make_met_json(48, 10.0, 60.0))
+
+    assert await first.get_many(["k"]) == [None]
+    await first.put_many({"k": result})
+    (cached,) = await second.get_many(["k"])
+
+    assert cached == result
+    assert isinstance(cached["timestamp"], datetime.datetime)
+    assert redis.expiry["frcm:result:k"] == 60
+    assert second.stats.redis_hits == 1
+    assert second.get("k") == result
+
+
+@pytest.mark.asyncio
+async def test_hit_rate_metrics():
+    """Hits, duplicates within a lookup and misses are counted."""
+    cache = ResultCache()
+    cache.put("a", 1)
+
+    assert await cache.get_many(["a", "b", "b", None]) == [1, None, None, None]
+
+    metrics = cache.metrics()
+    assert metrics["frcm_cache_hits"] == 1
+    assert metrics["frcm_cache_duplicates"] == 1
+    assert metrics["frcm_cache_misses"] == 1
+    assert metrics["frcm_cache_hit_rate"] == pytest.approx(2 / 3)
@@ -0,0 +1,143 @@
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import pytest
+from test_fire_risk_service import make_met_json
+
+from services.compute_pool import ComputePool
+from services.shared_batch import (
+    SharedWeatherBatch,
+    calculate_risk_shared,
+    compute_rows,
+)
+from utils.fire_risk_service import calculate_risk, calculate_risk_batch
+
+
+def cycle_inputs():
+    """
+    MET payloads and stored states of a cycle with cold, warm (one with a state
+    of its first forecast hour) and broken zones.
+    """
+    state = calculate_risk(make_met_json(48, 10.0, 60.0), spinup_hours=1)["state"]
+    met_jsons = [
+        make_met_json(48, 10.0, 60.0),
+        make_met_json(48, 15.0, 30.0, start_hour=3),
+        {"invalid": "payload"},
+        make_met_json(24, 5.0, 90.0),
+        make_met_json(48, 10.0, 60.0, start_hour=3),
+        make_met_json(48, 12.0, 50.0, start_hour=1),
+    ]
+    initial_states = [None, state, None, None, state, state]
+    return met_jsons, initial_states
+
+
+def assert_same_results(results, expected):
+    assert len(results) == len(expected)
+    for result, reference in zip(results, expected):
+        if reference is None:
+            assert result is None
+            continue
+        assert result["timestamp"] == reference["timestamp"]
+        assert result["ttf"] == pytest.approx(reference["ttf"], rel=1e-12)
+        assert result["state"].timestamp == reference["state"].timestamp
+        assert result["state"].wall == pytest.approx(reference["state"].wall)
+        assert result["state"].rh_in == pytest.approx(reference["state"].rh_in)
+        assert result.keys() == reference.keys()
+        if "archetypes" in reference:
+            assert result["archetypes"] == pytest.approx(
+                reference["archetypes"], rel=1e-12
+            )
+
+
+def test_batch_is_shared_between_views():
+    """An attached batch reads and writes the block of its creator in place."""
+    met_jsons, initial_states = cycle_inputs()
+    batch = SharedWeatherBatch.from_met(met_jsons, initial_states, spinup_hours=6)
+    attached = SharedWeatherBatch.attach(batch.spec)
+    try:
+        assert list(attached.length) == [7, 7, 0, 7, 7, 7]
+        assert attached.temperature[1, 0] == 15.0
+        assert attached.state[1, -2] == initial_states[1].rh_in
+
+        attached.ttf[0] = 42.0
+        assert batch.ttf[0] == 42.0
+    finally:
+        attached.close()
+        batch.close()
+        batch.unlink()
+
+
+def test_compute_rows_matches_calculate_risk_batch():
+    """Row ranges computed in place equal the batched calculation of the JSON."""
+    met_jsons, initial_states = cycle_inputs()
+    batch = SharedWeatherBatch.from_met(
+        met_jsons, initial_states, spinup_hours=1, archetypes=True
+    )
+    try:
+        assert compute_rows(batch.spec, 0, 2) == 2
+        assert compute_rows(batch.spec, 2, 6) == 3
+        results = batch.results()
+    finally:
+        batch.close()
+        batch.unlink()
+
+    assert_same_results(
+        results,
+        calculate_risk_batch(met_jsons, initial_states=initial_states, archetypes=True),
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_read_shared_batch():
+    """Worker processes compute the shared batch, which is freed afterwards."""
+    pool = ComputePool(workers=2)
+    met_jsons, initial_states = cycle_inputs()
+    try:
+        results = await calculate_risk_shared(pool, met_jsons, initial_states)
+    finally:
+        pool.shutdown()
+
+    assert_same_results(
+        results, calculate_risk_batch(met_jsons, initial_states=initial_states)
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_batch_is_unlinked(monkeypatch):
+    """The block does not outlive the calculation."""
+    names = []
+    create = SharedWeatherBatch.create
+
+    def spy(*args, **kwargs):
+        batch = create(*args, **kwargs)
+        names.append(batch.spec.name)
+        return batch
+
+    monkeypatch.setattr(SharedWeatherBatch, "create", spy)
+    await calculate_risk_shared(ComputePool(workers=0), *cycle_inputs())
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=names[0])
+
+
+class DyingPool(ComputePool):
+    """A pool whose worker of the first range dies after writing its rows."""
+
+    async def run(self, fn, *args, **kwargs):
+        result = fn(*args, **kwargs)
+        if args[1] == 0:
+            raise BrokenProcessPool("worker died")
+        return result
+
+
+@pytest.mark.asyncio
+async def test_dead_worker_fails_only_its_zones():
+    met_jsons, initial_states = cycle_inputs()
+
+    results = await calculate_risk_shared(
+        DyingPool(workers=2), met_jsons, initial_states
+    )
+
+    expected = calculate_risk_batch(met_jsons, initial_states=initial_states)
+    assert results[:3] == [None] * 3
+    assert_same_results(results[3:], expected[3:])
@@ -1,10 +1,15 @@
 import asyncio
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import patch
 
 import pytest
+from test_fire_risk_service import make_met_json
 
 from db.database import MonitoredZone
-from services.zone_processor import process_zone
+from frcm.fireriskmodel import parameters as mp
+from services.result_cache import result_cache
+from services.zone_processor import process_zone, process_zones
+from utils.fire_risk_service import calculate_risk_batch
 
 
 @pytest.mark.asyncio
@@ -49,6 +54,9 @@ async def test_process_zone_success(mock_db_session):
         patch(
             "services.zone_processor.save_risk_data", return_value=None
         ) as mock_save_risk,
+        patch("services.zone_processor.get_model_states", return_value={}),
+        patch("services.zone_processor.save_model_states", return_value=None),
+        patch("services.zone_processor.settings.FRCM_ARCHETYPES_ENABLED", False),
     ):
         result = await process_zone(mock_zone)
 
@@ -59,7 +67,9 @@ async def test_process_zone_success(mock_db_session):
         assert "risk_score" in result
 
         mock_fetch.assert_called_once_with(60.39, 5.32)
-        mock_calc.assert_called_once_with(mock_met_data)
+        mock_calc.assert_called_once_with(
+            mock_met_data, spinup_hours=None, initial_state=None
+        )
         mock_save_weather.assert_called_once()
         mock_save_risk.assert_called_once()
 
@@ -89,11 +99,31 @@ async def test_process_zone_risk_calc_failure():
         patch("services.zone_processor.fetch_weather", return_value=mock_met_data),
         patch("services.zone_processor.calculate_risk", return_value=None),
         patch("services.zone_processor.save_weather_data", return_value=None),
+        patch("services.zone_processor.get_model_states", return_value={}),
     ):
         result = await process_zone(mock_zone)
         assert result is None
 
 
+@pytest.mark.asyncio
+async def test_process_zone_worker_died():
+    """A dead compute worker fails the zone instead of raising."""
+    mock_zone = MonitoredZone(
+        geohash="u4p9x", center_lat=60.39, center_lon=5.32, name="Test Zone"
+    )
+
+    with (
+        patch("services.zone_processor.fetch_weather", return_value={"some": "data"}),
+        patch(
+            "services.zone_processor.compute_pool.run",
+            side_effect=BrokenProcessPool("worker died"),
+        ),
+        patch("services.zone_processor.save_weather_data", return_value=None),
+        patch("services.zone_processor.get_model_states", return_value={}),
+    ):
+        assert await process_zone(mock_zone) is None
+
+
 @pytest.mark.asyncio
 async def test_process_zone_with_semaphore():
     """Test zone processing respects semaphore."""
@@ -109,7 +139,180 @@ async def test_process_zone_with_semaphore():
         patch("services.zone_processor.calculate_risk", return_value=mock_risk_result),
         patch("services.zone_processor.save_weather_data", return_value=None),
         patch("services.zone_processor.save_risk_data", return_value=None),
+        patch("services.zone_processor.get_model_states", return_value={}),
+        patch("services.zone_processor.save_model_states", return_value=None),
     ):
         # We just want to ensure it runs without error when semaphore is passed
         result = await process_zone(mock_zone, semaphore=semaphore)
         assert result is not None
+
+
+@pytest.mark.asyncio
+async def test_process_zones_batches_risk_calculation():
+    """All fetched zones are computed in one batch, failed fetches are skipped."""
+    zones = [
+        MonitoredZone(geohash=gh, center_lat=60.39, center_lon=5.32, name=gh)
+        for gh in ["u4p9x", "u4p9y", "u4p9z"]
+    ]
+    mock_risk_result = {"ttf": 5.5, "timestamp": "2023-10-27T10:00:00Z"}
+
+    with (
+        patch(
+            "services.zone_processor.fetch_weather",
+            side_effect=[{"data": "a"}, None, {"data": "c"}],
+        ),
+        patch(
+            "services.zone_processor.calculate_risk_batch",
+            return_value=[mock_risk_result, None],
+        ) as mock_batch,
+        patch("services.zone_processor.save_weather_data", return_value=None),
+        patch(
+            "services.zone_processor.save_risk_data", return_value=None
+        ) as mock_save_risk,
+        patch("services.zone_processor.get_model_states", return_value={}),
+        patch("services.zone_processor.save_model_states", return_value=None),
+    ):
+        results = await process_zones(zones, semaphore=asyncio.Semaphore(2))
+
+        mock_batch.assert_called_once_with(
+            [{"data": "a"}, {"data": "c"}], initial_states=[None, None]
+        )
+        mock_save_risk.assert_called_once()
+        assert results[0]["location_id"] == "u4p9x"
+        assert results[1] is None
+        assert results[2] is None
+
+
+@pytest.mark.asyncio
+async def test_process_zone_warm_start():
+    """The stored model state is passed on and the new state is saved."""
+    mock_zone = MonitoredZone(
+        geohash="u4p9x", center_lat=60.39, center_lon=5.32, name="Test Zone"
+    )
+    stored_state = object()
+    new_state = object()
+    mock_risk_result = {
+        "ttf": 5.5,
+        "timestamp": "2023-10-27T10:00:00Z",
+        "state": new_state,
+    }
+
+    with (
+        patch("services.zone_processor.fetch_weather", return_value={"data": "ok"}),
+        patch(
+            "services.zone_processor.calculate_risk", return_value=mock_risk_result
+        ) as mock_calc,
+        patch("services.zone_processor.save_weather_data", return_value=None),
+        patch("services.zone_processor.save_risk_data", return_value=None),
+        patch(
+            "services.zone_processor.get_model_states",
+            return_value={"u4p9x": stored_state},
+        ),
+        patch(
+            "services.zone_processor.save_model_states", return_value=None
+        ) as mock_save_states,
+    ):
+        result = await process_zone(mock_zone)
+
+        assert result is not None
+        mock_calc.assert_called_once_with(
+            {"data": "ok"}, spinup_hours=None, initial_state=stored_state
+        )
+        mock_save_states.assert_called_once_with({"u4p9x": new_state})
+
+
+@pytest.mark.asyncio
+async def test_process_zone_stores_archetypes():
+    """The archetype risks of the zone result are saved with its timestamp."""
+    mock_zone = MonitoredZone(
+        geohash="u4p9x", center_lat=60.39, center_lon=5.32, name="Test Zone"
+    )
+    archetypes = {"small_cabin": 4.5, "apartment": 7.0}
+    mock_risk_result = {
+        "ttf": 5.5,
+        "timestamp": "2023-10-27T10:00:00Z",
+        "archetypes": archetypes,
+    }
+
+    with (
+        patch("services.zone_processor.fetch_weather", return_value={"data": "ok"}),
+        patch(
+            "services.zone_processor.calculate_risk", return_value=mock_risk_result
+        ) as mock_calc,
+        patch("services.zone_processor.save_weather_data", return_value=None),
+        patch("services.zone_processor.save_risk_data", return_value=None),
+        patch(
+            "services.zone_processor.save_archetype_risk_data", return_value=None
+        ) as mock_save_archetypes,
+        patch("services.zone_processor.get_model_states", return_value={}),
+        patch("services.zone_processor.save_model_states", return_value=None),
+    ):
+        result = await process_zone(mock_zone)
+
+        mock_calc.assert_called_once()
+        mock_save_archetypes.assert_called_once_with(
+            "u4p9x", {"timestamp": "2023-10-27T10:00:00Z", "ttf": archetypes}
+        )
+        assert result["archetypes"] == archetypes
+
+
+@pytest.mark.asyncio
+async def test_process_zones_stores_archetypes_of_the_batch(caplog):
+    """The batched zones carry their archetypes, without a second computation."""
+    zone = MonitoredZone(geohash="u4p9x", center_lat=60.39, center_lon=5.32, name="a")
+
+    with (
+        patch(
+            "services.zone_processor.fetch_weather",
+            return_value=make_met_json(48, 10.0, 60.0),
+        ),
+        patch("services.zone_processor.save_weather_data", return_value=None),
+        patch("services.zone_processor.save_risk_data", return_value=None),
+        patch(
+            "services.zone_processor.save_archetype_risk_data", return_value=None
+        ) as mock_save_archetypes,
+        patch("services.zone_processor.get_model_states", return_value={}),
+        patch("services.zone_processor.save_model_states", return_value=None),
+        patch("services.zone_processor.settings.FRCM_ARCHETYPES_ENABLED", True),
+    ):
+        (result,) = await process_zones([zone])
+
+    (geohash, archetype_result), _ = mock_save_archetypes.call_args
+    assert geohash == "u4p9x"
+    assert archetype_result["timestamp"].isoformat() == result["timestamp"]
+    assert archetype_result["ttf"] == result["archetypes"]
+    assert list(result["archetypes"]) == list(mp.ARCHETYPES)
+    assert not [r for r in caplog.records if r.levelname in ("WARNING", "ERROR")]
+
+
+@pytest.mark.asyncio
+async def test_process_zones_simulates_identical_inputs_once():
+    """Zones with the same forecast share one simulation, the next cycle none."""
+    zones = [
+        MonitoredZone(geohash=gh, center_lat=60.39, center_lon=5.32, name=gh)
+        for gh in ["u4p9x", "u4p9y", "u4p9z"]
+    ]
+    forecasts = [make_met_json(48, 10.0, 60.0)] * 2 + [make_met_json(48, 5.0, 90.0)]
+
+    with (
+        patch("services.zone_processor.fetch_weather", side_effect=forecasts * 2),
+        patch(
+            "services.zone_processor.calculate_risk_batch",
+            side_effect=calculate_risk_batch,
+        ) as mock_batch,
+        patch("services.zone_processor.save_weather_data", return_value=None),
+        patch("services.zone_processor.save_risk_data", return_value=None),
+        patch("services.zone_processor.get_model_states", return_value={}),
+        patch("services.zone_processor.save_model_states", return_value=None),
+        patch("services.zone_processor.settings.FRCM_ARCHETYPES_ENABLED", False),
+    ):
+        first = await process_zones(zones)
+        second = await process_zones(zones)
+
+    mock_batch.assert_called_once()
+    assert len(mock_batch.call_args.args[0]) == 2
+    assert first[0]["ttf"] == first[1]["ttf"] != first[2]["ttf"]
+    assert second == first
+    assert result_cache.stats.misses == 2
+    assert result_cache.stats.duplicates == 1
+    assert result_cache.stats.hits == 3